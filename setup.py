@@ -5,6 +5,7 @@ setup(
     version='1.0.9.2',
     packages=find_packages(),
     install_requires=open('requirements.txt').readlines(),
+    extras_require={'http2': ['httpx[http2]'], 'compression': ['urllib3[brotli,zstd]']},
     author='Owen Orcan',
     author_email='owenorcan@gmail.com',
     url='https://github.com/OwenOrcan/Yirabot-Crawler',
@@ -0,0 +1,52 @@
+from collections import defaultdict
+from bs4 import BeautifulSoup
+from yirabot.cache_functions import ExtractionCache
+from yirabot.record_functions import extract_crawl_record
+from yirabot.seo_functions import analyze_headings
+from yirabot.structured_data_functions import JSONLD
+
+PAGE = b"""<html><head><title>Title</title><meta property="og:title" content="OG">
+<script type="application/ld+json">{"@type": "Product"}</script></head>
+<body><h1>Heading</h1><a href="/a">a</a></body></html>"""
+
+
+def structure(value):
+    # The type of every value in a result, nested containers included
+    if isinstance(value, dict):
+        return type(value), {key: structure(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value), [structure(item) for item in value]
+    return type(value)
+
+
+def extract_twice(cache, extractor, compute):
+    miss = cache.extract(extractor, PAGE, compute, "https://example.com/")
+    hit = cache.extract(extractor, PAGE, compute, "https://example.com/")
+    assert cache.stats()['hits'] == 1
+    return miss, hit
+
+
+def test_miss_and_hit_return_identical_types():
+    result = {'title_length': ('Title', 5), 'pairs': [('og:title', 'OG')], 'json_ld': [JSONLD('{}')]}
+    miss, hit = extract_twice(ExtractionCache(), 'seo', lambda: result)
+    assert miss == hit == result
+    assert structure(miss) == structure(hit) == structure(result)
+
+
+def test_defaultdict_keeps_its_default():
+    headings = analyze_headings(BeautifulSoup(PAGE, "html.parser"))[0]
+    miss, hit = extract_twice(ExtractionCache(), 'seo', lambda: headings)
+    assert type(miss) is type(hit) is defaultdict
+    assert miss['h6'] == hit['h6'] == headings['h6']
+
+
+def test_crawl_record_round_trip(tmp_path):
+    soup = BeautifulSoup(PAGE, "html5lib")
+    record = extract_crawl_record(soup, "https://example.com/", ())
+    path = str(tmp_path / "cache.db")
+    miss = ExtractionCache(path=path).extract('record', PAGE, lambda: record, "https://example.com/")
+    hit = ExtractionCache(path=path).extract('record', PAGE, lambda: None, "https://example.com/")
+    for result in (miss, hit):
+        assert result.to_dict() == record.to_dict()
+        assert type(result.open_graph[0]) is tuple
+        assert type(result.structured_data['json_ld'][0]) is JSONLD
@@ -2,90 +2,194 @@ from . import errors
 from .seo_functions import *
 from .helper_functions import *
 from .data_extraction_functions import *
-from urllib.error import HTTPError
-from requests import RequestException, Timeout
+from .distributed_functions import *
+from .request_functions import *
+from .keyword_functions import *
+from .duplicate_functions import *
+from .site_audit_functions import *
+from .link_graph_functions import *
+from .performance_functions import *
+from .record_functions import *
+from .retry_functions import *
+from .connection_functions import *
+from .http2_functions import *
+from .cache_functions import *
+from .server_functions import *
+from .auth_functions import *
+from .warc_functions import *
+from .replay_functions import *
+from .rules_functions import *
+from .scope_functions import *
+from .structured_data_functions import *
+from .monitor_functions import *
+import urllib.robotparser
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from urllib.parse import urlsplit
+from requests.exceptions import HTTPError, ConnectionError, RequestException, Timeout
 from bs4 import BeautifulSoup
 from .data_extraction_functions import parse_sitemap
 
 
 # noinspection PyUnboundLocalVariable
 class Yirabot:
-    def __init__(self):
+    def __init__(self, max_bytes=MAX_CONTENT_BYTES, retry=DEFAULT_RETRY_POLICY, http2=False,
+                 max_streams_per_host=DEFAULT_MAX_STREAMS_PER_HOST, cache=None, warc=None, rules=None, scope=None):
         self.urls = None
         self.sitemap_url = None
+        self.max_bytes = max_bytes  # Pages larger than this are rejected; None disables the limit
+        self.retry = retry  # Backoff and per-host circuit breaker; NO_RETRY_POLICY fails on the first error
+        # With http2, crawl, scrape and check_urls multiplex requests per origin unless a session is passed
+        self.transport = HTTP2Transport(max_streams_per_host) if http2 else None
+        # Bodies seen before skip parsing; pass ExtractionCache(path=...) to persist results across runs
+        self.cache = cache if cache is not None else ExtractionCache()
+        self.robots = TTLCache(ttl=3600)  # robots.txt rules per origin
+        self.sitemaps = TTLCache(ttl=3600, max_entries=256)
+        self.warc = warc  # WARCWriter that full responses fetched by crawl and scrape are archived to
+        # Custom fields added to crawl and scrape results: a RuleSet, a dict of rules or a JSON rules file
+        self.rules = load_rules(rules)
+        # Site crawls, sitemap validation and URL lists skip URLs outside this CrawlScope (or JSON scope file)
+        self.scope = load_scope(scope)
+        self.assets = AssetSizeCache(retry=retry)  # Asset sizes shared by every page weight audit of this bot
 
-    def seo_analysis(self, url, session=None):
+    def is_allowed(self, url, session=None):
+        """
+        Checks the site's robots.txt for the URL. The rules are fetched once per origin
+        and reused for an hour, so crawling many pages of a site costs one robots.txt request.
+        """
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        parser = self.robots.get(origin)
+        if parser is None:
+            parser = urllib.robotparser.RobotFileParser(origin + "/robots.txt")
+            try:
+                response = self.retry.request("GET", origin + "/robots.txt", session=session, timeout=10)
+            except RequestException:
+                return True  # Not cached: the page request reports the failure, the next call retries
+            if response.status_code in (401, 403):
+                parser.disallow_all = True
+            elif response.status_code >= 400:
+                parser.allow_all = True
+            else:
+                parser.parse(response.content.decode("utf-8", "replace").splitlines())
+            self.robots.put(origin, parser)
+        return parser.can_fetch("*", url)
+
+    def in_scope(self, urls):
+        """
+        Returns the URLs inside the bot's scope, or all of them without a scope.
+        """
+        return list(urls) if self.scope is None else self.scope.filter(urls)
+
+    def sitemap_urls(self, url):
+        """
+        Returns the sitemap URLs for a URL (see parse_sitemap), cached for an hour.
+        """
+        return list(self.sitemaps.get_or_compute(url, lambda: parse_sitemap(url, retry=self.retry)))
+
+    def seo_analysis(self, url, session=None, head_only=False, fields=None):
         """
         Performs SEO analysis on the given URL, extracting and analyzing various SEO factors.
+        With head_only, only the <head> is downloaded and parsed, and only the title,
+        meta description, responsiveness and language checks are returned.
+        With fields (e.g. "title_length,headings"), only those checks run; see SEO_FIELDS.
         """
         headers = {'User-Agent': get_random_user_agent()}
+        fields = parse_fields(fields, SEO_FIELDS)
+        if head_only and fields and not HEAD_SEO_FIELDS.issuperset(fields):
+            raise ValueError(f"head_only only supports the fields: {', '.join(sorted(HEAD_SEO_FIELDS))}")
         try:
-            response = session.get(url, headers=headers) if session else requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
+            if head_only:
+                response, head = fetch_head_data(url, session=session, headers=headers, max_bytes=self.max_bytes,
+                                                 retry=self.retry)
+                response.raise_for_status()
+                return project_fields(head_seo_analysis(head), fields)
 
-            soup = BeautifulSoup(response.content, 'html.parser')
-            data = {
-                'title_length': analyze_title(soup),
-                'meta_desc_length': analyze_meta_description(soup),
-                'headings': analyze_headings(soup),
-                'images_without_alt': analyze_images_for_alt_text(soup),
-                'keyword_results': keyword_analysis(get_combined_text(soup)),
-                'is_responsive': check_mobile_responsiveness(url),
-                'social_media_integration': check_social_media_integration(url),
-                'website_language': check_website_language(url),
-            }
-            return data
+            return seo_field_analysis(url, fields, session=session, headers=headers, max_bytes=self.max_bytes,
+                                      retry=self.retry, cache=self.cache)
 
+        except HTTPError as e:
+            raise errors.HTTPError(e.response.status_code)
+        except errors.CircuitOpenError:
+            raise
         except ConnectionError:
             raise errors.ConnectionError(url)
         except Timeout:
             raise errors.TimeoutError(url)
-        except HTTPError:
-            raise errors.HTTPError(response.status_code)
         except RequestException:
             raise errors.RequestError(url)
 
-    def crawl(self, url, session=None, force=False):
+    def crawl(self, url, session=None, force=False, head_only=False, compact=False, fields=None):
+        """
+        Crawls a URL for its metadata, links and images.
+        With compact, returns a CrawlRecord instead of a dict; use it when holding many
+        results in memory and call to_dict() for the classic format.
+        With fields (e.g. "title,canonical"), only those fields are extracted; see
+        CRAWL_FIELDS. The sitemap is only fetched when requested, and when every field
+        is found in <head> the download stops at </head>, unless the bot archives pages
+        to a WARC. head_only responses are never archived.
+        Fields of the bot's rules are added to the result; they are not applied with
+        compact, and head_only raises ValueError unless fields leaves the rules out.
+        """
         headers = {'User-Agent': get_random_user_agent()}
+        session = session or self.transport
+        rule_names = self.rules.names if self.rules else ()
+        fields = parse_fields(fields, CRAWL_FIELDS + rule_names)
+        if fields and compact:
+            raise ValueError("fields cannot be combined with compact")
+        if head_only and fields and not HEAD_FIELDS.issuperset(fields):
+            raise ValueError(f"head_only only supports the fields: {', '.join(sorted(HEAD_FIELDS))}")
+        if head_only and rule_names and not fields:
+            raise ValueError("head_only cannot apply the bot's rules; pass fields to leave them out")
         try:
-            if not force:
-                if not is_allowed_by_robots_txt(url):
-                    raise errors.RobotsError(url)
+            if not force and not self.is_allowed(url, session):
+                raise errors.RobotsError(url)
 
-            response = session.get(url, headers=headers) if session else requests.get(url, headers=headers, timeout=10)
-            dynamic_delay(response, script=True)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, features="html5lib")
-
-            meta_description_tag = soup.find("meta", {"name": "description"})
-            favicon_tag = soup.find("link", {"rel": "icon"})
-            title_tag = soup.find("title")
-            og_tags = [str(tag) for tag in soup.find_all("meta", property=lambda x: x and x.startswith("og:"))]
-            twitter_tags = [str(tag) for tag in
-                            soup.find_all("meta", attrs={"name": lambda x: x and x.startswith("twitter:")})]
-            canonical_tag = soup.find("link", {"rel": "canonical"})
-            internal_links, external_links = extract_links(soup, url)
-            images = [img['src'] for img in soup.find_all('img', src=True)]
-
-            data = {
-                'favicon': favicon_tag.get("href") if favicon_tag else None,
-                'meta_description': meta_description_tag.get("content") if meta_description_tag else None,
-                'title': title_tag.get_text() if title_tag else None,
-                'open_graph_tags': og_tags,
-                'twitter_card_tags': twitter_tags,
-                'canonical_url': canonical_tag.get("href") if canonical_tag else None,
-                'internal_links': internal_links,
-                'external_links': external_links,
-                'image_urls': images,
-                'sitemap_urls': parse_sitemap(url)
-            }
-            if type(data) is None:
-                self.crawl(url, session, force) # sometimes the function returns none, when that happens, call that shit again.
-            else:
-                return data
+            if head_only or (fields and HEAD_FIELDS.issuperset(fields) and self.warc is None):
+                # Metadata-only fast path: stops downloading and parsing at </head>
+                response, data = fetch_head_data(url, session=session, headers=headers, max_bytes=self.max_bytes,
+                                                 retry=self.retry)
+                dynamic_delay(response, script=True)
+                response.raise_for_status()
+                return project_fields(data, fields)
+
+            custom = tuple(field for field in fields if field in rule_names) if fields else rule_names
+            page_fields = tuple(field for field in fields or PAGE_FIELDS
+                                if field != 'sitemap_urls' and field not in rule_names)
+            data = {}
+            if page_fields or custom:
+                response, body = fetch_page(url, session=session, headers=headers, max_bytes=self.max_bytes,
+                                            retry=self.retry)
+                if self.warc is not None:
+                    self.warc.write_response(url, response, body)
+                dynamic_delay(response, script=True)
+                response.raise_for_status()
+                def parse():
+                    return BeautifulSoup(body, features="html5lib", from_encoding=get_body_encoding(response, body))
+
+                # Links are resolved against the URL, so it is part of the cache key; the sitemap is fetched separately
+                if compact:
+                    record = self.cache.extract('record', body, lambda: extract_crawl_record(parse(), url, ()), url)
+                    record.sitemap_urls = LinkList(self.sitemap_urls(url))
+                    return record
 
-        except HTTPError:
-            raise errors.HTTPError(response.status_code)
+                def extract():
+                    soup = parse()
+                    data = extract_page_data(soup, url, page_fields)
+                    if custom:
+                        data.update(self.rules.extract(soup, custom))
+                    return data
+
+                context = (url,) if fields is None else (url,) + page_fields
+                context += (self.rules.key,) + custom if custom else ()
+                data = self.cache.extract('crawl', body, extract, *context)
+            if fields is None or 'sitemap_urls' in fields:
+                data['sitemap_urls'] = self.sitemap_urls(url)
+            return project_fields(data, fields)
+
+        except HTTPError as e:
+            raise errors.HTTPError(e.response.status_code)
+        except errors.CircuitOpenError:
+            raise
         except ConnectionError:
             raise errors.ConnectionError(url)
         except Timeout:
@@ -93,69 +197,344 @@ class Yirabot:
         except RequestException:
             raise errors.RequestError(url)
 
-    def scrape(self, url, session=None, force=False):
+    def scrape(self, url, session=None, force=False, index=None, fields=None):
         """
         Specifically crawls a URL for its main content like paragraphs, headings, and lists.
         Parameters:
         url (str): The URL to be crawled for content.
         session (Session, optional): Requests session for authenticated crawling.
+        index (LSHIndex, optional): Near-duplicate index the page's content fingerprint is added to.
+        fields (str or list, optional): Only extract these fields of CONTENT_FIELDS or of the bot's rules.
         Returns:
         Data: Dict
         """
         headers = {'User-Agent': get_random_user_agent()}
+        session = session or self.transport
+        rule_names = self.rules.names if self.rules else ()
+        fields = parse_fields(fields, CONTENT_FIELDS + rule_names)
         try:
-            if not force:
-                if not is_allowed_by_robots_txt(url):
-                    raise errors.RobotsError(url)
+            if not force and not self.is_allowed(url, session):
+                raise errors.RobotsError(url)
+
+            if fields == ('title',) and index is None and self.warc is None:
+                response, head = fetch_head_data(url, session=session, headers=headers, max_bytes=self.max_bytes,
+                                                 retry=self.retry)
+                dynamic_delay(response, script=True)
+                response.raise_for_status()
+                return {'title': head['title']}
 
-            response = session.get(url, headers=headers) if session else requests.get(url, headers=headers, timeout=10)
+            response, body = fetch_page(url, session=session, headers=headers, max_bytes=self.max_bytes,
+                                        retry=self.retry)
+            if self.warc is not None:
+                self.warc.write_response(url, response, body)
             dynamic_delay(response, script=True)
             response.raise_for_status()
 
-            soup = BeautifulSoup(response.text, features="html5lib")
-
-            title_tag = soup.find("title")
-            paragraphs = [p.get_text().strip() for p in soup.find_all('p')]
-            headings = [h.get_text().strip() for h in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])]
-            lists = [ul.get_text().strip() for ul in soup.find_all(['ul', 'ol'])]
-
-            data = {
-                'title': title_tag.get_text() if title_tag else None,
-                'paragraphs': paragraphs,
-                'headings': headings,
-                'lists': lists
-            }
-            if type(data) is None:
-                print("Server did not response, trying again.")
-                self.scrape(url, session, force)
-            else:
-                return data
+            # The near-duplicate fingerprint needs every content field
+            custom = tuple(field for field in fields if field in rule_names) if fields else rule_names
+            extract_fields = CONTENT_FIELDS if fields is None or index is not None else \
+                tuple(field for field in fields if field not in rule_names)
+
+            def extract():
+                soup = BeautifulSoup(body, features="html5lib", from_encoding=get_body_encoding(response, body))
+                canonical_tag = soup.find("link", {"rel": "canonical"})
+                data = extract_content_data(soup, extract_fields)
+                if custom:
+                    data.update(self.rules.extract(soup, custom))
+                return data, canonical_tag.get("href") if canonical_tag else None
 
-        except HTTPError:
-            raise errors.HTTPError
+            context = () if extract_fields is CONTENT_FIELDS else extract_fields
+            context += (self.rules.key,) + custom if custom else ()
+            data, canonical = self.cache.extract('content', body, extract, *context)
+            if index is not None:
+                index.add(url, content_fingerprint(data), canonical)
+            return project_fields(data, fields)
+
+        except HTTPError as e:
+            raise errors.HTTPError(e.response.status_code)
+        except errors.CircuitOpenError:
+            raise
         except ConnectionError:
-            raise errors.ConnectionError
+            raise errors.ConnectionError(url)
         except Timeout:
-            raise errors.TimeoutError
+            raise errors.TimeoutError(url)
         except RequestException:
-            raise errors.RequestError
+            raise errors.RequestError(url)
 
-    def validate(self, sitemap_url):
-        self.sitemap_url = sitemap_url
+    def seo_audit_site(self, url, output=None, max_pages=500, workers=8, session=None, force=False):
+        """
+        Audits a whole site concurrently and aggregates site-level SEO findings such as
+        duplicate titles and meta descriptions, missing H1s, images without alt text and
+        pages missing a viewport or language.
+        Parameters:
+        url (str): The site URL. Pages come from its sitemap, or from following internal links.
+        output (str, optional): Path of an NDJSON file receiving one line per audited page.
+        max_pages (int): Maximum number of pages to audit.
+        workers (int): Number of pages fetched concurrently.
+        session (Session, optional): Requests session for authenticated crawling.
+        Returns:
+        Data: Dict
+        """
+        return audit_site(url, output=output, max_pages=max_pages, workers=workers, session=session, force=force,
+                          max_bytes=self.max_bytes, scope=self.scope)
+
+    def page_weight(self, url, session=None):
+        """
+        Measures a page's TTFB and HTML transfer time, totals the size of its images,
+        scripts and stylesheets with concurrent HEAD requests (sizes are cached across
+        pages), and reports oversized assets and render-blocking resources in <head>.
+        Parameters:
+        url (str): The page URL.
+        session (Session, optional): Requests session for authenticated crawling.
+        Returns:
+        Data: Dict
+        """
         try:
-            self.urls = parse_sitemap(self.sitemap_url, script=True)
+            return analyze_page_weight(url, session=session, assets=self.assets, max_bytes=self.max_bytes,
+                                       retry=self.retry)
+        except HTTPError as e:
+            raise errors.HTTPError(e.response.status_code)
+        except errors.CircuitOpenError:
+            raise
         except ConnectionError:
-            raise errors.ConnectionError(sitemap_url)
-        except HTTPError:
-            raise errors.HTTPError(sitemap_url)
-        except TimeoutError:
-            raise errors.TimeoutError(sitemap_url)
+            raise errors.ConnectionError(url)
+        except Timeout:
+            raise errors.TimeoutError(url)
         except RequestException:
-            raise errors.RequestError(sitemap_url)
-        responses = {}
+            raise errors.RequestError(url)
+
+    def page_weight_audit(self, url, output=None, max_pages=500, workers=8, session=None, force=False):
+        """
+        Audits the performance of a whole site concurrently: TTFB percentiles, average
+        page weight, the heaviest and slowest pages, render-blocking resources and the
+        oversized assets shared by most pages.
+        Parameters:
+        url (str): The site URL. Pages come from its sitemap, or from following internal links.
+        output (str, optional): Path of an NDJSON file receiving one line per audited page.
+        max_pages (int): Maximum number of pages to audit.
+        workers (int): Number of pages fetched concurrently.
+        session (Session, optional): Requests session for authenticated crawling.
+        Returns:
+        Data: Dict
+        """
+        return audit_page_weight(url, output=output, max_pages=max_pages, workers=workers, session=session,
+                                 force=force, max_bytes=self.max_bytes, scope=self.scope, assets=self.assets)
+
+    def monitor(self, url, path=DEFAULT_MONITOR_FILE, output=None, max_pages=100, cycle_seconds=60, cycles=None,
+                workers=8, session=None, force=False):
+        """
+        Monitors a site for changes, recrawling only the sitemap URLs that are due. Due times
+        come from the sitemap's lastmod, changefreq and priority hints and the change rate
+        observed on earlier fetches, and are kept in a SQLite file across runs.
+        Parameters:
+        url (str): The site URL whose sitemap is monitored.
+        path (str): Path of the SQLite state file.
+        output (str, optional): Path of an NDJSON file to which new and changed pages are appended.
+        max_pages (int): Maximum number of URLs fetched per cycle.
+        cycle_seconds (float): Minimum number of seconds between the start of two cycles.
+        cycles (int, optional): Number of cycles to run. None runs until interrupted.
+        session (Session, optional): Requests session for authenticated crawling.
+        Returns:
+        Data: Dict with the number of pages per status (new, changed, unchanged, not_modified, failed)
+        """
+        scheduler = RecrawlScheduler(url, path, scope=self.scope)
+        try:
+            return scheduler.run(max_pages=max_pages, cycle_seconds=cycle_seconds, cycles=cycles, output=output,
+                                 workers=workers, session=session, force=force, max_bytes=self.max_bytes,
+                                 script=True)
+        finally:
+            scheduler.close()
+
+    def link_graph(self, url, max_pages=1000, workers=8, session=None, force=False, top=20):
+        """
+        Crawls a site by following its internal links and analyzes the link graph.
+        Parameters:
+        url (str): The homepage URL.
+        max_pages (int): Maximum number of pages to crawl.
+        workers (int): Number of pages fetched concurrently.
+        session (Session, optional): Requests session for authenticated crawling.
+        top (int): Number of pages listed per ranking.
+        Returns:
+        Data: Dict with PageRank, click depth distribution, least linked, unreachable and orphan pages
+        """
+        return analyze_link_graph(url, max_pages=max_pages, workers=workers, session=session, force=force, top=top,
+                                  scope=self.scope)
+
+    def find_duplicates(self, urls, session=None, force=False, threshold=0.8):
+        """
+        Scrapes several pages and clusters the near-duplicates among them.
+        Parameters:
+        urls (iterable): The URLs to compare, e.g. every URL of a sitemap.
+        session (Session, optional): Requests session for authenticated crawling.
+        threshold (float): Minimum estimated content similarity for two pages to be clustered.
+        Returns:
+        Data: List of clusters with their pages and declared canonicals
+        """
+        index = LSHIndex(threshold=threshold)
+        urls = self.in_scope(urls)
+        session = session or create_pooled_session()
+        with ConnectionPrewarmer(session) as prewarmer:
+            for position, url in enumerate(urls):
+                prewarmer.prewarm_ahead(urls, position)
+                try:
+                    self.scrape(url, session=session, force=force, index=index)
+                except (errors.HTTPError, errors.ConnectionError, errors.TimeoutError, errors.RequestError,
+                        errors.RobotsError, errors.ContentTypeError, errors.ContentTooLargeError,
+                        errors.CircuitOpenError):
+                    continue
+        return index.report()
+
+    def keyword_audit(self, urls, session=None, ngram_range=(1, 3), top=10, force=False):
+        """
+        Runs keyword and n-gram analysis over the full body text of several pages, e.g.
+        every URL of a sitemap, and ranks each page's terms by TF-IDF across all pages.
+        Pages disallowed by robots.txt are reported as failed unless force is True.
+        Parameters:
+        urls (iterable): The URLs to analyze.
+        session (Session, optional): Requests session for authenticated crawling.
+        force (bool): If True, ignores robots.txt.
+        ngram_range (tuple): Smallest and largest n-gram size to count.
+        top (int): Number of terms reported per n-gram size and per page.
+        Returns:
+        Data: Dict
+        """
+        analyzer = KeywordAnalyzer(ngram_range=ngram_range)
+        failed = {}
+        urls = self.in_scope(urls)
+        session = session or create_pooled_session()
+        with ConnectionPrewarmer(session) as prewarmer:
+            for position, url in enumerate(urls):
+                prewarmer.prewarm_ahead(urls, position)
+                if not force and not self.is_allowed(url, session):
+                    failed[url] = str(errors.RobotsError(url))
+                    continue
+                try:
+                    response, body = fetch_page(url, session=session, max_bytes=self.max_bytes, retry=self.retry,
+                                                headers={'User-Agent': get_random_user_agent()})
+                    response.raise_for_status()
+                except (RequestException, errors.ContentTypeError, errors.ContentTooLargeError) as e:
+                    failed[url] = str(e)
+                    continue
+                soup = BeautifulSoup(body, 'html.parser', from_encoding=get_body_encoding(response, body))
+                html_tag = soup.find('html')
+                analyzer.add_page(get_page_text(soup), url, html_tag.get('lang') if html_tag else None)
 
-        for url in self.urls:
-            response = requests.head(url, allow_redirects=True, timeout=10)
-            response_code = response.status_code
-            responses[url] = response_code
+        report = analyzer.report(top)
+        report['failed'] = failed
+        return report
+
+    def validate(self, sitemap_url):
+        """
+        Checks the status code of every URL in a sitemap with HEAD requests. Failing
+        requests are retried with backoff; URLs that stay unreachable, or whose host
+        circuit is open, map to None instead of aborting the validation.
+        """
+        self.sitemap_url = sitemap_url
+        self.urls = parse_sitemap(self.sitemap_url, script=True, retry=self.retry, scope=self.scope)
+        return self.check_urls(self.urls)
+
+    def check_urls(self, urls, session=None, workers=None):
+        """
+        Checks the status code of many URLs, e.g. a page's external_links, with HEAD
+        requests over pooled connections. While one URL is checked, DNS and connections
+        for the next hosts in the list are prepared in the background, and DNS answers
+        are cached, which matters most when the URLs span thousands of hosts. With the
+        HTTP/2 transport the URLs are checked concurrently, multiplexed per origin.
+        Parameters:
+        urls (iterable): The URLs to check.
+        session (Session, optional): Requests session; defaults to the HTTP/2 transport, or a session
+        pooling connections to many hosts.
+        workers (int, optional): Number of concurrent checks. Defaults to 1, or to the per-host stream
+        limit with HTTP/2.
+        Returns:
+        Data: Dict of URL to status code, or None if the URL could not be reached
+        """
+        urls = list(urls)
+        session = session or self.transport or create_pooled_session()
+        if workers is None:
+            workers = session.max_streams_per_host if isinstance(session, HTTP2Transport) else 1
+
+        def check(url):
+            try:
+                response = self.retry.request("HEAD", url, session=session, allow_redirects=True, timeout=10)
+                return url, response.status_code
+            except RequestException:
+                return url, None
+
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return dict(executor.map(check, urls))
+
+        responses = {}
+        with ConnectionPrewarmer(session) as prewarmer:
+            for position, url in enumerate(urls):
+                prewarmer.prewarm_ahead(urls, position)
+                responses[url] = check(url)[1]
         return responses
+
+    def replay(self, path, extractors=tuple(REPLAY_EXTRACTORS), workers=None):
+        """
+        Re-runs the crawl, content and SEO extraction over saved pages (a directory of
+        .html files from get_html or .warc/.warc.gz files) on a process pool, without
+        any network request.
+        Parameters:
+        path (str): Directory or file of saved pages.
+        extractors (tuple): Which of 'crawl', 'content' and 'seo' to run.
+        workers (int, optional): Number of worker processes; defaults to the CPU count.
+        Returns:
+        Data: Generator of (url, result, error) tuples; result maps each extractor to its output
+        """
+        return replay(path, extractors, workers)
+
+    def crawl_many(self, urls, workers=8, session=None, force=False, compact=False, progress=None):
+        """
+        Crawls many URLs concurrently, yielding each result as soon as it is ready. Only a
+        bounded number of requests is in flight; with the HTTP/2 transport, requests to
+        the same origin share one connection.
+        Parameters:
+        urls (iterable): The URLs to crawl.
+        workers (int): Number of pages crawled concurrently.
+        session (Session, optional): Requests session for authenticated crawling.
+        compact (bool): If True, results are CrawlRecord objects.
+        progress (CrawlProgress, optional): Live progress view, e.g. `with CrawlProgress() as progress:`.
+        Returns:
+        Data: Generator of (url, data, error) tuples; error is None on success
+        """
+        urls = iter(urls) if self.scope is None else filter(self.scope.allows, urls)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = {}
+            while True:
+                for url in urls:
+                    pending[executor.submit(self.crawl, url, session, force, compact=compact)] = url
+                    if len(pending) >= workers * 2:
+                        break
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = pending.pop(future)
+                    try:
+                        data = future.result()
+                    except (errors.HTTPError, errors.ConnectionError, errors.TimeoutError, errors.RequestError,
+                            errors.RobotsError, errors.ContentTypeError, errors.ContentTooLargeError,
+                            errors.CircuitOpenError) as e:
+                        progress.advance(url, e, len(pending)) if progress else None
+                        yield url, None, e
+                    else:
+                        progress.advance(url, None, len(pending)) if progress else None
+                        yield url, data, None
+
+    def close(self):
+        """
+        Stops the asset size threads of page weight audits and closes the HTTP/2
+        transport. The bot can be used as a context manager to call this on exit.
+        """
+        self.assets.close()
+        if self.transport is not None:
+            self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
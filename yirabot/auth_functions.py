@@ -0,0 +1,295 @@
+import json
+import os
+import threading
+from datetime import datetime
+from http.cookiejar import MozillaCookieJar, LoadError
+from urllib.parse import urljoin, urlsplit
+import requests
+from bs4 import BeautifulSoup
+from rich import print
+from . import errors
+from .data_extraction_functions import extract_page_data
+from .display_functions import CrawlProgress
+from .helper_functions import get_random_user_agent, dynamic_delay, login_successful
+from .request_functions import fetch_page, get_body_encoding, MAX_CONTENT_BYTES
+from .retry_functions import IDEMPOTENT_METHODS
+from .site_audit_functions import crawl_site
+
+# ============================================================
+# AUTH FUNCTIONS
+# Non-interactive logins shared by concurrent crawls.
+# ============================================================
+
+AUTH_ENV_PREFIX = "YIRABOT_AUTH_"
+AUTH_CONFIG_KEYS = ("login_url", "username", "password", "username_field", "password_field", "success_url",
+                    "cookie_file", "bearer_token", "expired_status")
+DEFAULT_EXPIRED_STATUS = (401,)
+
+
+def load_auth_config(path=None, environ=None):
+    """
+    Loads the login configuration from a JSON file and from YIRABOT_AUTH_* environment
+    variables, which take precedence so secrets can stay out of the file. Recognized
+    keys (environment variable: YIRABOT_AUTH_<KEY>):
+        login_url, username, password: Form login. The login page is fetched first so
+            hidden form fields (e.g. CSRF tokens) are submitted too.
+        username_field, password_field: Form input names ("username", "password").
+        success_url: URL the login redirects to on success.
+        cookie_file: Netscape cookies.txt file imported at start and updated after
+            every login, so later runs skip the login round trip.
+        bearer_token: Sent as "Authorization: Bearer <token>".
+        expired_status: Status codes meaning the session expired ("401,403" in the environment).
+        fields, headers: Extra form fields and request headers (file only).
+
+    Args:
+        path (str, optional): Path of the JSON config file. Defaults to $YIRABOT_AUTH_CONFIG.
+        environ (dict, optional): Environment to read. Defaults to os.environ.
+
+    Returns:
+        dict: The login configuration.
+
+    Raises:
+        ValueError: If the configuration is invalid or has no way to authenticate.
+    """
+    environ = os.environ if environ is None else environ
+    path = path or environ.get(AUTH_ENV_PREFIX + "CONFIG")
+    config = {}
+    if path:
+        with open(path) as file:
+            config = json.load(file)
+        if not isinstance(config, dict):
+            raise ValueError(f"Auth config '{path}' must be a JSON object")
+
+    for key in AUTH_CONFIG_KEYS:
+        value = environ.get(AUTH_ENV_PREFIX + key.upper())
+        if value:
+            config[key] = [int(code) for code in value.split(",")] if key == "expired_status" else value
+
+    if config.get("login_url"):
+        if not config["login_url"].startswith("https://"):
+            raise ValueError("Secure HTTPS connection required for login.")
+        if not config.get("username") or not config.get("password"):
+            raise ValueError("A username and password are required with a login URL.")
+    elif not config.get("cookie_file") and not config.get("bearer_token"):
+        raise ValueError("Auth config needs a login_url, a cookie_file or a bearer_token.")
+    return config
+
+
+class AuthSession(requests.Session):
+    """
+    Session that stays logged in on its own. It is shared by every thread of a crawl:
+    when a response shows the session expired (a status in expired_status, or a
+    redirect to the login page) it logs in again once for all threads and repeats the
+    request. Cookies are imported from and saved to cookie_file, so a still-valid
+    session from an earlier run is reused without logging in.
+    """
+
+    def __init__(self, config):
+        """
+        Args:
+            config (dict): Login configuration, see load_auth_config.
+        """
+        super().__init__()
+        self.config = config
+        self.login_url = config.get("login_url")
+        self.expired_status = set(config.get("expired_status") or DEFAULT_EXPIRED_STATUS)
+        self.lock = threading.RLock()
+        self.generation = 0
+        self.logins = 0
+        self.headers.update(config.get("headers") or {})
+        if config.get("bearer_token"):
+            self.headers["Authorization"] = f"Bearer {config['bearer_token']}"
+        self.cookie_file = config.get("cookie_file")
+        self.cookies_loaded = False
+        if self.cookie_file:
+            self.cookies = MozillaCookieJar(self.cookie_file)
+            self.cookies_loaded = self.load_cookies()
+
+    def load_cookies(self):
+        """
+        Imports the cookie file. Returns True if it held any unexpired cookies.
+        """
+        if not os.path.exists(self.cookie_file):
+            return False
+        try:
+            self.cookies.load(ignore_discard=True)
+        except LoadError as e:
+            raise ValueError(f"Invalid cookie file '{self.cookie_file}': {e}")
+        return len(self.cookies) > 0
+
+    def save_cookies(self):
+        """
+        Saves the session cookies to the cookie file, readable by the current user only.
+        """
+        if not self.cookie_file:
+            return
+        os.close(os.open(self.cookie_file, os.O_CREAT | os.O_WRONLY, 0o600))
+        self.cookies.save(ignore_discard=True)
+
+    @property
+    def can_login(self):
+        return bool(self.login_url)
+
+    def start(self):
+        """
+        Logs in, unless imported cookies may still be valid. Expired cookies are
+        detected on the first request and replaced then.
+        """
+        if self.can_login and not self.cookies_loaded:
+            self.login()
+        return self
+
+    def login(self):
+        """
+        Submits the login form and saves the new session cookies.
+
+        Raises:
+            errors.LoginError: If the login does not succeed.
+        """
+        config = self.config
+        with self.lock:
+            action, fields = self.login_url, {}
+            try:
+                page = requests.Session.request(self, "GET", self.login_url, timeout=10,
+                                                headers={'User-Agent': get_random_user_agent()})
+                action, fields = find_login_form(page)
+            except requests.exceptions.RequestException:
+                pass  # Posting the credentials alone still works for forms without hidden fields
+            fields.update(config.get("fields") or {})
+            fields[config.get("username_field") or "username"] = config["username"]
+            fields[config.get("password_field") or "password"] = config["password"]
+
+            response = requests.Session.request(self, "POST", action, data=fields, timeout=10,
+                                                headers={'User-Agent': get_random_user_agent()})
+            response.raise_for_status()
+            if config.get("success_url"):
+                succeeded = login_successful(response, config["success_url"])
+            else:
+                succeeded = not self.is_expired(response)
+            if not succeeded:
+                raise errors.LoginError(self.login_url)
+
+            self.generation += 1
+            self.logins += 1
+            self.save_cookies()
+
+    def is_login_page(self, url):
+        if not self.login_url or not url:
+            return False
+        page, login = urlsplit(url), urlsplit(self.login_url)
+        return (page.netloc, page.path.rstrip("/")) == (login.netloc, login.path.rstrip("/"))
+
+    def is_expired(self, response):
+        """
+        Returns True if the response shows the session is no longer logged in.
+        """
+        if response.status_code in self.expired_status:
+            return True
+        location = response.headers.get("Location")
+        return self.is_login_page(response.url) or bool(location and
+                                                         self.is_login_page(urljoin(response.url, location)))
+
+    def request(self, method, url, *args, **kwargs):
+        generation = self.generation
+        response = super().request(method, url, *args, **kwargs)
+        if (not self.can_login or method.upper() not in IDEMPOTENT_METHODS or self.is_login_page(url)
+                or not self.is_expired(response)):
+            return response
+
+        response.close()
+        with self.lock:
+            if self.generation == generation:  # Otherwise another thread already logged in again
+                self.login()
+        return super().request(method, url, *args, **kwargs)
+
+    def close(self):
+        self.save_cookies()
+        super().close()
+
+
+def find_login_form(response):
+    """
+    Finds the login form of a login page: the form with a password input.
+
+    Args:
+        response (Response): The login page.
+
+    Returns:
+        tuple: The form's action URL and the values of its hidden inputs.
+    """
+    soup = BeautifulSoup(response.content, 'html.parser')
+    for form in soup.find_all("form"):
+        if form.find("input", {"type": "password"}):
+            fields = {field["name"]: field.get("value", "")
+                      for field in form.find_all("input", {"type": "hidden"}) if field.get("name")}
+            return urljoin(response.url, form.get("action") or response.url), fields
+    return response.url, {}
+
+
+def create_auth_session(config=None):
+    """
+    Creates a logged-in session from a config dict, a config file path, or the
+    environment. Pass it as `session` to the crawl functions or Yirabot methods.
+
+    Returns:
+        AuthSession: The session, logged in unless imported cookies may still be valid.
+    """
+    if not isinstance(config, dict):
+        config = load_auth_config(config)
+    return AuthSession(config).start()
+
+
+def fetch_crawl_page(url, process_page=None, session=None, max_bytes=MAX_CONTENT_BYTES):
+    """
+    Fetches one page of a site crawl and extracts its crawl data.
+
+    Returns:
+        tuple: The crawl data (without sitemap URLs) and the page's internal links.
+    """
+    response, body = fetch_page(url, session=session, headers={'User-Agent': get_random_user_agent()},
+                                max_bytes=max_bytes)
+    dynamic_delay(response, script=True)
+    response.raise_for_status()
+    soup = BeautifulSoup(body, "html5lib", from_encoding=get_body_encoding(response, body))
+    data = extract_page_data(soup, url)
+    return data, data['internal_links']
+
+
+def authenticated_crawl(url, config=None, output=None, max_pages=500, workers=8, force=False, scope=None):
+    """
+    Logs in without prompting and crawls the site's internal links concurrently on the
+    shared session, writing one NDJSON line per page.
+
+    Args:
+        url (str): The start page.
+        config (str or dict, optional): Auth config file path or dict; defaults to the environment.
+        output (str, optional): Path of the NDJSON file to write.
+        max_pages (int): Maximum number of pages to fetch.
+        workers (int): Number of pages fetched concurrently.
+        force (bool): If True, ignores robots.txt.
+        scope (CrawlScope or str, optional): Scope filter, or the path of a JSON scope file.
+
+    Returns:
+        None: Outputs to the console and a file.
+    """
+    if output is None:
+        safe_url = url.replace("https://", "").replace("http://", "").replace("/", "_")
+        output = f"{safe_url}.{datetime.now().strftime('%Y-%m-%d')}.auth-crawl.ndjson"
+
+    session = create_auth_session(config)
+    print(f"YiraBot: Session Started ({'reused saved cookies' if session.cookies_loaded else 'logged in'}).")
+    pages = failures = 0
+    try:
+        with open(output, "w") as file, CrawlProgress("Auth Crawl") as progress:
+            for page_url, data, _, error in crawl_site(url, seeds=[url], max_pages=max_pages, workers=workers,
+                                                       session=session, force=force, fetch=fetch_crawl_page,
+                                                       scope=scope, progress=progress):
+                record = {'url': page_url, 'error': str(error)} if error else dict(url=page_url, **data)
+                file.write(json.dumps(record) + "\n")
+                pages += 1
+                failures += bool(error)
+    except KeyboardInterrupt:
+        print("\nYiraBot: Crawl Aborted")
+    finally:
+        session.close()
+    print(f"YiraBot: {pages} pages ({failures} failed, {session.logins} logins) written to '{output}'.")
@@ -0,0 +1,253 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from .record_functions import CrawlRecord, LinkList
+from .structured_data_functions import JSONLD
+
+# ============================================================
+# CACHE FUNCTIONS
+# Extraction results cached by body hash, plus TTL caches for site state.
+# ============================================================
+
+# Bump an extractor's version whenever its output changes, so stale cache entries are ignored
+EXTRACTOR_VERSIONS = {
+    'crawl': 4,
+    'record': 4,
+    'content': 2,
+    'seo': 4,
+}
+# Default factories a cached defaultdict may have, by name
+DEFAULT_FACTORIES = {factory.__name__: factory for factory in (int, float, str, list, dict)}
+
+
+def extraction_key(extractor, body, *context):
+    """
+    Builds the cache key of an extraction: the extractor name and version and a hash of
+    the body. Extractors whose output depends on more than the body, e.g. on the page
+    URL for resolving links, pass that as context.
+
+    Args:
+        extractor (str): Name of the extractor in EXTRACTOR_VERSIONS.
+        body (bytes): The raw page body.
+        *context: Other inputs the extraction depends on.
+
+    Returns:
+        str: The cache key.
+    """
+    digest = hashlib.blake2b(body, digest_size=16)
+    for value in context:
+        digest.update(b"\0" + str(value).encode("utf-8"))
+    return f"{extractor}:{EXTRACTOR_VERSIONS[extractor]}:{digest.hexdigest()}"
+
+
+def _tag_value(value):
+    # Wraps the types plain JSON would turn into lists, dicts or strings in type tags
+    if isinstance(value, JSONLD):
+        return {'__jsonld__': str(value)}
+    if isinstance(value, CrawlRecord):
+        return {'__record__': {name: _tag_value(getattr(value, name)) for name in CrawlRecord.__slots__}}
+    if isinstance(value, LinkList):
+        return list(value)
+    if isinstance(value, tuple):
+        return {'__tuple__': [_tag_value(item) for item in value]}
+    if isinstance(value, defaultdict):
+        factory = value.default_factory
+        if DEFAULT_FACTORIES.get(getattr(factory, "__name__", None)) is not factory:
+            raise TypeError(f"Cannot cache a defaultdict of {factory!r}")
+        return {'__defaultdict__': factory.__name__,
+                'items': {key: _tag_value(item) for key, item in value.items()}}
+    if isinstance(value, dict):
+        return {key: _tag_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_tag_value(item) for item in value]
+    return value
+
+
+def _decode_object(data):
+    # json.loads hook turning type tags back into the values _tag_value wrapped
+    if '__tuple__' in data:
+        return tuple(data['__tuple__'])
+    if '__jsonld__' in data:
+        return JSONLD(data['__jsonld__'])
+    if '__defaultdict__' in data:
+        return defaultdict(DEFAULT_FACTORIES[data['__defaultdict__']], data['items'])
+    if '__record__' in data:
+        return CrawlRecord(**data['__record__'])
+    return data
+
+
+def encode_extraction(result):
+    """
+    Serializes an extraction result to JSON. Tuples, defaultdicts, JSON-LD scripts and
+    CrawlRecords are stored with type tags, so they are decoded to the same types.
+    """
+    return json.dumps(_tag_value(result))
+
+
+def decode_extraction(value):
+    """
+    Reads an extraction result written by encode_extraction.
+    """
+    return json.loads(value, object_hook=_decode_object)
+
+
+class ExtractionCache:
+    """
+    Caches extraction results so a body that was already seen skips parsing and
+    extraction entirely. An in-memory LRU sits in front of an optional SQLite store
+    that persists across runs. Values are stored as JSON text, so callers always get
+    a fresh copy they are free to modify, and reading a cache file never runs code.
+    A miss returns a decoded copy too, so results have the same types either way.
+    """
+
+    def __init__(self, max_entries=1024, path=None):
+        """
+        Args:
+            max_entries (int): Number of results kept in memory.
+            path (str, optional): Path of the SQLite file backing the memory cache.
+        """
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.connection = None
+        if path:
+            self.connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS extraction_results (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _remember(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def get(self, key):
+        """
+        Returns the cached result for a key, or None if it is not cached.
+        """
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return decode_extraction(value)
+            if self.connection is not None:
+                row = self.connection.execute("SELECT value FROM extraction_results WHERE key = ?",
+                                              (key,)).fetchone()
+                if row:
+                    try:
+                        result = decode_extraction(row[0])
+                    except ValueError:
+                        result = None  # A damaged row is treated as a miss and overwritten
+                    if result is not None:
+                        self._remember(key, row[0])
+                        self.disk_hits += 1
+                        return result
+            self.misses += 1
+            return None
+
+    def put(self, key, result):
+        """
+        Stores a result and returns its encoded form.
+        """
+        value = encode_extraction(result)
+        with self.lock:
+            self._remember(key, value)
+            if self.connection is not None:
+                self.connection.execute("INSERT OR REPLACE INTO extraction_results (key, value) VALUES (?, ?)",
+                                        (key, value))
+        return value
+
+    def extract(self, extractor, body, compute, *context):
+        """
+        Returns the cached result of an extraction, running `compute` only on a miss.
+
+        Args:
+            extractor (str): Name of the extractor in EXTRACTOR_VERSIONS.
+            body (bytes): The raw page body.
+            compute (callable): Parses the body and returns the extraction result.
+            *context: Other inputs the extraction depends on (see extraction_key).
+
+        Returns:
+            The extraction result, decoded from the cache on a hit and on a miss alike.
+        """
+        key = extraction_key(extractor, body, *context)
+        result = self.get(key)
+        if result is None:
+            result = decode_extraction(self.put(key, compute()))
+        return result
+
+    def stats(self):
+        """
+        Returns hit and miss counters; the hit rate helps choosing max_entries.
+        """
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            if self.connection is not None:
+                self.connection.execute("DELETE FROM extraction_results")
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+class TTLCache:
+    """
+    Small thread-safe cache whose entries expire after `ttl` seconds, for per-site state
+    such as robots.txt rules and sitemaps that should be fetched once per site, not once
+    per page.
+    """
+
+    def __init__(self, ttl=3600, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the cached value, or None if it is missing or expired.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        """
+        Returns the cached value, computing and caching it when it is missing or expired.
+        """
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,206 @@
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.connection import allowed_gai_family
+
+# ============================================================
+# CONNECTION FUNCTIONS
+# DNS caching, connection pooling and prewarming for many-host workloads.
+# ============================================================
+
+DNS_TTL = 300
+PREWARM_LOOKAHEAD = 8
+
+
+class DNSCache:
+    """
+    Caches successful socket.getaddrinfo results for a fixed time to live. The system
+    resolver does not report record TTLs, so every answer is kept for `ttl` seconds.
+    Failed lookups are never cached, so a host that comes back resolves again at once.
+    While installed, connections opened in this process resolve through the cache;
+    installs are counted, and the original resolver is restored once every install
+    has been matched by an uninstall.
+    """
+
+    def __init__(self, ttl=DNS_TTL, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._getaddrinfo = None
+        self._installs = 0
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        """
+        Drop-in replacement for socket.getaddrinfo that answers from the cache when it can.
+        """
+        key = (host, port, family, type, proto, flags)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                result = entry[1]
+            else:
+                self.misses += 1
+                result = None
+        if result is not None:
+            return list(result)
+
+        resolve = self._getaddrinfo or socket.getaddrinfo
+        result = resolve(host, port, family, type, proto, flags)
+        self._store(key, now + self.ttl, tuple(result))
+        return list(result)
+
+    def _store(self, key, expires, result):
+        with self.lock:
+            self.entries[key] = (expires, result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def resolve(self, host, port):
+        """
+        Resolves a host the same way urllib3 does, so the answer is cached for its next connection.
+        """
+        return self.getaddrinfo(host, port, allowed_gai_family(), socket.SOCK_STREAM)
+
+    def install(self):
+        """
+        Routes socket.getaddrinfo through the cache until the matching uninstall call.
+        """
+        with self.lock:
+            self._installs += 1
+            if self._getaddrinfo is None:
+                self._getaddrinfo = socket.getaddrinfo
+                socket.getaddrinfo = self.getaddrinfo
+
+    def uninstall(self):
+        """
+        Undoes one install call, restoring the original socket.getaddrinfo after the last one.
+        """
+        with self.lock:
+            self._installs = max(self._installs - 1, 0)
+            if self._installs == 0 and self._getaddrinfo is not None:
+                socket.getaddrinfo = self._getaddrinfo
+                self._getaddrinfo = None
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses}
+
+
+DEFAULT_DNS_CACHE = DNSCache()
+
+
+def create_pooled_session(hosts=256, connections_per_host=10):
+    """
+    Creates a session that keeps connection pools for many hosts at once. The requests
+    default only keeps pools for 10 hosts, so connections to a long list of hosts are
+    dropped before they can be reused.
+
+    Args:
+        hosts (int): Number of hosts whose connection pools are kept.
+        connections_per_host (int): Maximum number of idle connections kept per host.
+
+    Returns:
+        Session: The configured session.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=hosts, pool_maxsize=connections_per_host)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class ConnectionPrewarmer:
+    """
+    Resolves upcoming hosts and opens (TCP and TLS) connections to them in the
+    background, placing each connection in the session's pool. By the time a request
+    reaches the host, DNS, connect and handshake are already done. Every origin is
+    warmed once; warming is best effort and failures are ignored, the real request
+    reports them. The DNS cache is only installed until the prewarmer is closed.
+    """
+
+    def __init__(self, session, workers=4, lookahead=PREWARM_LOOKAHEAD, dns_cache=DEFAULT_DNS_CACHE):
+        """
+        Args:
+            session (Session): The session whose connection pools are warmed.
+            workers (int): Number of connections opened concurrently.
+            lookahead (int): Number of upcoming URLs to warm, for callers that use prewarm_ahead.
+            dns_cache (DNSCache, optional): Cache that is installed until close() and filled.
+                None skips DNS caching.
+        """
+        self.session = session
+        self.lookahead = lookahead
+        self.dns_cache = dns_cache
+        self.warmed = set()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        if dns_cache is not None:
+            dns_cache.install()
+
+    def prewarm(self, urls):
+        """
+        Starts warming the origins of the given URLs that have not been warmed yet.
+        """
+        for url in urls:
+            parts = urlsplit(url)
+            origin = (parts.scheme, parts.netloc)
+            if parts.scheme in ("http", "https") and parts.hostname and origin not in self.warmed:
+                self.warmed.add(origin)
+                self.executor.submit(self._warm, url, parts)
+
+    def prewarm_ahead(self, urls, position):
+        """
+        Warms the `lookahead` URLs that follow `position` in a list being processed in order.
+        """
+        self.prewarm(urls[position + 1:position + 1 + self.lookahead])
+
+    def _warm(self, url, parts):
+        try:
+            if self.dns_cache is not None:
+                self.dns_cache.resolve(parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+            if self.session.proxies or requests.utils.get_environ_proxies(url):
+                return  # Connections go to the proxy, not to the host
+            adapter = self.session.get_adapter(url)
+            if hasattr(adapter, "get_connection_with_tls_context"):  # requests >= 2.32
+                request = requests.Request("GET", url).prepare()
+                pool = adapter.get_connection_with_tls_context(request, self.session.verify)
+            else:
+                pool = adapter.get_connection(url)
+        except (OSError, ValueError, requests.exceptions.RequestException):
+            return
+
+        connection = pool._get_conn()
+        try:
+            if connection.sock is None:
+                connection.connect()
+        except Exception:
+            connection.close()
+        finally:
+            pool._put_conn(connection)
+
+    def close(self):
+        if self.executor is None:
+            return
+        self.executor.shutdown(wait=False)
+        self.executor = None
+        if self.dns_cache is not None:
+            self.dns_cache.uninstall()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
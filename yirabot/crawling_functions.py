@@ -1,10 +1,26 @@
 from getpass import getpass
 from requests.exceptions import HTTPError, ConnectionError, Timeout, RequestException
+from . import errors
+from .auth_functions import *
 from .data_extraction_functions import *
+from .distributed_functions import *
 from .display_functions import *
+from .duplicate_functions import *
 from .helper_functions import *
+from .http2_functions import *
+from .link_graph_functions import *
+from .monitor_functions import *
+from .performance_functions import *
+from .replay_functions import *
+from .request_functions import *
+from .rules_functions import *
+from .scope_functions import *
 from .saving_functions import *
 from .seo_functions import *
+from .server_functions import *
+from .site_audit_functions import *
+from .structured_data_functions import *
+from .warc_functions import *
 
 
 # ============================================================
@@ -13,7 +29,8 @@ from .seo_functions import *
 # ============================================================
 
 
-def crawl(url, extract=False, extract_json=False, session=None, mobile=False):
+def crawl(url, extract=False, extract_json=False, session=None, mobile=False, max_bytes=MAX_CONTENT_BYTES,
+          head_only=False, fields=None, warc=None, rules=None):
     """
     Crawls a given URL, extracting various information like metadata, links, and images,
     and optionally saves the data to a file in text or JSON format.
@@ -24,12 +41,29 @@ def crawl(url, extract=False, extract_json=False, session=None, mobile=False):
         extract_json (bool): If True, saves extracted data in JSON format. Defaults to False.
         session (Session, optional): A session object for authenticated requests.
         mobile (bool): If True, uses a mobile user agent for the request.
+        max_bytes (int, optional): Maximum page size in bytes. None disables the limit.
+        head_only (bool): If True, downloads and parses only the page <head> and extracts its metadata.
+        fields (str or list, optional): Only extracts these fields (see CRAWL_FIELDS). Stops at
+            </head> when all of them are found there, unless the page is archived to a WARC.
+        warc (WARCWriter, optional): If given, the full response is archived to it. Cannot be
+            combined with head_only, which never downloads the full response.
+        rules (RuleSet or str, optional): Custom extraction rules, or the path of a JSON rules file.
+            Rules need the whole page, so head_only without fields cannot apply them.
 
     Returns:
         None: Outputs to the console or files, based on parameters.
     """
     # Set user agent based on the 'mobile' flag
     headers = {'User-Agent': get_random_user_agent(mobile=mobile)}
+    rules = load_rules(rules)
+    rule_names = rules.names if rules else ()
+    fields = parse_fields(fields, CRAWL_FIELDS + rule_names)
+    if head_only and warc is not None:
+        raise ValueError("warc cannot be combined with head_only")
+    if head_only and rules and not fields:
+        raise ValueError("rules cannot be combined with head_only")
+    # The fast path stops at </head>, so it is only taken when nothing has to be archived
+    head_only = head_only or bool(fields and HEAD_FIELDS.issuperset(fields) and warc is None)
 
     try:
         # Check if crawling is allowed by robots.txt
@@ -37,8 +71,13 @@ def crawl(url, extract=False, extract_json=False, session=None, mobile=False):
             print("YiraBot: Crawling forbidden by robots.txt")
             return
 
-        # Make the request using a session if provided, else use requests.get
-        response = session.get(url, headers=headers) if session else requests.get(url, headers=headers, timeout=10)
+        # Stream the page, rejecting non-HTML and oversized responses before the body is read
+        if head_only:
+            response, data = fetch_head_data(url, session=session, headers=headers, max_bytes=max_bytes)
+        else:
+            response, body = fetch_page(url, session=session, headers=headers, max_bytes=max_bytes)
+            if warc is not None:
+                warc.write_response(url, response, body)
 
         # Handle server-induced delays
         dynamic_delay(response)
@@ -49,11 +88,20 @@ def crawl(url, extract=False, extract_json=False, session=None, mobile=False):
         # Raise an exception for bad responses
         response.raise_for_status()
 
-        # Parse the response content with BeautifulSoup
-        soup = BeautifulSoup(response.text, features="html5lib")
-
-        # Extract data from the parsed HTML
-        data = extract_crawl_data(soup, url)
+        if not head_only:
+            # Parse the response content with BeautifulSoup
+            soup = BeautifulSoup(body, features="html5lib", from_encoding=get_body_encoding(response, body))
+
+            # Extract data from the parsed HTML; custom rules reuse the same parsed page
+            if fields:
+                data = extract_crawl_fields(soup, url, tuple(field for field in fields if field not in rule_names))
+            else:
+                data = extract_crawl_data(soup, url)
+            if rules:
+                data.update(rules.extract(soup, [field for field in fields if field in rule_names] if fields else None))
+                data = project_fields(data, fields)
+        else:
+            data = project_fields(data, fields)
 
         # Save or display the extracted data
         if extract or extract_json:
@@ -63,11 +111,14 @@ def crawl(url, extract=False, extract_json=False, session=None, mobile=False):
 
     except (HTTPError, ConnectionError, Timeout, RequestException) as e:
         print(f"YiraBot: Error occurred: {e}")
+    except (errors.ContentTypeError, errors.ContentTooLargeError) as e:
+        print(f"YiraBot: Skipped: {e}")
     except Exception as e:
         print(f"YiraBot: An unexpected error occurred: {e}")
 
 
-def crawl_content(url, extract=False, extract_json=False, session=None, mobile=False):
+def crawl_content(url, extract=False, extract_json=False, session=None, mobile=False, max_bytes=MAX_CONTENT_BYTES,
+                  index=None, display=True, fields=None, rules=None, warc=None):
     """
     Crawls a URL specifically for its main content, such as paragraphs, headings, and lists,
     and optionally saves the data in text or JSON format.
@@ -77,20 +128,38 @@ def crawl_content(url, extract=False, extract_json=False, session=None, mobile=F
         extract (bool): If True, saves extracted data in text format. Defaults to False.
         extract_json (bool): If True, saves extracted data in JSON format. Defaults to False.
         session (requests.Session, optional): A session object for authenticated requests.
+        max_bytes (int, optional): Maximum page size in bytes. None disables the limit.
+        index (LSHIndex, optional): If given, the page's content fingerprint is added to this
+            near-duplicate index.
+        display (bool): If False, the extracted data is neither displayed nor saved.
+        fields (str or list, optional): Only extracts these fields (see CONTENT_FIELDS).
+        rules (RuleSet or str, optional): Custom extraction rules, or the path of a JSON rules file.
+        warc (WARCWriter, optional): If given, the full response is archived to it.
 
     Returns:
-        None: Outputs to the console or files, based on parameters.
+        Exception: The error that stopped the page after it was reported, or None on
+        success. Outputs to the console or files, based on parameters.
     """
     headers = {'User-Agent': get_random_user_agent(mobile=mobile)}
+    rules = load_rules(rules)
+    rule_names = rules.names if rules else ()
+    fields = parse_fields(fields, CONTENT_FIELDS + rule_names)
+    # The title alone is found in <head>, so the download can stop there unless it is archived
+    head_only = fields == ('title',) and index is None and warc is None
 
     try:
         # Check if the URL is allowed by robots.txt
         if not is_allowed_by_robots_txt(url):
             print("YiraBot: Crawling forbidden by robots.txt")
-            return
+            return errors.RobotsError(url)
 
-        # Perform the request with the provided session or a new session
-        response = session.get(url, headers=headers, timeout=10) if session else requests.get(url, headers=headers, timeout=10)
+        # Stream the page, rejecting non-HTML and oversized responses before the body is read
+        if head_only:
+            response, head = fetch_head_data(url, session=session, headers=headers, max_bytes=max_bytes)
+        else:
+            response, body = fetch_page(url, session=session, headers=headers, max_bytes=max_bytes)
+            if warc is not None:
+                warc.write_response(url, response, body)
 
         # Handle server-induced delays
         dynamic_delay(response)
@@ -101,22 +170,38 @@ def crawl_content(url, extract=False, extract_json=False, session=None, mobile=F
         # Check for successful response
         response.raise_for_status()
 
-        # Parse the response content
-        soup = BeautifulSoup(response.text, features="html5lib")
+        if head_only:
+            data = {'title': head['title']}
+        else:
+            # Parse the response content
+            soup = BeautifulSoup(body, features="html5lib", from_encoding=get_body_encoding(response, body))
+
+            # Extract content data from the parsed HTML; the fingerprint needs every field
+            data = extract_content_data(soup, CONTENT_FIELDS if fields is None or index is not None else
+                                        tuple(field for field in fields if field not in rule_names))
+            if rules:
+                data.update(rules.extract(soup, [field for field in fields if field in rule_names] if fields else None))
 
-        # Extract content data from the parsed HTML
-        data = extract_content_data(soup)
+            # Fingerprint the content for near-duplicate detection
+            if index is not None:
+                index_page_content(index, url, soup, data)
+            data = project_fields(data, fields)
 
         # Decide whether to save or display the extracted data
         if extract or extract_json:
             save_crawl_data(data, url, extract, extract_json)
-        else:
+        elif display:
             display_crawl_data(data)
 
     except (HTTPError, ConnectionError, Timeout, RequestException) as e:
         print(f"YiraBot: Error occurred: {e}")
+        return e
+    except (errors.ContentTypeError, errors.ContentTooLargeError) as e:
+        print(f"YiraBot: Skipped: {e}")
+        return e
     except Exception as e:
         print(f"YiraBot: An unexpected error occurred: {e}")
+        return e
 
 
 def crawl_protected_page():
@@ -180,28 +265,157 @@ def crawl_protected_page():
         print("\nYiraBot: Session Stopped")
 
 
-def get_html(url):
+def find_duplicate_content(url, session=None, scope=None):
+    """
+    Scrapes every page listed in the site's sitemap, clusters near-duplicate pages
+    and displays the clusters with the canonical URL each page declares.
+
+    Args:
+        url (str): The site URL whose sitemap is used.
+        session (Session, optional): A session object for authenticated requests.
+        scope (CrawlScope or str, optional): Only sitemap pages in this scope are compared.
+
+    Returns:
+        None: Outputs to the console.
+    """
+    urls = parse_sitemap(url, scope=scope)
+    if not urls:
+        print("YiraBot: No sitemap URLs found.")
+        return
+
+    index = LSHIndex()
+    print(f"YiraBot: Fingerprinting {len(urls)} pages.")
+    with CrawlProgress("Fingerprinting") as progress:
+        for position, page_url in enumerate(urls):
+            error = crawl_content(page_url, session=session, index=index, display=False)
+            progress.advance(page_url, error, len(urls) - position - 1)
+    display_duplicate_report(index.report())
+    if index.empty_pages:
+        print(f"YiraBot: {len(index.empty_pages)} pages had too little text to compare.")
+
+
+def seo_site_analysis(url, session=None, scope=None):
+    """
+    Audits every page of a site for SEO issues and displays the site-level findings.
+    Per-page results are written to an NDJSON file and the summary to a JSON file.
+
+    Args:
+        url (str): The site URL.
+        session (Session, optional): A session object for authenticated requests.
+        scope (CrawlScope or str, optional): Only pages in this scope are audited.
+
+    Returns:
+        None: Outputs to the console and files.
+    """
+    safe_url = url.replace("https://", "").replace("http://", "").replace("/", "_")
+    filename = f"{safe_url}.{datetime.now().strftime('%Y-%m-%d')}"
+    try:
+        print("YiraBot: Starting Site SEO Audit")
+        with CrawlProgress("SEO Audit") as progress:
+            summary = audit_site(url, output=f"{filename}.seo-pages.ndjson", session=session, scope=scope,
+                                 progress=progress)
+        write_to_file(summary, f"{filename}.seo-summary.json", jsonify=True)
+        display_site_audit_summary(summary)
+        print(f"YiraBot: Per-page results written to '{filename}.seo-pages.ndjson'.")
+    except KeyboardInterrupt:
+        print("\nYiraBot: Audit Aborted")
+
+
+def page_weight_analysis(url, session=None):
+    """
+    Measures a page's TTFB, transfer time and total weight and displays its oversized
+    assets and render-blocking resources.
+
+    Args:
+        url (str): The page URL.
+        session (Session, optional): A session object for authenticated requests.
+
+    Returns:
+        None: Outputs to the console.
+    """
+    try:
+        print("YiraBot: Starting Performance Analysis")
+        display_page_weight_report(analyze_page_weight(url, session=session))
+    except (RequestException, errors.ContentTypeError, errors.ContentTooLargeError) as e:
+        print(f"Error occurred during performance analysis: {e}")
+
+
+def site_page_weight_analysis(url, session=None, scope=None):
+    """
+    Audits the performance of every page of a site and displays the site-level findings.
+    Per-page results are written to an NDJSON file and the summary to a JSON file.
+
+    Args:
+        url (str): The site URL.
+        session (Session, optional): A session object for authenticated requests.
+        scope (CrawlScope or str, optional): Only pages in this scope are audited.
+
+    Returns:
+        None: Outputs to the console and files.
+    """
+    safe_url = url.replace("https://", "").replace("http://", "").replace("/", "_")
+    filename = f"{safe_url}.{datetime.now().strftime('%Y-%m-%d')}"
+    try:
+        print("YiraBot: Starting Site Performance Audit")
+        with CrawlProgress("Performance Audit") as progress:
+            summary = audit_page_weight(url, output=f"{filename}.perf-pages.ndjson", session=session, scope=scope,
+                                        progress=progress)
+        write_to_file(summary, f"{filename}.perf-summary.json", jsonify=True)
+        display_page_weight_summary(summary)
+        print(f"YiraBot: Per-page results written to '{filename}.perf-pages.ndjson'.")
+    except KeyboardInterrupt:
+        print("\nYiraBot: Audit Aborted")
+
+
+def link_graph_analysis(url, session=None, scope=None):
+    """
+    Crawls a site's internal links and displays its link graph metrics: PageRank,
+    click depth from the homepage, inbound link counts and orphan sitemap pages.
+
+    Args:
+        url (str): The homepage URL.
+        session (Session, optional): A session object for authenticated requests.
+        scope (CrawlScope or str, optional): Only pages in this scope are crawled.
+
+    Returns:
+        None: Outputs to the console.
+    """
+    try:
+        print("YiraBot: Building Internal Link Graph")
+        with CrawlProgress("Link Graph") as progress:
+            report = analyze_link_graph(url, session=session, scope=scope, progress=progress)
+        display_link_graph_report(report)
+    except KeyboardInterrupt:
+        print("\nYiraBot: Crawl Aborted")
+
+
+def get_html(url, max_bytes=MAX_CONTENT_BYTES, warc=None):
     """
     Downloads the complete HTML content of the specified URL and saves it as an HTML file.
+    The body is streamed to disk in chunks instead of being held in memory.
 
     Args:
         url (str): The URL of the webpage to download.
+        max_bytes (int, optional): Maximum page size in bytes. None disables the limit.
+        warc (WARCWriter, optional): If given, the response is appended to this WARC
+            archive, headers included, instead of being saved as its own HTML file.
 
     Returns:
         None: The function saves the HTML content to a file and outputs the file name.
     """
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()  # Ensure the request was successful
-        html = response.text
+        if warc is not None:
+            path = download_to_warc(url, warc, max_bytes=max_bytes)
+            print(f"YiraBot: Archived to '{path}'.")
+            return
 
         # Create a safe filename from the URL and current timestamp
         safe_url = url.replace("https://", "").replace("http://", "").replace("/", "_")
         timestamp = datetime.now().strftime("%Y-%m-%d")
         filename = f"{safe_url}.{timestamp}.html"
 
-        # Use the write_to_file function, assuming it supports HTML content
-        write_to_file(html, filename, html=True)
+        # Stream the response body straight into the file
+        download_to_file(url, filename, max_bytes=max_bytes)
 
         print(f"YiraBot: HTML file '{filename}' created.")
 
@@ -213,5 +427,7 @@ def get_html(url):
         print("YiraBot Error: Timeout occurred while trying to get HTML.")
     except requests.exceptions.RequestException as e:
         print(f"YiraBot Error: An error occurred while trying to get HTML. {e}")
+    except (errors.ContentTypeError, errors.ContentTooLargeError) as e:
+        print(f"YiraBot Error: {e}")
     except Exception as e:
         print(f"YiraBot Error: An unexpected error occurred. {e}")
@@ -1,6 +1,19 @@
-from urllib.parse import urljoin
+import codecs
+from collections import deque
+from datetime import datetime, timezone
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
 import requests
 from bs4 import BeautifulSoup
+from . import errors
+from .request_functions import (fetch_page, open_stream, iter_body, get_body_encoding, MAX_CONTENT_BYTES,
+                                SITEMAP_MAX_BYTES)
+from .retry_functions import DEFAULT_RETRY_POLICY
+from .scope_functions import load_scope
+from .structured_data_functions import extract_structured_data
+
+# Tags that may appear inside <head>; any other start tag means the head has ended
+HEAD_TAGS = {"html", "head", "title", "meta", "link", "style", "script", "noscript", "base", "template"}
 
 
 def extract_crawl_data(soup, url):
@@ -15,78 +28,352 @@ def extract_crawl_data(soup, url):
     Returns:
     - dict: A dictionary with the extracted data, including favicon, meta description, title,
       open graph tags, Twitter card tags, canonical URL, internal and external links, image URLs,
-      and sitemap URLs.
-    """
-    # Extract favicon, meta description, and title
-    favicon_tag = soup.find("link", {"rel": "icon"})
-    meta_description_tag = soup.find("meta", {"name": "description"})
-    title_tag = soup.find("title")
-
-    # Extract Open Graph and Twitter card tags
-    og_tags = [str(tag) for tag in soup.find_all("meta", property=lambda x: x and x.startswith("og:"))]
-    twitter_tags = [str(tag) for tag in soup.find_all("meta", attrs={"name": lambda x: x and x.startswith("twitter:")})]
-
-    # Extract canonical URL
-    canonical_tag = soup.find("link", {"rel": "canonical"})
-
-    # Extract internal and external links
-    internal_links, external_links = extract_links(soup, url)
-
-    # Extract image URLs
-    images = [img['src'] for img in soup.find_all('img', src=True)]
-
-    # Compile extracted data into a dictionary
-    extracted_data = {
-        'favicon': favicon_tag.get("href") if favicon_tag else None,
-        'meta_description': meta_description_tag.get("content") if meta_description_tag else None,
-        'title': title_tag.get_text() if title_tag else None,
-        'open_graph_tags': og_tags,
-        'twitter_card_tags': twitter_tags,
-        'canonical_url': canonical_tag.get("href") if canonical_tag else None,
-        'internal_links': internal_links,
-        'external_links': external_links,
-        'image_urls': images,
-        'sitemap_urls': parse_sitemap(url)
-    }
+      structured data (JSON-LD, microdata and RDFa), and sitemap URLs.
+    """
+    extracted_data = extract_page_data(soup, url)
+    extracted_data['sitemap_urls'] = parse_sitemap(url)
+    return extracted_data
+
+
+def _tag_attribute(tag, attribute, default=None):
+    return tag.get(attribute, default) if tag else None
+
+
+def _tag_text(tag):
+    return tag.get_text() if tag else None
+
 
+# Extractors of the crawl fields that come from the page itself; links are extracted separately
+PAGE_FIELD_EXTRACTORS = {
+    'favicon': lambda soup: _tag_attribute(soup.find("link", {"rel": "icon"}), "href"),
+    'meta_description': lambda soup: _tag_attribute(soup.find("meta", {"name": "description"}), "content"),
+    'title': lambda soup: _tag_text(soup.find("title")),
+    'open_graph_tags': lambda soup: [str(tag) for tag in
+                                     soup.find_all("meta", property=lambda x: x and x.startswith("og:"))],
+    'twitter_card_tags': lambda soup: [str(tag) for tag in
+                                       soup.find_all("meta", attrs={"name": lambda x: x and x.startswith("twitter:")})],
+    'canonical_url': lambda soup: _tag_attribute(soup.find("link", {"rel": "canonical"}), "href"),
+    'image_urls': lambda soup: [img['src'] for img in soup.find_all('img', src=True)],
+    'viewport': lambda soup: _tag_attribute(soup.find("meta", {"name": "viewport"}), "content", ""),
+    'language': lambda soup: _tag_attribute(soup.find("html"), "lang"),
+    'structured_data': extract_structured_data,
+}
+LINK_FIELDS = ('internal_links', 'external_links')
+
+# Fields of extract_page_data, in output order
+PAGE_FIELDS = ('favicon', 'meta_description', 'title', 'open_graph_tags', 'twitter_card_tags', 'canonical_url',
+               'internal_links', 'external_links', 'image_urls', 'structured_data')
+# Fields that can be requested from crawl; viewport and language are only returned when requested
+CRAWL_FIELDS = PAGE_FIELDS + ('sitemap_urls', 'viewport', 'language')
+# Crawl fields found in <head>; requesting only these stops downloading and parsing at </head>
+HEAD_FIELDS = frozenset(('favicon', 'meta_description', 'title', 'open_graph_tags', 'twitter_card_tags',
+                         'canonical_url', 'viewport', 'language'))
+CONTENT_FIELDS = ('title', 'paragraphs', 'headings', 'lists')
+FIELD_ALIASES = {
+    'canonical': 'canonical_url',
+    'description': 'meta_description',
+    'og': 'open_graph_tags',
+    'twitter': 'twitter_card_tags',
+    'images': 'image_urls',
+    'sitemap': 'sitemap_urls',
+    'schema': 'structured_data',
+}
+
+
+def parse_fields(fields, available):
+    """
+    Normalizes a field projection: a comma-separated string or a list of field names,
+    with the short aliases of FIELD_ALIASES accepted.
+
+    Parameters:
+    - fields (str or list): The requested fields, or None for all fields.
+    - available (tuple): The fields that can be requested.
+
+    Returns:
+    - tuple: The requested fields without duplicates, in request order, or None.
+
+    Raises:
+    - ValueError: If a field is unknown or no field is requested.
+    """
+    if fields is None:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    parsed = []
+    for field in fields:
+        field = field.strip()
+        if field in FIELD_ALIASES and FIELD_ALIASES[field] in available:
+            field = FIELD_ALIASES[field]
+        if not field or field in parsed:
+            continue
+        if field not in available:
+            raise ValueError(f"Unknown field '{field}', expected one of: {', '.join(available)}")
+        parsed.append(field)
+    if not parsed:
+        raise ValueError("No fields requested")
+    return tuple(parsed)
+
+
+def project_fields(data, fields):
+    """
+    Returns only the requested fields of a result, in request order; all of it when fields is None.
+    """
+    return data if fields is None else {field: data[field] for field in fields}
+
+
+def extract_page_data(soup, url, fields=PAGE_FIELDS):
+    """
+    Extracts the part of the crawl data that comes from the page itself, i.e. everything
+    but the sitemap URLs, which need a request of their own.
+
+    Parameters:
+    - soup (BeautifulSoup): BeautifulSoup object of the crawled page.
+    - url (str): The URL being crawled, used to resolve and classify links.
+    - fields (tuple): The fields to extract; other extractors are skipped.
+
+    Returns:
+    - dict: The crawl data without 'sitemap_urls'.
+    """
+    extracted_data = {}
+    links = None
+    for field in fields:
+        if field in LINK_FIELDS:
+            # Internal and external links come from one pass over the anchors
+            if links is None:
+                links = extract_links(soup, url)
+            extracted_data[field] = links[LINK_FIELDS.index(field)]
+        else:
+            extracted_data[field] = PAGE_FIELD_EXTRACTORS[field](soup)
     return extracted_data
 
 
-def extract_content_data(soup):
+def extract_crawl_fields(soup, url, fields):
+    """
+    Extracts only the requested crawl fields. The sitemap is only fetched when
+    'sitemap_urls' is requested.
+
+    Parameters:
+    - soup (BeautifulSoup): BeautifulSoup object of the crawled page.
+    - url (str): The URL being crawled.
+    - fields (tuple): The requested fields, see parse_fields.
+
+    Returns:
+    - dict: The requested fields.
+    """
+    data = extract_page_data(soup, url, tuple(field for field in fields if field != 'sitemap_urls'))
+    if 'sitemap_urls' in fields:
+        data['sitemap_urls'] = parse_sitemap(url)
+    return project_fields(data, fields)
+
+
+def format_meta_tag(attrs):
+    """
+    Renders meta tag attributes the same way BeautifulSoup stringifies a <meta> tag,
+    so head-only results match the output of extract_crawl_data.
+
+    Parameters:
+    - attrs (dict): The tag attributes.
+
+    Returns:
+    - str: The serialized tag, e.g. '<meta content="Title" property="og:title"/>'.
+    """
+    parts = []
+    for name in sorted(attrs):
+        value = attrs[name].replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+        if '"' in value:
+            value = f"'{value}'" if "'" not in value else '"' + value.replace('"', "&quot;") + '"'
+        else:
+            value = f'"{value}"'
+        parts.append(f"{name}={value}")
+    return "<meta " + " ".join(parts) + "/>"
+
+
+class _HeadComplete(Exception):
+    """Raised inside HeadParser to stop parsing once the head has ended."""
+
+
+class HeadParser(HTMLParser):
+    """
+    Incremental parser that collects the metadata found in <head> and stops as soon
+    as the head ends, without building a document tree. Feed it the page in chunks
+    as they arrive; `done` turns True once no further input is needed.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.done = False
+        self.title = None
+        self.favicon = None
+        self.meta_description = None
+        self.canonical_url = None
+        self.viewport = None
+        self.language = None
+        self.og_tags = []
+        self.twitter_tags = []
+        self._title_parts = None
+
+    def feed(self, data):
+        if self.done:
+            return True
+        try:
+            super().feed(data)
+        except _HeadComplete:
+            self._finish()
+        return self.done
+
+    def close(self):
+        if not self.done:
+            try:
+                super().close()
+            except _HeadComplete:
+                pass
+            self._finish()
+
+    def _finish(self):
+        self.done = True
+        if self._title_parts is not None:
+            self.title = "".join(self._title_parts)
+            self._title_parts = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in HEAD_TAGS:
+            raise _HeadComplete
+        attrs = {name: value or "" for name, value in attrs}
+
+        if tag == "html" and self.language is None and "lang" in attrs:
+            self.language = attrs["lang"]
+        elif tag == "title" and self.title is None and self._title_parts is None:
+            self._title_parts = []
+        elif tag == "meta":
+            name = attrs.get("name", "")
+            if name == "description" and self.meta_description is None:
+                self.meta_description = attrs.get("content")
+            elif name == "viewport" and self.viewport is None:
+                self.viewport = attrs.get("content", "")
+            elif name.startswith("twitter:"):
+                self.twitter_tags.append(format_meta_tag(attrs))
+            if attrs.get("property", "").startswith("og:"):
+                self.og_tags.append(format_meta_tag(attrs))
+        elif tag == "link":
+            rel = attrs.get("rel", "").split()
+            if "icon" in rel and self.favicon is None:
+                self.favicon = attrs.get("href")
+            if "canonical" in rel and self.canonical_url is None:
+                self.canonical_url = attrs.get("href")
+
+    def handle_endtag(self, tag):
+        if tag == "title" and self._title_parts is not None:
+            self.title = "".join(self._title_parts)
+            self._title_parts = None
+        elif tag in ("head", "html"):
+            raise _HeadComplete
+
+    def handle_data(self, data):
+        if self._title_parts is not None:
+            self._title_parts.append(data)
+
+    def to_dict(self):
+        """
+        Returns the collected head fields, using the keys of extract_crawl_data plus
+        'viewport' and 'language'.
+        """
+        return {
+            'favicon': self.favicon,
+            'meta_description': self.meta_description,
+            'title': self.title,
+            'open_graph_tags': self.og_tags,
+            'twitter_card_tags': self.twitter_tags,
+            'canonical_url': self.canonical_url,
+            'viewport': self.viewport,
+            'language': self.language,
+        }
+
+
+def extract_head_data(html):
+    """
+    Extracts the <head> metadata of an HTML document without building a full parse tree.
+    Parsing stops at the end of the head, so the rest of the document is never scanned.
+
+    Parameters:
+    - html (str): The HTML document, or just its beginning up to </head>.
+
+    Returns:
+    - dict: favicon, meta description, title, Open Graph and Twitter card tags,
+      canonical URL, viewport and language.
+    """
+    parser = HeadParser()
+    parser.feed(html)
+    parser.close()
+    return parser.to_dict()
+
+
+def fetch_head_data(url, session=None, headers=None, timeout=10, max_bytes=MAX_CONTENT_BYTES,
+                    retry=DEFAULT_RETRY_POLICY):
+    """
+    Downloads a page only up to the end of its <head>, feeding the parser while the
+    body streams in, and returns the head metadata.
+
+    Parameters:
+    - url (str): The URL to fetch.
+    - session (Session, optional): A session object for authenticated requests.
+    - headers (dict, optional): Request headers.
+    - timeout (int): Request timeout in seconds.
+    - max_bytes (int, optional): Maximum number of bytes to read. None disables the limit.
+    - retry (RetryPolicy): Retry and circuit breaker policy for the request.
+
+    Returns:
+    - tuple: The response and the head metadata dict (see extract_head_data).
+    """
+    response = open_stream(url, session, headers, timeout, max_bytes, retry=retry)
+    parser = HeadParser()
+    decoder = None
+    try:
+        for chunk in iter_body(response, max_bytes, stop_at_head=True):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder(get_body_encoding(response, chunk))(errors="replace")
+            if parser.feed(decoder.decode(chunk)):
+                break
+        if decoder is not None:
+            parser.feed(decoder.decode(b"", final=True))
+        parser.close()
+    finally:
+        response.close()
+    return response, parser.to_dict()
+
+
+# Extractors of the scrape fields
+CONTENT_FIELD_EXTRACTORS = {
+    'title': lambda soup: _tag_text(soup.find("title")),
+    'paragraphs': lambda soup: [p.get_text().strip() for p in soup.find_all('p')],
+    'headings': lambda soup: [h.get_text().strip() for h in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])],
+    'lists': lambda soup: [ul.get_text().strip() for ul in soup.find_all(['ul', 'ol'])],
+}
+
+
+def extract_content_data(soup, fields=CONTENT_FIELDS):
     """
     Extracts main content data from a BeautifulSoup object, including titles, paragraphs,
     headings, and lists.
 
     Parameters:
     - soup (BeautifulSoup): BeautifulSoup object of the crawled page.
+    - fields (tuple): The fields to extract; other extractors are skipped.
 
     Returns:
     - dict: A dictionary with the extracted main content data.
     """
-    # Extract title, paragraphs, headings, and lists
-    title_tag = soup.find("title")
-    paragraphs = [p.get_text().strip() for p in soup.find_all('p')]
-    headings = [h.get_text().strip() for h in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])]
-    lists = [ul.get_text().strip() for ul in soup.find_all(['ul', 'ol'])]
-
-    # Compile extracted content into a dictionary
-    content_data = {
-        'title': title_tag.get_text() if title_tag else None,
-        'paragraphs': paragraphs,
-        'headings': headings,
-        'lists': lists
-    }
-
-    return content_data
+    return {field: CONTENT_FIELD_EXTRACTORS[field](soup) for field in fields}
 
 
 def extract_links(soup, base_url):
     """
     Extracts all internal and external links from a BeautifulSoup object and categorizes them.
+    Every href is resolved against the page URL (or the page's <base href>), and links
+    on the page's host are internal, whether they are written as relative or absolute URLs.
 
     Parameters:
     - soup (BeautifulSoup): BeautifulSoup object of the crawled page.
-    - base_url (str): The base URL for resolving relative links.
+    - base_url (str): The page URL, used to resolve relative links.
 
     Returns:
     - tuple: A tuple containing two lists, the first with internal links and the second with external links.
@@ -94,24 +381,32 @@ def extract_links(soup, base_url):
     internal_links = []
     external_links = []
 
-    # Normalize the base URL to prevent duplication issues
-    base_url = base_url.rstrip('/') + '/'
+    base_tag = soup.find('base', href=True)
+    if base_tag:
+        base_url = urljoin(base_url, base_tag['href'].strip())
+    host = urlsplit(base_url).netloc.lower()
 
     for link in soup.find_all('a', href=True):
-        href = link['href'].split('#')[0]  # Remove URL fragments
-        href = href.split('?')[0]  # Remove URL query parameters
+        href = link['href'].strip()
+        if not href or href.startswith('#'):
+            continue  # Links within the page itself
 
-        # Categorize and normalize links
-        if href.startswith('/'):
-            full_link = urljoin(base_url, href.lstrip('/'))
+        full_link = urljoin(base_url, href).split('#')[0]  # Remove URL fragments
+        full_link = full_link.split('?')[0]  # Remove URL query parameters
+        parts = urlsplit(full_link)
+        if parts.scheme not in ('http', 'https'):
+            continue  # mailto:, tel:, javascript: and the like
+
+        # Categorize by host
+        if parts.netloc.lower() == host:
             internal_links.append(full_link)
-        elif href.startswith('http') or href.startswith('https'):
-            external_links.append(href)
+        else:
+            external_links.append(full_link)
 
     return internal_links, external_links
 
 
-def parse_sitemap(url, script=False):
+def parse_sitemap(url, script=False, retry=DEFAULT_RETRY_POLICY, scope=None):
     """
     Parses the sitemap of a given URL to extract and return all contained URLs.
     If 'script' is True, the 'url' parameter is treated as the full sitemap link.
@@ -119,32 +414,140 @@ def parse_sitemap(url, script=False):
     Parameters:
     - url (str): The URL to the sitemap if 'script' is True, or the base URL whose sitemap is to be parsed.
     - script (bool): Indicates whether the provided URL is the direct link to the sitemap.
+    - retry (RetryPolicy): Retry and circuit breaker policy for the sitemap requests.
+    - scope (CrawlScope, optional): Only URLs in this scope are returned.
 
     Returns:
     - list: A list of URLs found in the sitemap. If no sitemap is found, returns an
             appropriate message.
     """
-    if script:
-        # Directly use the provided URL for the sitemap
+    return [entry['url'] for entry in parse_sitemap_entries(url, script, retry, scope)]
+
+
+# Valid sitemap <changefreq> values
+SITEMAP_CHANGEFREQS = ("always", "hourly", "daily", "weekly", "monthly", "yearly", "never")
+# Maximum number of child sitemaps read when a sitemap index is expanded
+MAX_CHILD_SITEMAPS = 100
+
+
+def parse_w3c_datetime(value):
+    """
+    Parses a sitemap <lastmod> value (W3C datetime: "2024-05-01", "2024-05-01T10:30:00+02:00", ...).
+
+    Parameters:
+    - value (str): The date text.
+
+    Returns:
+    - float: A Unix timestamp, or None if the value is not a valid date. Dates without a
+             time zone are read as UTC.
+    """
+    value = (value or "").strip()
+    # Year and year-month precision are allowed by the W3C format but not by fromisoformat
+    if len(value) == 4:
+        value += "-01-01"
+    elif len(value) == 7:
+        value += "-01"
+    if value.endswith(("Z", "z")):
+        value = value[:-1] + "+00:00"
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _child_text(element, name):
+    child = element.find(name, recursive=False) if element is not None else None
+    return child.text.strip() if child is not None else None
+
+
+def extract_sitemap_entries(body):
+    """
+    Reads every <loc> of a sitemap together with the lastmod, changefreq and priority
+    hints of its <url> (or <sitemap>) entry.
+
+    Parameters:
+    - body (bytes): The sitemap XML.
+
+    Returns:
+    - list: Dicts with 'url', 'lastmod' (Unix timestamp or None), 'changefreq' (one of
+            SITEMAP_CHANGEFREQS or None), 'priority' (0.0 to 1.0 or None) and 'sitemap'
+            (True for the child sitemaps listed by a sitemap index).
+    """
+    entries = []
+    for element in BeautifulSoup(body, 'xml').find_all("loc"):
+        parent = element.parent if element.parent.name in ("url", "sitemap") else None
+        changefreq = (_child_text(parent, "changefreq") or "").lower()
+        try:
+            priority = min(max(float(_child_text(parent, "priority")), 0.0), 1.0)
+        except (TypeError, ValueError):
+            priority = None
+        entries.append({
+            'url': element.text.strip(),
+            'lastmod': parse_w3c_datetime(_child_text(parent, "lastmod")),
+            'changefreq': changefreq if changefreq in SITEMAP_CHANGEFREQS else None,
+            'priority': priority,
+            'sitemap': parent is not None and parent.name == "sitemap",
+        })
+    return entries
+
+
+def _expand_sitemap_index(entries, retry, max_sitemaps):
+    # Child sitemaps are read breadth first, each once, until the budget is used up
+    pages = [entry for entry in entries if not entry['sitemap']]
+    children = deque(entry['url'] for entry in entries if entry['sitemap'])
+    seen = set(children)
+    read = 0
+    while children and read < max_sitemaps:
+        child_url = children.popleft()
+        read += 1
         try:
-            response = requests.get(url, timeout=10)
+            response, body = fetch_page(child_url, max_bytes=SITEMAP_MAX_BYTES, content_types=None, retry=retry)
+        except (requests.exceptions.RequestException, errors.ContentTooLargeError):
+            continue  # An unreachable child sitemap only loses its own URLs
+        if response.status_code != 200:
+            continue
+        for entry in extract_sitemap_entries(body):
+            if not entry['sitemap']:
+                pages.append(entry)
+            elif entry['url'] not in seen:
+                seen.add(entry['url'])
+                children.append(entry['url'])
+    return pages
+
+
+def parse_sitemap_entries(url, script=False, retry=DEFAULT_RETRY_POLICY, scope=None, expand_index=False,
+                          max_sitemaps=MAX_CHILD_SITEMAPS):
+    """
+    Like parse_sitemap, but keeps the lastmod, changefreq and priority of every URL
+    (see extract_sitemap_entries).
+
+    Parameters:
+    - url (str): The URL to the sitemap if 'script' is True, or the base URL whose sitemap is to be parsed.
+    - script (bool): Indicates whether the provided URL is the direct link to the sitemap.
+    - retry (RetryPolicy): Retry and circuit breaker policy for the sitemap requests.
+    - scope (CrawlScope, optional): Only URLs in this scope are returned.
+    - expand_index (bool): If True, the child sitemaps of a sitemap index are read and
+            their page URLs returned in place of the child sitemap URLs.
+    - max_sitemaps (int): Maximum number of child sitemaps read when expanding an index.
+
+    Returns:
+    - list: The sitemap entries, or an empty list if no sitemap is found.
+    """
+    scope = load_scope(scope)
+    # The direct sitemap link, or the standard sitemap locations of the site
+    sitemap_urls = [url] if script else [url + "/sitemap.xml", url + "/static/sitemap.xml"]
+    for sitemap_url in sitemap_urls:
+        try:
+            response, body = fetch_page(sitemap_url, max_bytes=SITEMAP_MAX_BYTES, content_types=None, retry=retry)
             if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'xml')
-                return [element.text for element in soup.find_all("loc")]
-        except requests.exceptions.RequestException:
-            return []
-    else:
-        # Standard sitemap URLs
-        sitemap_urls = [url + "/sitemap.xml", url + "/static/sitemap.xml"]
-
-        # Attempt to parse standard sitemaps
-        for sitemap_url in sitemap_urls:
-            try:
-                response = requests.get(sitemap_url, timeout=10)
-                if response.status_code == 200:
-                    soup = BeautifulSoup(response.content, 'xml')
-                    return [element.text for element in soup.find_all("loc")]
-            except requests.exceptions.RequestException:
-                continue  # Proceed to next URL on failure
-
-        return []
+                entries = extract_sitemap_entries(body)
+                if expand_index:
+                    entries = _expand_sitemap_index(entries, retry, max_sitemaps)
+                return [entry for entry in entries if scope.allows(entry['url'])] if scope else entries
+        except (requests.exceptions.RequestException, errors.ContentTooLargeError):
+            continue  # Proceed to next URL on failure
+
+    return []
@@ -1,28 +1,259 @@
 import textwrap
+import threading
+import time
+from urllib.parse import urlsplit
+from rich import get_console
 from rich.console import Console
+from rich.live import Live
 from rich.table import Table
+from .keyword_functions import TopKCounter
 
+# Longest lists and values shown in full by display_crawl_data; the saved files keep everything
+DISPLAY_MAX_ITEMS = 20
+DISPLAY_MAX_CHARS = 2000
+# textwrap is slow on very long strings, so longer values are folded by Rich instead
+WRAP_MAX_CHARS = 4000
+PROGRESS_REFRESH_PER_SECOND = 4
 
-def display_crawl_data(data):
+
+def format_display_value(value, max_items=DISPLAY_MAX_ITEMS, max_chars=DISPLAY_MAX_CHARS):
+    """
+    Formats a value for display, showing at most max_items items of a list and
+    max_chars characters, with a note of how much was left out. None disables a limit.
+    """
+    if isinstance(value, (list, tuple)):
+        shown = value if max_items is None else value[:max_items]
+        text = ', '.join(str(item) for item in shown)
+        if len(value) > len(shown):
+            text += f" ... and {len(value) - len(shown)} more"
+    else:
+        text = str(value)
+    if max_chars is not None and len(text) > max_chars:
+        text = f"{text[:max_chars]} ... ({len(text) - max_chars} more characters)"
+    return text
+
+
+def display_crawl_data(data, max_items=DISPLAY_MAX_ITEMS, max_chars=DISPLAY_MAX_CHARS):
     """
-    Displays the crawled data in a structured table format using Rich library.
+    Displays the crawled data in a structured table format using Rich library. Long
+    lists (such as the links of a large page) are cut to their first max_items items
+    before they are joined, so the table renders quickly however big the page is.
+    When stdout is not a terminal, the same values are printed as plain "Key: value"
+    lines instead, so piped output has no table borders or markup.
 
     Parameters:
     - data (dict): The data to be displayed, expected to be a dictionary with keys
                    representing data categories and values being the corresponding data.
+    - max_items (int, optional): Most list items shown per key. None shows all of them.
+    - max_chars (int, optional): Most characters shown per value. None shows all of them.
 
     Returns:
     - None: This function outputs to the console and returns nothing.
     """
     console = Console()
+    if not console.is_terminal:
+        for key, value in data.items():
+            print(f"{key.capitalize()}: {format_display_value(value, max_items, max_chars)}")
+        return
     table = Table(show_header=True, header_style="bold blue")
     table.add_column("Key", style="dim", width=22)
     table.add_column("Value", overflow="fold")
 
     # Add data to the table, wrapping text for the 'Value' column
     for key, value in data.items():
-        value_str = ', '.join(value) if isinstance(value, list) else str(value)
-        table.add_row(key.capitalize(), textwrap.fill(value_str, width=80))
+        value_str = format_display_value(value, max_items, max_chars)
+        if len(value_str) <= WRAP_MAX_CHARS:
+            value_str = textwrap.fill(value_str, width=80)
+        table.add_row(key.capitalize(), value_str)
+    console.print(table)
+
+
+class CrawlProgress:
+    """
+    Live progress view for multi-page runs: pages done, pages per second, queue depth
+    and errors per host. Updates only change counters; the view is redrawn by Rich's
+    refresh thread at most refresh_per_second times, so rendering costs the same
+    however fast pages finish. When stdout is not a terminal the view is switched off
+    and only the counters are kept. Counters are guarded by a lock, since the refresh
+    thread reads them while pages are recorded.
+    """
+
+    def __init__(self, title="Crawling", refresh_per_second=PROGRESS_REFRESH_PER_SECOND, console=None,
+                 enabled=None, top_hosts=5):
+        """
+        Parameters:
+        - title (str): Label shown in front of the counters.
+        - refresh_per_second (float): Maximum number of redraws per second.
+        - console (Console, optional): Console to draw on; defaults to the global Rich console.
+        - enabled (bool, optional): Forces the view on or off; by default it is on for terminals only.
+        - top_hosts (int): Number of hosts listed with their error counts.
+        """
+        self.title = title
+        self.refresh_per_second = refresh_per_second
+        self.console = console or get_console()
+        self.enabled = self.console.is_terminal if enabled is None else enabled
+        self.top_hosts = top_hosts
+        self.pages = 0
+        self.errors = 0
+        self.queued = 0
+        self.host_errors = TopKCounter(100)
+        self.started = time.monotonic()
+        self.live = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        self.started = time.monotonic()
+        if self.enabled and self.live is None:
+            # The view is redrawn from this object's __rich__ method on every refresh
+            self.live = Live(self, console=self.console, refresh_per_second=self.refresh_per_second,
+                             transient=True)
+            self.live.start()
+        return self
+
+    def stop(self):
+        if self.live is not None:
+            self.live.stop()
+            self.live = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def advance(self, url, error=None, queued=None):
+        """
+        Records a finished page.
+
+        Parameters:
+        - url (str): The page URL.
+        - error (Exception, optional): The error, if the page failed.
+        - queued (int, optional): Number of pages still waiting.
+        """
+        host = urlsplit(url).netloc if error is not None else None
+        with self.lock:
+            self.pages += 1
+            if error is not None:
+                self.errors += 1
+                self.host_errors.add(host)
+            if queued is not None:
+                self.queued = queued
+
+    @property
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return self.pages / elapsed if elapsed > 0 else 0.0
+
+    def __rich__(self):
+        with self.lock:
+            pages, queued, errors = self.pages, self.queued, self.errors
+            top_hosts = self.host_errors.most_common(self.top_hosts)
+        table = Table.grid(padding=(0, 2))
+        table.add_row(f"[bold blue]{self.title}[/]", f"{pages} pages", f"{self.rate:.1f} pages/s",
+                      f"{queued} queued", f"{errors} errors")
+        for host, count in top_hosts:
+            table.add_row("", f"[red]{host}[/]", f"{count} errors")
+        return table
+
+
+def display_duplicate_report(report):
+    """
+    Displays near-duplicate page clusters in a table, one row per cluster.
+
+    Parameters:
+    - report (list): Cluster dicts as returned by LSHIndex.report().
+
+    Returns:
+    - None: This function outputs to the console and returns nothing.
+    """
+    console = Console()
+    if not report:
+        console.print("YiraBot: No near-duplicate pages found.")
+        return
+
+    table = Table(title="Near-Duplicate Content", show_header=True, header_style="bold blue")
+    table.add_column("Similarity", justify="right", width=10)
+    table.add_column("Pages (Declared Canonical)", overflow="fold")
+    table.add_column("Canonical Status", width=20)
+
+    for cluster in report:
+        pages = '\n'.join(f"{page} ({canonical or 'none'})" for page, canonical in cluster['canonicals'].items())
+        status = "Consistent" if cluster['consistent_canonical'] else "Missing/Conflicting"
+        table.add_row(f"{cluster['similarity']:.0%}", pages, status)
+    console.print(table)
+
+
+def display_site_audit_summary(summary):
+    """
+    Displays the site-level findings of a site-wide SEO audit in a table.
+
+    Parameters:
+    - summary (dict): The summary returned by audit_site.
+
+    Returns:
+    - None: This function outputs to the console and returns nothing.
+    """
+    console = Console()
+    table = Table(title="Site SEO Audit", show_header=True, header_style="bold blue")
+    table.add_column("Finding", style="dim", width=30)
+    table.add_column("Pages", justify="right")
+    table.add_column("Details", overflow="fold")
+
+    table.add_row("Pages Audited", str(summary['pages_audited']), f"{summary['pages_failed']} failed")
+    for key, label in (('duplicate_titles', "Duplicate Titles"),
+                       ('duplicate_meta_descriptions', "Duplicate Meta Descriptions")):
+        duplicates = summary[key]
+        details = '\n'.join(f"{entry['value'][:60]} ({entry['pages']} pages)" for entry in duplicates[:5])
+        table.add_row(label, str(sum(entry['pages'] for entry in duplicates)), details or "None")
+    h1 = summary['h1_distribution']
+    table.add_row("H1 Distribution", "N/A", f"none: {h1['0']}, one: {h1['1']}, multiple: {h1['2+']}")
+    table.add_row("Missing Title", str(summary['missing_title']), "")
+    table.add_row("Title Too Long", str(summary['long_title']), "")
+    table.add_row("Missing Meta Description", str(summary['missing_meta_description']), "")
+    table.add_row("Meta Description Too Long", str(summary['long_meta_description']), "")
+    table.add_row("Images without Alt Text", str(summary['pages_with_images_without_alt']),
+                  f"{summary['images_without_alt']} images")
+    table.add_row("Missing Viewport", str(summary['missing_viewport']), "")
+    table.add_row("Missing Language", str(summary['missing_language']), "")
+    table.add_row("Improper Heading Structure", str(summary['bad_heading_structure']), "")
+    schema = summary['structured_data']
+    table.add_row("Structured Data", str(schema['pages_with_structured_data']),
+                  f"{schema['pages_with_invalid_json_ld']} pages with invalid JSON-LD")
+    table.add_row("Schema Types", "N/A", '\n'.join(f"{entry['type']}: {entry['pages']} pages "
+                                                    f"({', '.join(entry['formats'])})"
+                                                    for entry in schema['types'][:10]) or "None")
+
+    console.print(table)
+
+
+def display_link_graph_report(report):
+    """
+    Displays the internal link graph metrics of a site in tables.
+
+    Parameters:
+    - report (dict): The report returned by LinkGraph.report().
+
+    Returns:
+    - None: This function outputs to the console and returns nothing.
+    """
+    console = Console()
+    console.print(f"YiraBot: {report['pages']} pages, {report['links']} internal links")
+
+    table = Table(title="Top Pages by PageRank", show_header=True, header_style="bold blue")
+    table.add_column("Page", overflow="fold")
+    table.add_column("PageRank", justify="right")
+    for url, rank in report['top_pagerank']:
+        table.add_row(url, f"{rank:.6f}")
+    console.print(table)
+
+    table = Table(title="Link Structure", show_header=True, header_style="bold blue")
+    table.add_column("Metric", style="dim", width=22)
+    table.add_column("Value", overflow="fold")
+    depths = ', '.join(f"{'unreachable' if depth == '-1' else depth}: {count}"
+                       for depth, count in report['depth_distribution'].items())
+    table.add_row("Click Depth", depths)
+    table.add_row("Least Linked Pages", '\n'.join(f"{url} ({count})" for url, count in report['least_linked'][:10]))
+    table.add_row("Orphan Pages", '\n'.join(report['orphans'][:20]) if report['orphans'] else "None")
     console.print(table)
 
 
@@ -78,3 +309,81 @@ def display_seo_results(title_length, title_status, meta_desc_length, meta_desc_
     table.add_row("Website Language", "N/A", website_language)
 
     console.print(table)
+
+
+def format_bytes(size):
+    """
+    Formats a byte count for display, e.g. 1536 as "1.5 KB".
+    """
+    for unit in ("B", "KB", "MB"):
+        if size < 1024 or unit == "MB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def display_page_weight_report(report):
+    """
+    Displays the performance report of a page in a table.
+
+    Parameters:
+    - report (dict): The report returned by analyze_page_weight.
+
+    Returns:
+    - None: This function outputs to the console and returns nothing.
+    """
+    console = Console()
+    table = Table(title="Page Weight and Performance", show_header=True, header_style="bold blue")
+    table.add_column("Aspect", style="dim", width=24)
+    table.add_column("Value", justify="right")
+    table.add_column("Details", overflow="fold")
+
+    table.add_row("Time to First Byte", f"{report['ttfb'] * 1000:.0f} ms", "")
+    table.add_row("HTML Transfer Time", f"{report['total_time'] * 1000:.0f} ms", "")
+    table.add_row("HTML Size", format_bytes(report['html_bytes']), "")
+    for kind, size in report['asset_bytes'].items():
+        table.add_row(f"{kind.capitalize()}s", format_bytes(size), f"{report['asset_counts'][kind]} files")
+    unknown = f"{report['unknown_size_assets']} assets of unknown size" if report['unknown_size_assets'] else ""
+    table.add_row("Total Page Weight", format_bytes(report['total_bytes']),
+                  "Over budget" + (f", {unknown}" if unknown else "") if report['over_budget'] else unknown)
+    oversized = report['oversized_assets']
+    table.add_row("Oversized Assets", str(len(oversized)),
+                  '\n'.join(f"{asset['url']} ({format_bytes(asset['bytes'])})" for asset in oversized[:10]) or "None")
+    blocking = report['render_blocking']['scripts'] + report['render_blocking']['stylesheets']
+    table.add_row("Render-Blocking Resources", str(len(blocking)), '\n'.join(blocking[:10]) or "None")
+    console.print(table)
+
+
+def display_page_weight_summary(summary):
+    """
+    Displays the site-level findings of a site-wide performance audit in a table.
+
+    Parameters:
+    - summary (dict): The summary returned by audit_page_weight.
+
+    Returns:
+    - None: This function outputs to the console and returns nothing.
+    """
+    console = Console()
+    table = Table(title="Site Performance Audit", show_header=True, header_style="bold blue")
+    table.add_column("Finding", style="dim", width=30)
+    table.add_column("Value", justify="right")
+    table.add_column("Details", overflow="fold")
+
+    table.add_row("Pages Audited", str(summary['pages_audited']), f"{summary['pages_failed']} failed")
+    if summary['pages_audited']:
+        table.add_row("Time to First Byte", f"{summary['ttfb_median'] * 1000:.0f} ms",
+                      f"median, p90: {summary['ttfb_p90'] * 1000:.0f} ms")
+        table.add_row("HTML Transfer Time", f"{summary['total_time_median'] * 1000:.0f} ms", "median")
+    table.add_row("Average Page Weight", format_bytes(summary['average_page_bytes']),
+                  f"{summary['asset_requests']} unique assets measured")
+    table.add_row("Pages Over Budget", str(summary['pages_over_budget']), "")
+    table.add_row("Render-Blocking Resources", str(summary['render_blocking_resources']),
+                  f"on {summary['pages_with_render_blocking']} pages")
+    table.add_row("Heaviest Pages", "N/A",
+                  '\n'.join(f"{url} ({format_bytes(size)})" for url, size in summary['heaviest_pages'][:5]))
+    table.add_row("Slowest Pages (TTFB)", "N/A",
+                  '\n'.join(f"{url} ({ttfb * 1000:.0f} ms)" for url, ttfb in summary['slowest_pages'][:5]))
+    table.add_row("Oversized Assets", str(len(summary['oversized_assets'])),
+                  '\n'.join(f"{asset['url']} ({format_bytes(asset['bytes'])}, {asset['pages']} pages)"
+                            for asset in summary['oversized_assets'][:10]) or "None")
+    console.print(table)
@@ -0,0 +1,423 @@
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import time
+import urllib.robotparser
+from urllib.parse import urlparse
+import requests
+from bs4 import BeautifulSoup
+from rich import print
+from . import errors
+from .data_extraction_functions import extract_page_data, parse_sitemap
+from .helper_functions import get_random_user_agent, dynamic_delay
+from .request_functions import fetch_page, get_body_encoding, MAX_CONTENT_BYTES
+from .scope_functions import CrawlScope, load_scope
+
+# ============================================================
+# DISTRIBUTED CRAWLING FUNCTIONS
+# Coordinator/worker mode sharing a SQLite-backed crawl queue.
+# ============================================================
+
+DEFAULT_QUEUE_FILE = "yirabot_queue.db"
+
+
+def host_shard(url, shards):
+    """
+    Maps a URL to a shard number based on a stable hash of its host, so every
+    URL of the same host is always handled by the same worker.
+
+    Args:
+        url (str): The URL to shard.
+        shards (int): The total number of shards.
+
+    Returns:
+        int: The shard number, between 0 and shards - 1.
+    """
+    host = urlparse(url).netloc.lower()
+    digest = hashlib.md5(host.encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") % shards
+
+
+class CrawlQueue:
+    """
+    Crawl frontier and result store kept in a single SQLite file.
+
+    The file must be on a local disk and every worker must run on the same machine:
+    the queue uses SQLite's WAL journal, which does not work on network filesystems,
+    whose locking is also too unreliable to keep two workers from taking the same
+    lease. Every state change is a short transaction, so any number of worker
+    processes can pull from the queue at once.
+    """
+
+    def __init__(self, path=DEFAULT_QUEUE_FILE, shards=None, max_pages=None, max_depth=None, timeout=30, scope=None):
+        """
+        Opens (or creates) the queue file.
+
+        Args:
+            path (str): Path of the SQLite queue file.
+            shards (int, optional): Number of shards. Only needed when creating a new queue.
+            max_pages (int, optional): Maximum number of URLs the queue will accept.
+            max_depth (int, optional): Maximum link depth from the seed URLs.
+            timeout (int): Seconds to wait for a lock held by another process.
+            scope (CrawlScope, optional): Scope filter stored in the queue, so every worker
+                drops out-of-scope links before pushing them. None keeps the stored scope.
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS frontier (
+                url TEXT PRIMARY KEY,
+                shard INTEGER NOT NULL,
+                depth INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                leased_at REAL,
+                result TEXT,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS frontier_pull ON frontier (shard, status);
+        """)
+        if shards is not None:
+            stored_shards = self._get_meta("shards")
+            # Queued URLs keep the shard they were assigned, so the count cannot change under them
+            if stored_shards is not None and stored_shards != shards and \
+                    self.connection.execute("SELECT 1 FROM frontier LIMIT 1").fetchone():
+                raise ValueError(f"The queue '{path}' already has {stored_shards} shards, "
+                                 f"start a new queue to use {shards}")
+            self._set_meta("shards", shards)
+        if max_pages is not None:
+            self._set_meta("max_pages", max_pages)
+        if max_depth is not None:
+            self._set_meta("max_depth", max_depth)
+        scope = load_scope(scope)
+        if scope is not None:
+            self.set_scope(scope)
+        self.shards = int(self._get_meta("shards", 1))
+        self.max_pages = self._get_meta("max_pages")
+        self.max_depth = self._get_meta("max_depth")
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'scope'").fetchone()
+        self.scope = CrawlScope.from_dict(json.loads(row[0])) if row else None
+
+    def set_scope(self, scope):
+        """
+        Stores the scope filter applied to pushed links, or removes it when scope is None.
+        Workers read the scope when they open the queue.
+        """
+        if scope is None:
+            self.connection.execute("DELETE FROM meta WHERE key = 'scope'")
+        else:
+            self._set_meta("scope", json.dumps(scope.spec))
+        self.scope = scope
+
+    def _set_meta(self, key, value):
+        self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _get_meta(self, key, default=None):
+        row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return int(row[0]) if row else default
+
+    def push(self, urls, depth=0):
+        """
+        Adds URLs to the frontier, ignoring ones that are already known. The scope only
+        applies to discovered links, so seed URLs (depth 0) are always enqueued.
+
+        Args:
+            urls (iterable): The URLs to enqueue.
+            depth (int): Link depth of the URLs from the seed URLs.
+
+        Returns:
+            int: The number of newly enqueued URLs.
+        """
+        if self.max_depth is not None and depth > self.max_depth:
+            return 0
+        if self.scope is not None and depth > 0:
+            urls = self.scope.filter(urls)
+        candidates = sorted(set(urls))
+        cursor = self.connection.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            # Known URLs are dropped before the cap, so they never take the place of new ones
+            known_urls = set()
+            for start in range(0, len(candidates), 500):
+                chunk = candidates[start:start + 500]
+                known_urls.update(url for url, in cursor.execute(
+                    f"SELECT url FROM frontier WHERE url IN ({','.join('?' * len(chunk))})", chunk))
+            rows = [(url, host_shard(url, self.shards), depth) for url in candidates if url not in known_urls]
+            if self.max_pages is not None:
+                known = cursor.execute("SELECT COUNT(*) FROM frontier").fetchone()[0]
+                rows = rows[:max(self.max_pages - known, 0)]
+            cursor.executemany("INSERT INTO frontier (url, shard, depth) VALUES (?, ?, ?)", rows)
+            inserted = len(rows)
+            cursor.execute("COMMIT")
+        except sqlite3.Error:
+            cursor.execute("ROLLBACK")
+            raise
+        return inserted
+
+    def pull(self, shards, worker, batch_size=10, lease=300):
+        """
+        Leases a batch of pending URLs from the given shards. URLs leased by a worker
+        that has not reported back within `lease` seconds are handed out again.
+
+        Args:
+            shards (list): Shard numbers the worker is responsible for.
+            worker (str): Identifier of the pulling worker.
+            batch_size (int): Maximum number of URLs to lease.
+            lease (int): Seconds before an unfinished lease expires.
+
+        Returns:
+            list: A list of (url, depth) tuples.
+        """
+        placeholders = ",".join("?" * len(shards))
+        now = time.time()
+        cursor = self.connection.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.execute(
+                f"UPDATE frontier SET status = 'pending', worker = NULL "
+                f"WHERE status = 'leased' AND leased_at < ? AND shard IN ({placeholders})",
+                [now - lease] + list(shards))
+            rows = cursor.execute(
+                f"SELECT url, depth FROM frontier WHERE status = 'pending' AND shard IN ({placeholders}) LIMIT ?",
+                list(shards) + [batch_size]).fetchall()
+            cursor.executemany(
+                "UPDATE frontier SET status = 'leased', worker = ?, leased_at = ? WHERE url = ?",
+                [(worker, now, url) for url, _ in rows])
+            cursor.execute("COMMIT")
+        except sqlite3.Error:
+            cursor.execute("ROLLBACK")
+            raise
+        return rows
+
+    def complete(self, url, result=None, error=None):
+        """
+        Stores the outcome of a leased URL.
+
+        Args:
+            url (str): The crawled URL.
+            result (dict, optional): The extracted data.
+            error (str, optional): The error message if the crawl failed.
+        """
+        self.connection.execute(
+            "UPDATE frontier SET status = ?, result = ?, error = ? WHERE url = ?",
+            ("failed" if error else "done", json.dumps(result) if result is not None else None, error, url))
+
+    def stats(self):
+        """
+        Returns the number of URLs per status, e.g. {'pending': 10, 'leased': 2, 'done': 40}.
+        """
+        return dict(self.connection.execute("SELECT status, COUNT(*) FROM frontier GROUP BY status").fetchall())
+
+    def is_finished(self):
+        """
+        Returns True when no URL is pending or leased.
+        """
+        stats = self.stats()
+        return not stats.get("pending") and not stats.get("leased")
+
+    def results(self):
+        """
+        Yields (url, data, error) for every finished URL.
+        """
+        rows = self.connection.execute(
+            "SELECT url, result, error FROM frontier WHERE status IN ('done', 'failed') ORDER BY rowid")
+        for url, result, error in rows:
+            yield url, json.loads(result) if result else None, error
+
+    def close(self):
+        self.connection.close()
+
+
+class CrawlCoordinator:
+    """
+    Seeds a shared crawl queue, watches its progress and exports the collected results.
+    Workers started with the same queue file do the actual crawling.
+    """
+
+    def __init__(self, path=DEFAULT_QUEUE_FILE, shards=4, max_pages=1000, max_depth=None, scope=None, resume=False):
+        """
+        Args:
+            path (str): Path of the SQLite queue file.
+            shards (int): Number of shards.
+            max_pages (int, optional): Maximum number of URLs the queue will accept.
+            max_depth (int, optional): Maximum link depth from the seed URLs.
+            scope (CrawlScope, optional): Scope filter applied by every worker. Without one,
+                a resumed queue drops the scope of the earlier run.
+            resume (bool): If True, continues the crawl in an existing queue file. Otherwise
+                the file is replaced, so results of an earlier run are never exported again.
+
+        Raises:
+            ValueError: If a resumed queue has a different number of shards.
+        """
+        if not resume:
+            for queue_file in (path, path + "-wal", path + "-shm"):
+                if os.path.exists(queue_file):
+                    os.remove(queue_file)
+        self.queue = CrawlQueue(path, shards=shards, max_pages=max_pages, max_depth=max_depth, scope=scope)
+        if scope is None:
+            self.queue.set_scope(None)
+
+    def seed(self, urls):
+        """
+        Enqueues the start URLs of the crawl.
+
+        Args:
+            urls (iterable): Start URLs.
+
+        Returns:
+            int: The number of newly enqueued URLs.
+        """
+        return self.queue.push(urls, depth=0)
+
+    def wait(self, interval=5, script=False):
+        """
+        Blocks until every URL in the queue has been crawled, reporting progress.
+
+        Args:
+            interval (int): Seconds between progress checks.
+            script (bool): Flag indicating if progress messages should be suppressed.
+
+        Returns:
+            dict: The final status counts.
+        """
+        while not self.queue.is_finished():
+            stats = self.queue.stats()
+            print(f"YiraBot: {stats.get('done', 0)} crawled, {stats.get('failed', 0)} failed, "
+                  f"{stats.get('pending', 0)} pending, {stats.get('leased', 0)} in progress") if not script else None
+            time.sleep(interval)
+        return self.queue.stats()
+
+    def export(self, filename):
+        """
+        Writes every crawled page to a newline-delimited JSON file.
+
+        Args:
+            filename (str): The name of the file to write to.
+
+        Returns:
+            int: The number of exported pages.
+        """
+        count = 0
+        with open(filename, "w") as file:
+            for url, data, error in self.queue.results():
+                file.write(json.dumps({"url": url, "data": data, "error": error}) + "\n")
+                count += 1
+        return count
+
+
+class CrawlWorker:
+    """
+    Pulls batches of URLs for its shards from a shared crawl queue, crawls them with
+    the standard extraction path and pushes results and discovered links back.
+    """
+
+    def __init__(self, path=DEFAULT_QUEUE_FILE, shards=None, batch_size=10, force=False, mobile=False,
+                 max_bytes=MAX_CONTENT_BYTES):
+        """
+        Args:
+            path (str): Path of the SQLite queue file created by the coordinator.
+            shards (list, optional): Shards to work on. Defaults to all shards of the queue.
+            batch_size (int): Number of URLs leased per pull.
+            force (bool): If True, ignores robots.txt.
+            mobile (bool): If True, uses a mobile user agent.
+            max_bytes (int, optional): Maximum page size in bytes. None disables the limit.
+
+        Raises:
+            ValueError: If a shard is not one of the queue's shards.
+        """
+        self.queue = CrawlQueue(path)
+        self.shards = list(shards) if shards is not None else list(range(self.queue.shards))
+        invalid = [shard for shard in self.shards if not 0 <= shard < self.queue.shards]
+        if invalid:
+            self.queue.close()
+            raise ValueError(f"The queue has shards 0 to {self.queue.shards - 1}, got {invalid[0]}")
+        self.batch_size = batch_size
+        self.force = force
+        self.mobile = mobile
+        self.max_bytes = max_bytes
+        self.session = requests.Session()
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        # robots.txt rules and sitemap URLs per origin, read once for the worker's lifetime
+        self.robots = {}
+        self.sitemaps = {}
+
+    def is_allowed(self, url):
+        """
+        Checks the URL against the robots.txt of its origin, which is read on first use.
+        """
+        parts = urlparse(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        robots = self.robots.get(origin)
+        if robots is None:
+            robots = self.robots[origin] = urllib.robotparser.RobotFileParser(origin + "/robots.txt")
+            try:
+                robots.read()
+            except (OSError, ValueError):
+                robots.allow_all = True  # robots.txt is unavailable, so nothing is disallowed
+        return robots.can_fetch("*", url)
+
+    def sitemap_urls(self, url):
+        """
+        Returns the sitemap URLs of the URL's origin, fetched once per origin.
+        """
+        parts = urlparse(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        if origin not in self.sitemaps:
+            self.sitemaps[origin] = parse_sitemap(origin)
+        return self.sitemaps[origin]
+
+    def crawl_url(self, url):
+        """
+        Crawls a single URL and returns its extracted data.
+        """
+        if not self.force and not self.is_allowed(url):
+            raise errors.RobotsError(url)
+
+        response, body = fetch_page(url, session=self.session, max_bytes=self.max_bytes,
+                                    headers={'User-Agent': get_random_user_agent(mobile=self.mobile)})
+        dynamic_delay(response, script=True)
+        response.raise_for_status()
+        soup = BeautifulSoup(body, features="html5lib", from_encoding=get_body_encoding(response, body))
+        data = extract_page_data(soup, url)
+        data['sitemap_urls'] = self.sitemap_urls(url)
+        return data
+
+    def run(self, idle_timeout=30, script=False):
+        """
+        Processes the queue until it has stayed empty for `idle_timeout` seconds.
+
+        Args:
+            idle_timeout (int): Seconds to keep polling an empty queue before stopping.
+            script (bool): Flag indicating if progress messages should be suppressed.
+
+        Returns:
+            int: The number of URLs processed by this worker.
+        """
+        processed = 0
+        idle_since = None
+        while True:
+            batch = self.queue.pull(self.shards, self.worker_id, batch_size=self.batch_size)
+            if not batch:
+                idle_since = idle_since or time.time()
+                if time.time() - idle_since > idle_timeout or self.queue.is_finished():
+                    break
+                time.sleep(1)
+                continue
+            idle_since = None
+
+            for url, depth in batch:
+                try:
+                    data = self.crawl_url(url)
+                except Exception as e:
+                    self.queue.complete(url, error=str(e))
+                    print(f"YiraBot: Error occurred: {e}") if not script else None
+                else:
+                    self.queue.complete(url, result=data)
+                    self.queue.push(data['internal_links'], depth=depth + 1)
+                    print(f"YiraBot: Crawled {url}") if not script else None
+                processed += 1
+        return processed
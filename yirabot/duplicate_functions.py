@@ -0,0 +1,203 @@
+import hashlib
+import random
+from array import array
+from .keyword_functions import iter_tokens
+
+# ============================================================
+# DUPLICATE CONTENT FUNCTIONS
+# MinHash fingerprints and an LSH index for near-duplicate pages.
+# ============================================================
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+NUM_PERMUTATIONS = 64
+SHINGLE_SIZE = 5
+
+# Fixed seed so fingerprints computed by different processes are comparable
+_random = random.Random(1)
+PERMUTATIONS = [(_random.randrange(1, MERSENNE_PRIME), _random.randrange(0, MERSENNE_PRIME))
+                for _ in range(NUM_PERMUTATIONS)]
+
+
+def shingle_hashes(text, size=SHINGLE_SIZE):
+    """
+    Hashes the overlapping word shingles of a text to 32-bit integers.
+
+    Args:
+        text (str): The text to shingle.
+        size (int): Number of words per shingle.
+
+    Returns:
+        set: The distinct shingle hashes. Texts shorter than one shingle have none, since
+        they are too short to tell apart reliably.
+    """
+    tokens = list(iter_tokens(text))
+    shingles = (" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1))
+    return {int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+            for shingle in shingles}
+
+
+def minhash_signature(hashes):
+    """
+    Computes the MinHash signature of a set of shingle hashes.
+
+    Args:
+        hashes (set): Shingle hashes, e.g. from shingle_hashes.
+
+    Returns:
+        array: NUM_PERMUTATIONS unsigned integers. Without hashes every value is MAX_HASH
+        (see is_empty_signature).
+    """
+    if not hashes:
+        return array("I", [MAX_HASH] * NUM_PERMUTATIONS)
+    return array("I", [min(((a * value + b) % MERSENNE_PRIME) & MAX_HASH for value in hashes)
+                       for a, b in PERMUTATIONS])
+
+
+def is_empty_signature(signature):
+    """
+    Returns True for the signature of a page without shingles, which must not be
+    compared: all such signatures are identical whatever the pages contain.
+    """
+    return all(value == MAX_HASH for value in signature)
+
+
+def content_fingerprint(data):
+    """
+    Computes the MinHash fingerprint of a page from the output of extract_content_data.
+
+    Args:
+        data (dict): The extracted content with 'headings', 'paragraphs' and 'lists'.
+
+    Returns:
+        array: The MinHash signature of the page text.
+    """
+    text = " ".join(data.get('headings', []) + data.get('paragraphs', []) + data.get('lists', []))
+    return minhash_signature(shingle_hashes(text))
+
+
+def estimate_similarity(signature, other):
+    """
+    Estimates the Jaccard similarity of two pages from their MinHash signatures.
+    """
+    return sum(1 for a, b in zip(signature, other) if a == b) / len(signature)
+
+
+class LSHIndex:
+    """
+    Locality-sensitive hashing index that groups near-duplicate pages. Each signature
+    is split into bands; pages sharing any band land in the same bucket and are joined
+    into one cluster if their estimated similarity reaches the threshold. A page is
+    compared only with the pages sharing one of its buckets that are not already in
+    its cluster. Pages with too little text for a fingerprint are listed in
+    `empty_pages` instead of being clustered.
+    """
+
+    def __init__(self, threshold=0.8, bands=16):
+        """
+        Args:
+            threshold (float): Minimum estimated Jaccard similarity for two pages to be clustered.
+            bands (int): Number of LSH bands; must divide the signature length.
+        """
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = NUM_PERMUTATIONS // bands
+        self.urls = []
+        self.canonicals = []
+        self.signatures = []
+        self.parents = array("l")
+        self.buckets = [{} for _ in range(bands)]
+        self.empty_pages = []
+
+    def _find(self, page_id):
+        parents = self.parents
+        while parents[page_id] != page_id:
+            parents[page_id] = parents[parents[page_id]]
+            page_id = parents[page_id]
+        return page_id
+
+    def _union(self, first, second):
+        first, second = self._find(first), self._find(second)
+        if first != second:
+            self.parents[max(first, second)] = min(first, second)
+
+    def add(self, url, signature, canonical=None):
+        """
+        Adds a page to the index and links it to any near-duplicate already indexed.
+
+        Args:
+            url (str): The page URL.
+            signature (array): The page's MinHash signature.
+            canonical (str, optional): The canonical URL the page declares.
+
+        Returns:
+            int: The page ID within the index.
+        """
+        page_id = len(self.urls)
+        self.urls.append(url)
+        self.canonicals.append(canonical)
+        self.signatures.append(signature)
+        self.parents.append(page_id)
+        if is_empty_signature(signature):
+            self.empty_pages.append(url)
+            return page_id
+
+        for band, bucket in enumerate(self.buckets):
+            key = hash(tuple(signature[band * self.rows:(band + 1) * self.rows]))
+            members = bucket.setdefault(key, [])
+            for candidate in members:
+                if self._find(candidate) != self._find(page_id) and \
+                        estimate_similarity(signature, self.signatures[candidate]) >= self.threshold:
+                    self._union(candidate, page_id)
+            members.append(page_id)
+        return page_id
+
+    def clusters(self, min_size=2):
+        """
+        Returns the groups of near-duplicate page IDs with at least min_size pages.
+        """
+        groups = {}
+        for page_id in range(len(self.urls)):
+            groups.setdefault(self._find(page_id), []).append(page_id)
+        return [members for members in groups.values() if len(members) >= min_size]
+
+    def report(self):
+        """
+        Lists every near-duplicate cluster together with the canonical URL each page declares.
+
+        Returns:
+            list: One dict per cluster with its pages, their declared canonicals, the
+            estimated similarity to the first page and whether the canonicals agree.
+        """
+        report = []
+        for members in self.clusters():
+            first = self.signatures[members[0]]
+            canonicals = {self.urls[page_id]: self.canonicals[page_id] for page_id in members}
+            report.append({
+                'pages': [self.urls[page_id] for page_id in members],
+                'canonicals': canonicals,
+                'similarity': min(estimate_similarity(first, self.signatures[page_id]) for page_id in members),
+                'consistent_canonical': len(set(canonicals.values())) == 1 and None not in canonicals.values(),
+            })
+        return report
+
+    def __len__(self):
+        return len(self.urls)
+
+
+def index_page_content(index, url, soup, data):
+    """
+    Fingerprints a scraped page and adds it to an LSH index, together with the
+    canonical URL declared in the page.
+
+    Args:
+        index (LSHIndex): The index to add the page to.
+        url (str): The page URL.
+        soup (BeautifulSoup): The parsed page.
+        data (dict): The page content as returned by extract_content_data.
+
+    Returns:
+        int: The page ID within the index.
+    """
+    canonical_tag = soup.find("link", {"rel": "canonical"})
+    return index.add(url, content_fingerprint(data), canonical_tag.get("href") if canonical_tag else None)
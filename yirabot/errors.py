@@ -1,3 +1,6 @@
+import requests
+
+
 class HTTPError(Exception):
     """Exception raised for HTTP errors."""
 
@@ -66,3 +69,80 @@ class RobotsError(Exception):
         self.url = url
         self.message = f"{self.url} Does Not Allow Crawling (Blocked By robots.txt)"
         super().__init__(self.message)
+
+
+class ContentTypeError(Exception):
+    """Exception raised when a response has a content type that cannot be processed."""
+
+    def __init__(self, url, content_type):
+        """Initializes the exception with the URL and the rejected content type.
+
+        Args:
+            url (str): The URL that returned the content.
+            content_type (str): The rejected content type.
+        """
+        self.url = url
+        self.content_type = content_type
+        self.message = f"Unsupported Content Type '{self.content_type}': {self.url}"
+        super().__init__(self.message)
+
+
+class ContentTooLargeError(Exception):
+    """Exception raised when a response body exceeds the configured size limit."""
+
+    def __init__(self, url, limit):
+        """Initializes the exception with the URL and the exceeded limit.
+
+        Args:
+            url (str): The URL whose body was too large.
+            limit (int): The maximum number of bytes allowed.
+        """
+        self.url = url
+        self.limit = limit
+        self.message = f"Content Larger Than {self.limit} Bytes: {self.url}"
+        super().__init__(self.message)
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Exception raised when requests to a host are suspended after repeated failures.
+
+    It is a requests ConnectionError, so code handling unreachable hosts handles it too.
+    """
+
+    def __init__(self, host):
+        """Initializes the exception with the host whose circuit is open.
+
+        Args:
+            host (str): The host that is temporarily skipped.
+        """
+        self.host = host
+        self.message = f"Circuit Open, Skipping Failing Host: {self.host}"
+        super().__init__(self.message)
+
+
+class QueueFullError(Exception):
+    """Exception raised when the job queue of the local server is full."""
+
+    def __init__(self, limit):
+        """Initializes the exception with the queue limit.
+
+        Args:
+            limit (int): The maximum number of queued and running jobs.
+        """
+        self.limit = limit
+        self.message = f"Job Queue Full ({self.limit} Jobs), Try Again Later"
+        super().__init__(self.message)
+
+
+class LoginError(Exception):
+    """Exception raised when logging in with the configured credentials fails."""
+
+    def __init__(self, url):
+        """Initializes the exception with the login URL.
+
+        Args:
+            url (str): The login URL that rejected the credentials.
+        """
+        self.url = url
+        self.message = f"Login Failed: {self.url}"
+        super().__init__(self.message)
@@ -22,9 +22,28 @@ crawl
         -file: Saves data to a text file.
         -json: Saves data to a JSON file.
         -mobile: Uses a mobile User Agent to crawl
+        -head: Only downloads and parses the page <head> (metadata only)
+        -http2: Uses HTTP/2 (requires: pip install "httpx[http2]")
+        -warc: Also archives the full response to a WARC file (not with -head)
+        --rules <file>: Adds the fields of a JSON file of CSS selector rules
+        --fields <a,b,...>: Only extracts the listed fields: favicon, meta_description, title,
+               open_graph_tags, twitter_card_tags, canonical_url, internal_links, external_links,
+               image_urls, structured_data, sitemap_urls, viewport, language and rule names.
+               Aliases: canonical, description, og, twitter, images, sitemap, schema
 
 seo
     - SEO Analysis: Analyzes SEO-related elements of the specified URL.
+    - Flags:
+        -perf: Measures TTFB, transfer time and page weight, and lists oversized assets
+               and render-blocking resources instead
+        --fields <a,b,...>: Only runs the listed checks: title_length, meta_desc_length, headings,
+               images_without_alt, keyword_results, schema_types, is_responsive,
+               social_media_integration, website_language. Cannot be combined with -perf
+
+seo-site
+    - Site SEO Audit: Audits every page of the site and reports site-level SEO issues.
+    - Flags:
+        -perf: Audits the performance and page weight of every page instead
 
 scrape
     - Scrape: Extracts main content from the specified URL.
@@ -32,13 +51,58 @@ scrape
         -file: Saves content data to a text file.
         -json: Saves content data to a JSON file.
         -mobile: Uses a mobile User Agent to scrape
+        -http2: Uses HTTP/2 (requires: pip install "httpx[http2]")
+        -warc: Also archives the response to a WARC file
+        --rules <file>: Adds the fields of a JSON file of CSS selector rules
+        --fields <a,b,...>: Only extracts the listed fields: title, paragraphs, headings, lists
+               and rule names
+
+links
+    - Link Graph: Crawls internal links and reports PageRank, click depth and orphan pages.
+
+duplicates
+    - Duplicate Content: Finds near-duplicate pages among the URLs of the site's sitemap.
 
 get-html
     - HTML Copy: Downloads and saves the complete HTML of the specified URL.
+    - Flags:
+        -warc: Appends the response to a WARC archive instead of saving an HTML file
 
 session
     - Protected Crawl: Starts a session for crawling authenticated pages.
 
+auth-crawl
+    - Protected Site Crawl: Logs in from a config file or YIRABOT_AUTH_* variables and crawls the site.
+    - Usage: yirabot auth-crawl <url> [config file] [max pages]
+
+coordinator
+    - Distributed Crawl: Seeds a shared crawl queue and waits for workers.
+    - Usage: yirabot coordinator <url> [shards] [-resume]
+    - Flags:
+        -resume: Continues the crawl in the existing queue file instead of starting a new one
+
+worker
+    - Distributed Crawl: Crawls the URLs of a shared crawl queue.
+    - Usage: yirabot worker [queue file] [shard]
+    - Workers must run on the machine that holds the queue file (local disk only).
+
+monitor
+    - Change Monitor: Recrawls the sitemap URLs that are due, based on lastmod, changefreq,
+      priority and observed changes, and appends changed pages to an NDJSON file.
+    - Usage: yirabot monitor <url> [pages per cycle] [seconds per cycle]
+
+replay
+    - Offline Replay: Re-runs crawl, content and SEO extraction over saved .html and WARC files.
+    - Usage: yirabot replay <directory or file> [workers]
+
+serve
+    - Local Server: Accepts crawl, scrape, seo, validate and get-html jobs over HTTP on localhost.
+    - Usage: yirabot serve [port] [workers]
+
+Site crawl option (seo-site, links, duplicates, auth-crawl, coordinator, monitor):
+    --scope <file>: Only crawls URLs allowed by a JSON file of include/exclude patterns,
+        path prefixes, a query parameter limit and excluded file extensions
+
 """ + LIGHTBLUE_EX + """
 For detailed documentation and examples, visit:
 https://github.com/OwenOrcan/YiraBot-Crawler
@@ -0,0 +1,162 @@
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+try:
+    import httpx
+except ImportError:  # HTTP/2 support is optional: pip install "httpx[http2]"
+    httpx = None
+
+# ============================================================
+# HTTP/2 FUNCTIONS
+# Optional HTTP/2 transport multiplexing requests per origin.
+# ============================================================
+
+DEFAULT_MAX_STREAMS_PER_HOST = 16
+
+
+def translate_httpx_error(error):
+    """
+    Converts an httpx exception into the matching requests exception, so callers and
+    the retry policy handle both transports the same way.
+    """
+    message = str(error) or type(error).__name__
+    if isinstance(error, httpx.ConnectTimeout):
+        return requests.exceptions.ConnectTimeout(message)
+    if isinstance(error, httpx.TimeoutException):
+        return requests.exceptions.ReadTimeout(message)
+    if isinstance(error, httpx.NetworkError):
+        return requests.exceptions.ConnectionError(message)
+    if isinstance(error, httpx.TooManyRedirects):
+        return requests.exceptions.TooManyRedirects(message)
+    if isinstance(error, (httpx.InvalidURL, httpx.UnsupportedProtocol)):
+        return requests.exceptions.InvalidURL(message)
+    return requests.exceptions.RequestException(message)
+
+
+class _StreamReader:
+    """
+    File-like view of a streamed httpx response body, used as the raw stream of the
+    requests Response handed to callers. Bodies arrive already decompressed. `version`
+    follows urllib3 (10, 11 or 20), so the protocol can be read the same way for both.
+    """
+
+    def __init__(self, response, release):
+        self.response = response
+        self.version = {"HTTP/1.0": 10, "HTTP/2": 20}.get(response.http_version, 11)
+        self.chunks = response.iter_bytes()
+        self.buffer = b""
+        self.release = release
+        self.closed = False
+
+    def read(self, amt=None):
+        try:
+            while amt is None or len(self.buffer) < amt:
+                self.buffer += next(self.chunks)
+        except StopIteration:
+            pass
+        except httpx.HTTPError as e:
+            raise translate_httpx_error(e)
+        if amt is None:
+            data, self.buffer = self.buffer, b""
+        else:
+            data, self.buffer = self.buffer[:amt], self.buffer[amt:]
+        return data
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.response.close()
+            self.release()
+
+    release_conn = close  # Called by Response.close even after the body was consumed
+
+
+class HTTP2Transport:
+    """
+    HTTP/2 client with the request interface of a requests Session, so it can be passed
+    as `session` to fetch_page, RetryPolicy.request and the Yirabot methods. Concurrent
+    requests to one origin are multiplexed as streams over a single connection, and at
+    most max_streams_per_host requests per host are in flight at a time; further
+    requests wait for a free stream. Servers without HTTP/2 are spoken to over HTTP/1.1.
+    Responses are returned as requests Response objects and errors as requests exceptions.
+    Requires httpx with HTTP/2 support: pip install "httpx[http2]".
+    """
+
+    def __init__(self, max_streams_per_host=DEFAULT_MAX_STREAMS_PER_HOST, timeout=10, verify=True, headers=None,
+                 cookies=None):
+        """
+        Args:
+            max_streams_per_host (int): Maximum number of concurrent requests per host.
+            timeout (int): Default request timeout in seconds.
+            verify (bool): If False, TLS certificates are not verified.
+            headers (dict, optional): Headers sent with every request.
+            cookies (dict or CookieJar, optional): Cookies sent with every request, e.g. a logged-in session's cookies.
+        """
+        if httpx is None:
+            raise ImportError('HTTP/2 support requires httpx: pip install "httpx[http2]"')
+        self.max_streams_per_host = max_streams_per_host
+        self.client = httpx.Client(http2=True, timeout=timeout, verify=verify, headers=headers, cookies=cookies,
+                                   limits=httpx.Limits(max_connections=None, max_keepalive_connections=100))
+        self.semaphores = {}
+        self.lock = threading.Lock()
+
+    def _semaphore(self, host):
+        with self.lock:
+            semaphore = self.semaphores.get(host)
+            if semaphore is None:
+                semaphore = self.semaphores[host] = threading.BoundedSemaphore(self.max_streams_per_host)
+            return semaphore
+
+    def request(self, method, url, headers=None, timeout=None, stream=False, allow_redirects=True, **kwargs):
+        """
+        Sends a request over HTTP/2 with the arguments of requests.Session.request.
+
+        Returns:
+            Response: A requests Response. With stream=True the body is read lazily and
+            the stream slot is held until the response is closed.
+        """
+        semaphore = self._semaphore(urlsplit(url).netloc)
+        semaphore.acquire()
+        try:
+            request = self.client.build_request(method, url, headers=headers, **kwargs,
+                                                timeout=httpx.USE_CLIENT_DEFAULT if timeout is None else timeout)
+            response = self.client.send(request, stream=True, follow_redirects=allow_redirects)
+        except (httpx.HTTPError, httpx.InvalidURL) as e:
+            semaphore.release()
+            raise translate_httpx_error(e)
+        except BaseException:
+            semaphore.release()
+            raise
+
+        converted = requests.Response()
+        converted.status_code = response.status_code
+        converted.headers = CaseInsensitiveDict(response.headers)
+        converted.url = str(response.url)
+        converted.reason = response.reason_phrase
+        converted.encoding = get_encoding_from_headers(converted.headers)
+        converted.raw = _StreamReader(response, semaphore.release)
+        if not stream:
+            try:
+                converted.content
+            finally:
+                converted.close()
+        return converted
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url, **kwargs):
+        kwargs.setdefault("allow_redirects", False)
+        return self.request("HEAD", url, **kwargs)
+
+    def close(self):
+        self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,272 @@
+import math
+import re
+from collections import deque
+from heapq import nlargest
+from itertools import islice
+from bs4 import NavigableString
+
+# ============================================================
+# KEYWORD ANALYSIS FUNCTIONS
+# Streaming tokenizer, n-gram counting and TF-IDF for SEO audits.
+# ============================================================
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+STOPWORDS_BY_LANGUAGE = {
+    "en": frozenset([
+        "a", "about", "above", "after", "again", "against", "all", "am", "an", "and", "any", "are", "as", "at",
+        "be", "because", "been", "before", "being", "below", "between", "both", "but", "by", "can", "could",
+        "did", "do", "does", "doing", "down", "during", "each", "few", "for", "from", "further", "had", "has",
+        "have", "having", "he", "her", "here", "hers", "him", "his", "how", "i", "if", "in", "into", "is", "it",
+        "its", "just", "me", "more", "most", "my", "no", "nor", "not", "now", "of", "off", "on", "once", "only",
+        "or", "other", "our", "ours", "out", "over", "own", "same", "she", "should", "so", "some", "such",
+        "than", "that", "the", "their", "theirs", "them", "then", "there", "these", "they", "this", "those",
+        "through", "to", "too", "under", "until", "up", "very", "was", "we", "were", "what", "when", "where",
+        "which", "while", "who", "whom", "why", "will", "with", "would", "you", "your", "yours"]),
+    "de": frozenset([
+        "aber", "alle", "als", "also", "am", "an", "auch", "auf", "aus", "bei", "bin", "bis", "da", "damit",
+        "das", "dass", "dem", "den", "der", "des", "die", "doch", "du", "durch", "ein", "eine", "einem", "einen",
+        "einer", "es", "für", "hat", "ich", "ihr", "im", "in", "ist", "ja", "kann", "mit", "nach", "nicht", "noch",
+        "nur", "oder", "sich", "sie", "sind", "so", "über", "um", "und", "uns", "von", "vor", "war", "was", "wie",
+        "wir", "wird", "zu", "zum", "zur"]),
+    "fr": frozenset([
+        "au", "aux", "avec", "ce", "ces", "cette", "dans", "de", "des", "du", "elle", "en", "est", "et", "il",
+        "ils", "je", "la", "le", "les", "leur", "lui", "mais", "me", "même", "mes", "moi", "mon", "ne", "nous",
+        "on", "ou", "par", "pas", "pour", "qu", "que", "qui", "sa", "se", "ses", "son", "sur", "ta", "te", "tes",
+        "toi", "ton", "tu", "un", "une", "vos", "votre", "vous", "y"]),
+    "es": frozenset([
+        "a", "al", "algo", "como", "con", "de", "del", "el", "ella", "en", "entre", "era", "es", "esta", "este",
+        "esto", "ha", "hay", "la", "las", "le", "les", "lo", "los", "más", "me", "mi", "muy", "no", "nos", "o",
+        "para", "pero", "por", "que", "se", "si", "sin", "sobre", "su", "sus", "también", "te", "tu", "un",
+        "una", "uno", "y", "ya", "yo"]),
+    "it": frozenset([
+        "a", "al", "alla", "anche", "che", "ci", "come", "con", "da", "del", "della", "di", "e", "è", "gli",
+        "ha", "i", "il", "in", "io", "la", "le", "lo", "ma", "mi", "ne", "nel", "nella", "non", "per", "più",
+        "questo", "se", "si", "sono", "su", "sua", "suo", "tra", "un", "una", "uno"]),
+    "pt": frozenset([
+        "a", "ao", "as", "com", "como", "da", "das", "de", "do", "dos", "e", "é", "ela", "ele", "em", "entre",
+        "era", "eu", "foi", "isso", "já", "mais", "mas", "me", "na", "nas", "não", "no", "nos", "o", "os", "ou",
+        "para", "pela", "pelo", "por", "que", "se", "sem", "seu", "sua", "também", "um", "uma"]),
+    "nl": frozenset([
+        "aan", "al", "als", "bij", "dat", "de", "die", "dit", "een", "en", "er", "het", "hij", "ik", "in", "is",
+        "je", "kan", "maar", "met", "naar", "niet", "nog", "of", "om", "ook", "op", "te", "tot", "uit", "van",
+        "voor", "was", "wat", "we", "wel", "zijn", "zo"]),
+    "tr": frozenset([
+        "acaba", "ama", "ancak", "bana", "bazı", "belki", "ben", "beni", "bir", "biz", "bu", "bunu", "çok",
+        "da", "daha", "de", "değil", "diye", "en", "gibi", "hem", "her", "için", "ile", "ise", "kadar", "ki",
+        "mi", "mı", "ne", "o", "olan", "olarak", "sen", "siz", "şey", "şu", "ve", "veya", "ya"]),
+}
+
+DEFAULT_LANGUAGE = "en"
+
+
+def get_stopwords(language=None):
+    """
+    Returns the stopword set for a language code as reported by check_website_language,
+    e.g. "en", "en-US" or "de_DE". Unknown or missing languages fall back to English.
+
+    Args:
+        language (str, optional): The language code.
+
+    Returns:
+        frozenset: The stopwords of the language.
+    """
+    code = (language or "").strip().lower().replace("_", "-").split("-")[0]
+    return STOPWORDS_BY_LANGUAGE.get(code, STOPWORDS_BY_LANGUAGE[DEFAULT_LANGUAGE])
+
+
+def iter_tokens(text):
+    """
+    Lazily yields the lowercase word tokens of a text.
+
+    Args:
+        text (str): The text to tokenize.
+
+    Yields:
+        str: Word tokens.
+    """
+    for match in TOKEN_PATTERN.finditer(text):
+        yield match.group().lower()
+
+
+class TopKCounter:
+    """
+    Top-k counter with bounded memory. Holds at most 2 * capacity entries; when that
+    is reached, everything but the `capacity` most frequent items is dropped. An item
+    that is dropped and seen again starts counting from zero, so reported counts are
+    low by at most `error`, the sum of the largest count dropped by each pruning, and
+    items that were dropped may be missing from the results.
+    """
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counts = {}
+        self.error = 0
+
+    def add(self, item, count=1):
+        self.counts[item] = self.counts.get(item, 0) + count
+        if len(self.counts) >= 2 * self.capacity:
+            self._prune()
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+    def merge(self, other):
+        """
+        Adds the counts of another TopKCounter (or a plain mapping) to this one.
+        """
+        for item, count in (other.counts if isinstance(other, TopKCounter) else other).items():
+            self.add(item, count)
+        self.error += getattr(other, "error", 0)
+
+    def _prune(self):
+        kept = dict(nlargest(self.capacity, self.counts.items(), key=lambda entry: entry[1]))
+        self.error += max((count for item, count in self.counts.items() if item not in kept), default=0)
+        self.counts = kept
+
+    def most_common(self, n=None):
+        """
+        Returns the n most frequent items as (item, count) tuples.
+        """
+        n = min(n or self.capacity, self.capacity)
+        return nlargest(n, self.counts.items(), key=lambda entry: entry[1])
+
+    def __len__(self):
+        return len(self.counts)
+
+
+def count_keywords(text, ngram_range=(1, 1), language=None, capacity=1000):
+    """
+    Counts the keywords and n-grams of a text in a single pass over its tokens.
+    N-grams that start or end with a stopword are skipped, so "the price of coffee"
+    counts "price of coffee" as a trigram but never "the price".
+
+    Args:
+        text (str): The text to analyze.
+        ngram_range (tuple): Smallest and largest n-gram size to count.
+        language (str, optional): Language code used to pick the stopword list.
+        capacity (int): Number of heavy hitters kept per n-gram size.
+
+    Returns:
+        dict: A TopKCounter per n-gram size, keyed by n.
+    """
+    stopwords = get_stopwords(language)
+    counters = {n: TopKCounter(capacity) for n in range(ngram_range[0], ngram_range[1] + 1)}
+    window = deque(maxlen=ngram_range[1])
+    for token in iter_tokens(text):
+        window.append(token)
+        if token in stopwords or token.isdigit():
+            continue
+        for n, counter in counters.items():
+            if len(window) >= n and window[-n] not in stopwords:
+                counter.add(" ".join(islice(window, len(window) - n, None)))
+    return counters
+
+
+class KeywordAnalyzer:
+    """
+    Site-wide keyword and n-gram analysis. Pages are added one at a time; per-page
+    counts are merged into bounded site-wide heavy-hitter counters and a document
+    frequency counter used for TF-IDF. Analyzers filled by separate workers can be
+    combined with merge().
+    """
+
+    def __init__(self, ngram_range=(1, 3), capacity=5000, page_capacity=50):
+        """
+        Args:
+            ngram_range (tuple): Smallest and largest n-gram size to count.
+            capacity (int): Number of heavy hitters kept site-wide per n-gram size.
+            page_capacity (int): Number of top terms kept per page for TF-IDF ranking.
+        """
+        self.ngram_range = ngram_range
+        self.capacity = capacity
+        self.page_capacity = page_capacity
+        self.page_count = 0
+        self.site_counts = {n: TopKCounter(capacity) for n in range(ngram_range[0], ngram_range[1] + 1)}
+        self.document_frequency = TopKCounter(capacity * len(self.site_counts))
+        self.pages = {}
+
+    def add_page(self, text, url=None, language=None):
+        """
+        Counts the terms of one page and merges them into the site-wide counts.
+
+        Args:
+            text (str): The page text.
+            url (str, optional): The page URL, used as key for per-page TF-IDF results.
+            language (str, optional): Language code of the page.
+
+        Returns:
+            dict: The page's TopKCounter per n-gram size.
+        """
+        page_counts = count_keywords(text, self.ngram_range, language, self.capacity)
+        self.page_count += 1
+        for n, counter in page_counts.items():
+            self.site_counts[n].merge(counter)
+            for term in counter.counts:
+                self.document_frequency.add(term)
+        if url is not None:
+            top_terms = []
+            for counter in page_counts.values():
+                top_terms.extend(counter.most_common(self.page_capacity))
+            self.pages[url] = dict(top_terms)
+        return page_counts
+
+    def merge(self, other):
+        """
+        Merges the counts of another KeywordAnalyzer into this one.
+        """
+        self.page_count += other.page_count
+        for n, counter in other.site_counts.items():
+            self.site_counts.setdefault(n, TopKCounter(self.capacity)).merge(counter)
+        self.document_frequency.merge(other.document_frequency)
+        self.pages.update(other.pages)
+
+    def top_keywords(self, n=1, top=10):
+        """
+        Returns the most frequent site-wide n-grams of size n as (term, count) tuples.
+        """
+        return self.site_counts[n].most_common(top)
+
+    def idf(self, term):
+        """
+        Returns the smoothed inverse document frequency of a term across the added pages.
+        """
+        return math.log((1 + self.page_count) / (1 + self.document_frequency.counts.get(term, 0))) + 1
+
+    def tfidf(self, url, top=10):
+        """
+        Ranks the terms of one page by TF-IDF against every page added so far.
+
+        Args:
+            url (str): The page URL passed to add_page.
+            top (int): Number of terms to return.
+
+        Returns:
+            list: (term, score) tuples, highest score first.
+        """
+        counts = self.pages.get(url, {})
+        total = sum(counts.values()) or 1
+        scores = ((term, round(count / total * self.idf(term), 4)) for term, count in counts.items())
+        return nlargest(top, scores, key=lambda entry: entry[1])
+
+    def report(self, top=10):
+        """
+        Summarizes the analysis as a dictionary with the site-wide top n-grams per size
+        and the top TF-IDF terms of every page.
+        """
+        return {
+            'pages': self.page_count,
+            'top_keywords': {n: self.top_keywords(n, top) for n in self.site_counts},
+            'page_keywords': {url: self.tfidf(url, top) for url in self.pages},
+        }
+
+
+def get_page_text(soup):
+    """
+    Returns the visible text of a parsed page, skipping comments and script, style
+    and template content. The soup is left unchanged.
+    """
+    hidden = {"script", "style", "noscript", "template"}
+    return " ".join(string for string in soup.find_all(string=True)
+                    if type(string) is NavigableString and string.parent.name not in hidden)
@@ -0,0 +1,258 @@
+from array import array
+from collections import deque
+from urllib.parse import urldefrag, urlparse
+from .data_extraction_functions import parse_sitemap
+from .scope_functions import load_scope
+from .site_audit_functions import crawl_site
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, PageRank falls back to pure Python
+    np = None
+
+# ============================================================
+# LINK GRAPH FUNCTIONS
+# Internal link graph analytics: PageRank, click depth, orphans.
+# ============================================================
+
+
+def normalize_url(url):
+    """
+    Normalizes a URL for use as a graph node: drops the fragment and turns an empty
+    path into "/", so "https://example.com" and "https://example.com/" are one page.
+    """
+    url = urldefrag(url)[0]
+    return url + "/" if not urlparse(url).path else url
+
+
+class LinkGraph:
+    """
+    Compact directed graph of internal links. Pages get integer IDs and edges are
+    stored in flat integer arrays; analytics run on a CSR (compressed sparse row)
+    view of the edge list.
+    """
+
+    def __init__(self):
+        self.node_ids = {}
+        self.urls = []
+        self.sources = array("l")
+        self.targets = array("l")
+        self._csr = None
+
+    def node(self, url):
+        """
+        Returns the integer ID of a page, adding it to the graph if needed.
+        """
+        node_id = self.node_ids.get(url)
+        if node_id is None:
+            normalized = normalize_url(url)
+            node_id = self.node_ids.get(normalized)
+            if node_id is None:
+                node_id = self.node_ids[normalized] = len(self.urls)
+                self.urls.append(normalized)
+            self.node_ids[url] = node_id  # Remember the raw spelling to skip normalizing it again
+        return node_id
+
+    def add_page(self, url, links):
+        """
+        Adds a crawled page and its outgoing internal links. Duplicate links and
+        self-links on the same page are counted once and ignored respectively.
+
+        Args:
+            url (str): The page URL.
+            links (iterable): Internal links found on the page.
+        """
+        source = self.node(url)
+        for target in {self.node(link) for link in links}:
+            if target != source:
+                self.sources.append(source)
+                self.targets.append(target)
+        self._csr = None
+
+    def __len__(self):
+        return len(self.urls)
+
+    @property
+    def edge_count(self):
+        return len(self.sources)
+
+    def to_csr(self):
+        """
+        Returns the graph as CSR arrays: the outgoing links of node i are
+        indices[indptr[i]:indptr[i + 1]].
+
+        Returns:
+            tuple: (indptr, indices) integer arrays.
+        """
+        if self._csr is None:
+            node_count = len(self.urls)
+            indptr = array("l", [0]) * (node_count + 1)
+            for source in self.sources:
+                indptr[source + 1] += 1
+            for node_id in range(node_count):
+                indptr[node_id + 1] += indptr[node_id]
+            fill = array("l", indptr)
+            indices = array("l", [0]) * len(self.sources)
+            for source, target in zip(self.sources, self.targets):
+                indices[fill[source]] = target
+                fill[source] += 1
+            self._csr = indptr, indices
+        return self._csr
+
+    def inbound_counts(self):
+        """
+        Returns the number of internal links pointing to each node, indexed by node ID.
+        """
+        counts = array("l", [0]) * len(self.urls)
+        for target in self.targets:
+            counts[target] += 1
+        return counts
+
+    def pagerank(self, damping=0.85, iterations=100, tolerance=1e-8):
+        """
+        Computes PageRank by power iteration. Rank of pages without outgoing links is
+        spread evenly over all pages. Uses numpy when it is installed.
+
+        Returns:
+            list: The PageRank of each node, indexed by node ID; the values sum to 1.
+        """
+        node_count = len(self.urls)
+        if not node_count:
+            return []
+
+        if np is not None:
+            sources = np.frombuffer(self.sources, dtype=np.int64 if self.sources.itemsize == 8 else np.int32)
+            targets = np.frombuffer(self.targets, dtype=sources.dtype)
+            out_degree = np.bincount(sources, minlength=node_count).astype(float)
+            dangling = out_degree == 0
+            weights = 1.0 / np.where(dangling, 1, out_degree)
+            rank = np.full(node_count, 1.0 / node_count)
+            for _ in range(iterations):
+                spread = np.bincount(targets, weights=(rank * weights)[sources], minlength=node_count)
+                updated = (1 - damping) / node_count + damping * (spread + rank[dangling].sum() / node_count)
+                converged = np.abs(updated - rank).sum() < tolerance
+                rank = updated
+                if converged:
+                    break
+            return rank.tolist()
+
+        out_degree = [0] * node_count
+        for source in self.sources:
+            out_degree[source] += 1
+        rank = [1.0 / node_count] * node_count
+        for _ in range(iterations):
+            dangling_rank = sum(rank[node_id] for node_id in range(node_count) if not out_degree[node_id])
+            base = (1 - damping) / node_count + damping * dangling_rank / node_count
+            updated = [base] * node_count
+            for source, target in zip(self.sources, self.targets):
+                updated[target] += damping * rank[source] / out_degree[source]
+            converged = sum(abs(new - old) for new, old in zip(updated, rank)) < tolerance
+            rank = updated
+            if converged:
+                break
+        return rank
+
+    def click_depth(self, start_url):
+        """
+        Computes the minimum number of clicks needed to reach each page from the start page.
+
+        Returns:
+            list: The depth of each node, indexed by node ID; -1 for unreachable pages.
+        """
+        depths = array("l", [-1]) * len(self.urls)
+        start = self.node_ids.get(normalize_url(start_url))
+        if start is None:
+            return depths.tolist()
+        indptr, indices = self.to_csr()
+        depths[start] = 0
+        queue = deque([start])
+        while queue:
+            node_id = queue.popleft()
+            for target in indices[indptr[node_id]:indptr[node_id + 1]]:
+                if depths[target] < 0:
+                    depths[target] = depths[node_id] + 1
+                    queue.append(target)
+        return depths.tolist()
+
+    def orphan_pages(self, sitemap_urls, start_url=None):
+        """
+        Returns the sitemap URLs that no crawled page links to.
+
+        Args:
+            sitemap_urls (iterable): URLs listed in the sitemap.
+            start_url (str, optional): The homepage, which is never reported as an orphan.
+        """
+        inbound = self.inbound_counts()
+        start = normalize_url(start_url) if start_url else None
+        orphans = []
+        for url in sitemap_urls:
+            url = normalize_url(url)
+            node_id = self.node_ids.get(url)
+            if url != start and (node_id is None or not inbound[node_id]):
+                orphans.append(url)
+        return orphans
+
+    def report(self, start_url, sitemap_urls=(), top=20):
+        """
+        Summarizes the graph: top pages by PageRank, click depth distribution, pages
+        with the fewest inbound links, unreachable pages and sitemap orphans.
+
+        Returns:
+            dict: The link graph metrics.
+        """
+        rank = self.pagerank()
+        depths = self.click_depth(start_url)
+        inbound = self.inbound_counts()
+        depth_distribution = {}
+        for depth in depths:
+            depth_distribution[depth] = depth_distribution.get(depth, 0) + 1
+        by_rank = sorted(range(len(self.urls)), key=lambda node_id: rank[node_id], reverse=True)
+
+        return {
+            'pages': len(self.urls),
+            'links': self.edge_count,
+            'top_pagerank': [(self.urls[node_id], round(rank[node_id], 6)) for node_id in by_rank[:top]],
+            'depth_distribution': {str(depth): count for depth, count in sorted(depth_distribution.items())},
+            'least_linked': [(self.urls[node_id], inbound[node_id])
+                             for node_id in sorted(range(len(self.urls)), key=inbound.__getitem__)[:top]],
+            'unreachable': [self.urls[node_id] for node_id, depth in enumerate(depths) if depth < 0][:top],
+            'orphans': self.orphan_pages(sitemap_urls, start_url),
+        }
+
+
+def build_link_graph(url, max_pages=1000, workers=8, session=None, force=False, scope=None, progress=None):
+    """
+    Crawls a site by following its internal links and builds its link graph.
+
+    Args:
+        url (str): The homepage to start from.
+        max_pages (int): Maximum number of pages to crawl.
+        workers (int): Number of pages fetched concurrently.
+        session (Session, optional): A session object for authenticated requests.
+        force (bool): If True, ignores robots.txt.
+        scope (CrawlScope, optional): Only pages in this scope are crawled.
+        progress (CrawlProgress, optional): Live progress view.
+
+    Returns:
+        LinkGraph: The link graph of the crawled pages.
+    """
+    graph = LinkGraph()
+    graph.node(url)
+    for page_url, _, internal_links, error in crawl_site(url, max_pages=max_pages, workers=workers,
+                                                         session=session, force=force, scope=scope,
+                                                         progress=progress):
+        if not error:
+            graph.add_page(page_url, internal_links)
+    return graph
+
+
+def analyze_link_graph(url, max_pages=1000, workers=8, session=None, force=False, top=20, scope=None,
+                       progress=None):
+    """
+    Crawls a site and returns its link graph report, including orphan pages that are
+    listed in the sitemap but never linked. Sitemap URLs outside the scope are not
+    reported as orphans.
+    """
+    scope = load_scope(scope)
+    graph = build_link_graph(url, max_pages, workers, session, force, scope, progress)
+    return graph.report(url, parse_sitemap(url.rstrip("/"), scope=scope), top)
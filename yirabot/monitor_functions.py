@@ -0,0 +1,446 @@
+import hashlib
+import json
+import sqlite3
+import time
+from urllib.parse import urlsplit
+import requests
+from bs4 import BeautifulSoup, NavigableString
+from rich import print
+from .data_extraction_functions import extract_page_data, parse_sitemap_entries
+from .helper_functions import get_random_user_agent, dynamic_delay
+from .request_functions import fetch_page, get_body_encoding, MAX_CONTENT_BYTES
+from .scope_functions import CrawlScope, load_scope
+from .site_audit_functions import crawl_site
+
+# ============================================================
+# MONITOR FUNCTIONS
+# Recurring recrawls scheduled from sitemap hints and observed change rates.
+# ============================================================
+
+DEFAULT_MONITOR_FILE = "yirabot_monitor.db"
+# Seconds between recrawls suggested by each sitemap <changefreq>
+CHANGEFREQ_INTERVALS = {
+    'always': 0,
+    'hourly': 3600,
+    'daily': 86400,
+    'weekly': 7 * 86400,
+    'monthly': 30 * 86400,
+    'yearly': 365 * 86400,
+    'never': 365 * 86400,
+}
+DEFAULT_RECRAWL_INTERVAL = 86400
+MIN_RECRAWL_INTERVAL = 900
+MAX_RECRAWL_INTERVAL = 30 * 86400
+DEFAULT_PRIORITY = 0.5
+SITEMAP_REFRESH_INTERVAL = 3600
+# Text inside these tags does not count towards a page's content fingerprint
+NON_CONTENT_TAGS = {"script", "style", "noscript", "template"}
+
+
+def hint_interval(changefreq=None, lastmod=None, now=None):
+    """
+    Returns the recrawl interval suggested by a URL's sitemap hints. Without a changefreq,
+    a page is expected to stay unchanged for about as long as it has been since its lastmod.
+
+    Args:
+        changefreq (str, optional): The sitemap <changefreq>.
+        lastmod (float, optional): The sitemap <lastmod> as a Unix timestamp.
+        now (float, optional): The current time. Defaults to time.time().
+
+    Returns:
+        float: The suggested interval in seconds.
+    """
+    if changefreq in CHANGEFREQ_INTERVALS:
+        return CHANGEFREQ_INTERVALS[changefreq]
+    if lastmod is not None:
+        return max((now or time.time()) - lastmod, 0)
+    return DEFAULT_RECRAWL_INTERVAL
+
+
+def estimate_recrawl_interval(hint, observed_seconds=0.0, changes=0):
+    """
+    Estimates the mean time between changes of a page. The sitemap hint counts as one
+    change observed after `hint` seconds, so it decides the interval of new pages and is
+    outweighed by the observed change rate as fetches accumulate. Pages that keep coming
+    back unchanged are rechecked less and less often.
+
+    Args:
+        hint (float): The interval suggested by the sitemap (see hint_interval).
+        observed_seconds (float): Time between the first and the latest fetch of the page.
+        changes (int): Number of changes seen in that time.
+
+    Returns:
+        float: The interval in seconds, between MIN_RECRAWL_INTERVAL and MAX_RECRAWL_INTERVAL.
+    """
+    interval = (hint + observed_seconds) / (changes + 1)
+    return min(max(interval, MIN_RECRAWL_INTERVAL), MAX_RECRAWL_INTERVAL)
+
+
+def page_fingerprint(soup):
+    """
+    Hashes the visible text of a parsed page with its whitespace normalized. Markup,
+    scripts and comments are left out, so rotating nonces and tracking code are not
+    reported as changes.
+
+    Args:
+        soup (BeautifulSoup): The parsed page.
+
+    Returns:
+        str: A 32-character hex digest.
+    """
+    texts = (text for text in soup.find_all(string=True)
+             if type(text) is NavigableString and text.parent.name not in NON_CONTENT_TAGS)
+    text = " ".join(" ".join(texts).split())
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def fetch_monitored_page(url, validators=None, session=None, max_bytes=MAX_CONTENT_BYTES):
+    """
+    Fetches a page with a conditional request and fingerprints its content. The page data
+    is only extracted when the fingerprint differs from the previous one.
+
+    Args:
+        url (str): The page URL.
+        validators (tuple, optional): (etag, last_modified, fingerprint) of the previous fetch.
+        session (Session, optional): A session object for authenticated requests.
+        max_bytes (int, optional): Maximum page size in bytes.
+
+    Returns:
+        dict: 'status', 'etag', 'last_modified', 'fingerprint' and 'data'. The last two are
+        None when the server answered 304 Not Modified, and 'data' is None when the page
+        is unchanged.
+    """
+    etag, last_modified, fingerprint = validators or (None, None, None)
+    headers = {'User-Agent': get_random_user_agent()}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    response, body = fetch_page(url, session=session, headers=headers, max_bytes=max_bytes)
+    dynamic_delay(response, script=True)
+    response.raise_for_status()
+
+    result = {'status': response.status_code, 'etag': response.headers.get("ETag"),
+              'last_modified': response.headers.get("Last-Modified"), 'fingerprint': None, 'data': None}
+    if response.status_code != 304:
+        soup = BeautifulSoup(body, 'html.parser', from_encoding=get_body_encoding(response, body))
+        result['fingerprint'] = page_fingerprint(soup)
+        if result['fingerprint'] != fingerprint:
+            result['data'] = extract_page_data(soup, url)
+    return result
+
+
+class RecrawlScheduler:
+    """
+    Keeps a next-due time for every URL of a site in a SQLite file and recrawls only
+    the URLs that are due, highest sitemap priority first. All state is keyed by the
+    site's host, so monitors of several sites can share one file.
+
+    Intervals start from the sitemap's changefreq and lastmod hints and follow the change
+    rate observed through content fingerprints (see estimate_recrawl_interval). A newer
+    lastmod in the sitemap makes a URL due at once. Requests are conditional, so
+    unchanged pages often cost a 304 without a body.
+    """
+
+    def __init__(self, url, path=DEFAULT_MONITOR_FILE, scope=None, timeout=30):
+        """
+        Opens (or creates) the monitor state file.
+
+        Args:
+            url (str): The site URL whose sitemap is monitored.
+            path (str): Path of the SQLite state file.
+            scope (CrawlScope, optional): Scope filter stored in the file for this site.
+                Out-of-scope sitemap URLs are never scheduled.
+            timeout (int): Seconds to wait for a lock held by another process.
+        """
+        self.url = url
+        self.host = urlsplit(url).netloc
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (
+                host TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT,
+                PRIMARY KEY (host, key)
+            );
+            CREATE TABLE IF NOT EXISTS pages (
+                host TEXT NOT NULL,
+                url TEXT NOT NULL,
+                priority REAL NOT NULL,
+                changefreq TEXT,
+                lastmod REAL,
+                next_due REAL NOT NULL,
+                interval REAL NOT NULL,
+                first_fetched REAL,
+                last_fetched REAL,
+                fetches INTEGER NOT NULL DEFAULT 0,
+                changes INTEGER NOT NULL DEFAULT 0,
+                fingerprint TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                error TEXT,
+                PRIMARY KEY (host, url)
+            );
+            CREATE INDEX IF NOT EXISTS pages_due ON pages (host, next_due, priority);
+        """)
+        scope = load_scope(scope)
+        if scope is not None:
+            self._set_meta("scope", json.dumps(scope.spec))
+        scope_spec = self._get_meta("scope")
+        self.scope = CrawlScope.from_dict(json.loads(scope_spec)) if scope_spec else None
+
+    def _set_meta(self, key, value):
+        self.connection.execute("INSERT OR REPLACE INTO meta (host, key, value) VALUES (?, ?, ?)",
+                                (self.host, key, str(value)))
+
+    def _get_meta(self, key, default=None):
+        row = self.connection.execute("SELECT value FROM meta WHERE host = ? AND key = ?",
+                                      (self.host, key)).fetchone()
+        return row[0] if row else default
+
+    def add(self, entries, now=None):
+        """
+        Schedules URLs or sitemap entries. New URLs are due at once. Known URLs get the new
+        hints, and are made due at once if their lastmod is newer than their last fetch.
+
+        Args:
+            entries (iterable): URLs, or dicts with 'url' and optional 'lastmod', 'changefreq'
+                and 'priority' (see extract_sitemap_entries).
+            now (float, optional): The current time. Defaults to time.time().
+
+        Returns:
+            int: The number of newly scheduled URLs.
+        """
+        now = now or time.time()
+        rows = []
+        for entry in entries:
+            entry = {'url': entry} if isinstance(entry, str) else entry
+            if self.scope is not None and not self.scope.allows(entry['url']):
+                continue
+            changefreq, lastmod = entry.get('changefreq'), entry.get('lastmod')
+            priority = entry.get('priority')
+            rows.append((self.host, entry['url'], DEFAULT_PRIORITY if priority is None else priority, changefreq,
+                         lastmod, now, estimate_recrawl_interval(hint_interval(changefreq, lastmod, now))))
+
+        cursor = self.connection.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            known = cursor.execute("SELECT COUNT(*) FROM pages WHERE host = ?", (self.host,)).fetchone()[0]
+            cursor.executemany("""
+                INSERT INTO pages (host, url, priority, changefreq, lastmod, next_due, interval)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (host, url) DO UPDATE SET
+                    priority = excluded.priority,
+                    changefreq = excluded.changefreq,
+                    lastmod = COALESCE(excluded.lastmod, lastmod),
+                    interval = CASE WHEN last_fetched IS NULL THEN excluded.interval ELSE interval END,
+                    next_due = CASE WHEN excluded.lastmod > last_fetched THEN excluded.next_due ELSE next_due END
+            """, rows)
+            added = cursor.execute("SELECT COUNT(*) FROM pages WHERE host = ?", (self.host,)).fetchone()[0] - known
+            cursor.execute("COMMIT")
+        except sqlite3.Error:
+            cursor.execute("ROLLBACK")
+            raise
+        return added
+
+    def refresh_sitemap(self, now=None):
+        """
+        Reads the site's sitemap and schedules its URLs (see add). The child sitemaps of a
+        sitemap index are read in its place. A site without a sitemap is monitored through
+        its start URL alone.
+
+        Returns:
+            int: The number of newly scheduled URLs.
+        """
+        now = now or time.time()
+        entries = parse_sitemap_entries(self.url.rstrip("/"), scope=self.scope, expand_index=True)
+        self._set_meta("sitemap_checked", now)
+        return self.add(entries or [self.url], now)
+
+    def due(self, limit=100, now=None):
+        """
+        Returns the URLs that are due, highest priority first and then the most overdue.
+
+        Args:
+            limit (int): Maximum number of URLs.
+            now (float, optional): The current time. Defaults to time.time().
+
+        Returns:
+            list: The due URLs.
+        """
+        rows = self.connection.execute(
+            "SELECT url FROM pages WHERE host = ? AND next_due <= ? ORDER BY priority DESC, next_due LIMIT ?",
+            (self.host, now or time.time(), limit)).fetchall()
+        return [url for url, in rows]
+
+    def next_due(self):
+        """
+        Returns the time the next URL becomes due, or None if nothing is scheduled.
+        """
+        return self.connection.execute("SELECT MIN(next_due) FROM pages WHERE host = ?", (self.host,)).fetchone()[0]
+
+    def record(self, url, result=None, error=None, now=None):
+        """
+        Stores the outcome of a fetch and schedules the URL's next recrawl.
+
+        Args:
+            url (str): The fetched URL.
+            result (dict, optional): The result of fetch_monitored_page.
+            error (str, optional): The error message if the fetch failed.
+            now (float, optional): The time of the fetch. Defaults to time.time().
+
+        Returns:
+            str: 'new', 'changed', 'unchanged', 'not_modified' or 'failed'.
+        """
+        now = now or time.time()
+        changefreq, lastmod, first_fetched, changes, fingerprint, interval = self.connection.execute(
+            "SELECT changefreq, lastmod, first_fetched, changes, fingerprint, interval FROM pages "
+            "WHERE host = ? AND url = ?", (self.host, url)).fetchone()
+        if error is not None:
+            # Failing pages are retried at their usual pace rather than hammered every cycle
+            self.connection.execute("UPDATE pages SET error = ?, next_due = ? WHERE host = ? AND url = ?",
+                                    (error, now + interval, self.host, url))
+            return "failed"
+
+        if result['fingerprint'] is None:
+            status = "not_modified"
+        elif fingerprint is None:
+            status = "new"
+        else:
+            status = "changed" if result['fingerprint'] != fingerprint else "unchanged"
+        changes += status == "changed"
+        first_fetched = first_fetched or now
+        interval = estimate_recrawl_interval(hint_interval(changefreq, lastmod, now), now - first_fetched, changes)
+        self.connection.execute("""
+            UPDATE pages SET first_fetched = ?, last_fetched = ?, fetches = fetches + 1, changes = ?,
+                fingerprint = COALESCE(?, fingerprint), etag = COALESCE(?, etag),
+                last_modified = COALESCE(?, last_modified), interval = ?, next_due = ?, error = NULL
+            WHERE host = ? AND url = ?
+        """, (first_fetched, now, changes, result['fingerprint'], result['etag'], result['last_modified'],
+              interval, now + interval, self.host, url))
+        return status
+
+    def run_cycle(self, max_pages=100, workers=8, session=None, force=False, max_bytes=MAX_CONTENT_BYTES,
+                  on_page=None, progress=None):
+        """
+        Recrawls up to `max_pages` due URLs concurrently and reschedules them.
+
+        Args:
+            max_pages (int): Maximum number of URLs fetched in this cycle.
+            workers (int): Number of pages fetched concurrently.
+            session (Session, optional): A session object for authenticated requests.
+            force (bool): If True, ignores robots.txt.
+            max_bytes (int, optional): Maximum page size in bytes.
+            on_page (callable, optional): Called with (url, status, data) after every page;
+                data is the extracted page data of new and changed pages.
+            progress (CrawlProgress, optional): Live progress view.
+
+        Returns:
+            dict: The number of pages per status, e.g. {'changed': 3, 'unchanged': 40}.
+        """
+        urls = self.due(max_pages)
+        if not urls:
+            return {}
+        placeholders = ",".join("?" * len(urls))
+        validators = {url: (etag, last_modified, fingerprint) for url, etag, last_modified, fingerprint in
+                      self.connection.execute(f"SELECT url, etag, last_modified, fingerprint FROM pages "
+                                              f"WHERE host = ? AND url IN ({placeholders})", [self.host] + urls)}
+
+        def fetch(page_url, process_page, session, max_bytes):
+            return fetch_monitored_page(page_url, validators.get(page_url), session, max_bytes), []
+
+        counts = {}
+        for page_url, result, _, error in crawl_site(self.url, seeds=urls, follow_links=False, max_pages=len(urls),
+                                                     workers=workers, session=session, force=force,
+                                                     max_bytes=max_bytes, fetch=fetch, progress=progress):
+            status = self.record(page_url, result, str(error) if error else None)
+            counts[status] = counts.get(status, 0) + 1
+            on_page(page_url, status, result['data'] if result else None) if on_page else None
+        # Due URLs disallowed by robots.txt are skipped by crawl_site; push them back a full interval
+        self.connection.execute(f"UPDATE pages SET next_due = ? + interval WHERE host = ? AND next_due <= ? "
+                                f"AND url IN ({placeholders})", [time.time(), self.host, time.time()] + urls)
+        return counts
+
+    def run(self, max_pages=100, cycle_seconds=60, cycles=None, output=None, workers=8, session=None, force=False,
+            max_bytes=MAX_CONTENT_BYTES, sitemap_interval=SITEMAP_REFRESH_INTERVAL, script=False):
+        """
+        Monitors the site continuously. Every cycle re-reads the sitemap when it is older
+        than `sitemap_interval`, then recrawls at most `max_pages` due URLs, so no more
+        than `max_pages` pages are requested per `cycle_seconds`. When nothing is due, the
+        monitor sleeps until the next URL is.
+
+        Args:
+            max_pages (int): Maximum number of URLs fetched per cycle.
+            cycle_seconds (float): Minimum number of seconds between the start of two cycles.
+            cycles (int, optional): Number of cycles to run. None runs until interrupted.
+            output (str, optional): Path of an NDJSON file to which new and changed pages are appended.
+            workers (int): Number of pages fetched concurrently.
+            session (Session, optional): A session object for authenticated requests.
+            force (bool): If True, ignores robots.txt.
+            max_bytes (int, optional): Maximum page size in bytes.
+            sitemap_interval (float): Seconds between sitemap refreshes.
+            script (bool): Flag indicating if progress messages should be suppressed.
+
+        Returns:
+            dict: The number of pages per status over all cycles.
+        """
+        output_file = open(output, "a") if output else None
+        totals = {}
+
+        def write_change(url, status, data):
+            if output_file and data is not None:
+                output_file.write(json.dumps({'url': url, 'status': status, 'fetched_at': time.time(),
+                                              'data': data}) + "\n")
+                output_file.flush()
+
+        cycle = 0
+        try:
+            # A session of our own is closed when monitoring stops
+            with requests.Session() as own_session:
+                session = session or own_session
+                while cycles is None or cycle < cycles:
+                    started = time.time()
+                    sitemap_checked = float(self._get_meta("sitemap_checked", 0))
+                    if started - sitemap_checked >= sitemap_interval:
+                        added = self.refresh_sitemap(started)
+                        sitemap_checked = started
+                        print(f"YiraBot: Sitemap read, {added} new URLs scheduled") if not script and added else None
+                    counts = self.run_cycle(max_pages, workers, session, force, max_bytes, on_page=write_change)
+                    for status, count in counts.items():
+                        totals[status] = totals.get(status, 0) + count
+                    cycle += 1
+                    if counts and not script:
+                        print("YiraBot: Cycle " + str(cycle) + ": " + ", ".join(
+                            f"{count} {status.replace('_', ' ')}" for status, count in sorted(counts.items())))
+                    if cycles is not None and cycle >= cycles:
+                        break
+
+                    # Sleep until the next URL is due or the sitemap is stale, but never start cycles faster
+                    wake = sitemap_checked + sitemap_interval
+                    next_due = self.next_due()
+                    if next_due is not None:
+                        wake = min(wake, next_due)
+                    time.sleep(max(max(wake, started + cycle_seconds) - time.time(), 0))
+        finally:
+            if output_file:
+                output_file.close()
+        return totals
+
+    def stats(self):
+        """
+        Returns the number of scheduled, due and failing URLs, fetches and observed changes,
+        and the median recrawl interval in seconds.
+        """
+        now = time.time()
+        pages, due, failing, fetches, changes = self.connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(next_due <= ?), 0), COUNT(error), COALESCE(SUM(fetches), 0), "
+            "COALESCE(SUM(changes), 0) FROM pages WHERE host = ?", (now, self.host)).fetchone()
+        median = self.connection.execute("SELECT interval FROM pages WHERE host = ? ORDER BY interval "
+                                         "LIMIT 1 OFFSET ?", (self.host, pages // 2)).fetchone()
+        return {'pages': pages, 'due': due, 'failing': failing, 'fetches': fetches, 'changes': changes,
+                'median_interval': median[0] if median else None}
+
+    def close(self):
+        self.connection.close()
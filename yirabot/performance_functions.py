@@ -0,0 +1,410 @@
+import json
+import re
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from heapq import nlargest
+from statistics import median
+from urllib.parse import urljoin
+import requests
+from bs4 import BeautifulSoup
+from .cache_functions import TTLCache
+from .connection_functions import create_pooled_session
+from .data_extraction_functions import extract_links, parse_sitemap
+from .helper_functions import get_random_user_agent, dynamic_delay
+from .keyword_functions import TopKCounter
+from .request_functions import open_stream, iter_body, get_body_encoding, MAX_CONTENT_BYTES
+from .retry_functions import DEFAULT_RETRY_POLICY
+from .scope_functions import load_scope
+from .site_audit_functions import crawl_site
+
+# ============================================================
+# PERFORMANCE FUNCTIONS
+# Page weight, timing and render-blocking resource audits.
+# ============================================================
+
+ASSET_KINDS = ("image", "script", "stylesheet")
+# Transfer sizes above which a single asset is reported as oversized
+OVERSIZED_ASSET_BYTES = {'image': 200 * 1024, 'script': 150 * 1024, 'stylesheet': 100 * 1024}
+# Total transfer size above which a page is reported as too heavy
+PAGE_WEIGHT_BUDGET = 1600 * 1024
+CONTENT_RANGE_PATTERN = re.compile(r"/(\d+)\s*$")
+NON_BLOCKING_MEDIA = ("print",)
+
+
+def find_page_assets(soup, url):
+    """
+    Collects the images, scripts and stylesheets a page references, resolved and
+    deduplicated, and the resources in <head> that block rendering: stylesheets not
+    limited to print media, and external scripts without async, defer or type="module".
+
+    Args:
+        soup (BeautifulSoup): The parsed page.
+        url (str): The page URL, used to resolve relative references.
+
+    Returns:
+        tuple: A dict of asset URLs by kind, and a dict with the render-blocking 'scripts'
+        and 'stylesheets' URLs.
+    """
+    assets = {kind: {} for kind in ASSET_KINDS}
+    blocking = {'scripts': [], 'stylesheets': []}
+    head = soup.find('head')
+    head_tags = {id(tag) for tag in head.find_all(['script', 'link'])} if head else set()
+    for tag in soup.find_all(['img', 'script', 'link']):
+        if tag.name == 'img':
+            kind, reference = "image", tag.get('src')
+        elif tag.name == 'script':
+            kind, reference = "script", tag.get('src')
+        elif 'stylesheet' in (tag.get('rel') or ()):
+            kind, reference = "stylesheet", tag.get('href')
+        else:
+            continue
+        if not reference or reference.startswith("data:"):
+            continue
+        asset_url = urljoin(url, reference.strip()).split('#')[0]
+        assets[kind][asset_url] = None
+
+        if id(tag) not in head_tags:
+            continue
+        if kind == "script" and not tag.has_attr('async') and not tag.has_attr('defer') \
+                and tag.get('type') != "module":
+            blocking['scripts'].append(asset_url)
+        elif kind == "stylesheet" and (tag.get('media') or "all").strip().lower() not in NON_BLOCKING_MEDIA:
+            blocking['stylesheets'].append(asset_url)
+    return {kind: list(urls) for kind, urls in assets.items()}, blocking
+
+
+class AssetSizeCache:
+    """
+    Measures the transfer size of assets with HEAD requests on a shared thread pool.
+    Sizes are cached for an hour, and a request already in flight is shared, so an
+    asset used on every page of a site (a logo, the main stylesheet) is requested once
+    however many pages are audited concurrently.
+    """
+
+    def __init__(self, workers=16, session=None, retry=DEFAULT_RETRY_POLICY, ttl=3600, max_entries=10000):
+        """
+        Args:
+            workers (int): Number of concurrent asset requests.
+            session (Session, optional): Session for the requests; defaults to one pooling many hosts.
+            retry (RetryPolicy): Retry and circuit breaker policy for the requests.
+            ttl (int): Seconds a measured size is reused.
+            max_entries (int): Maximum number of cached sizes.
+        """
+        self.workers = workers
+        self.session = session
+        self.retry = retry
+        self.sizes = TTLCache(ttl=ttl, max_entries=max_entries)
+        self.in_flight = {}
+        self.lock = threading.RLock()  # Callbacks of already finished requests run while it is held
+        self.executor = None
+        self.requests = 0
+
+    def measure(self, url):
+        """
+        Returns the transfer size of an asset in bytes, or None if it is unknown. The
+        Content-Length of a HEAD response is used; servers that omit it are asked for
+        the first byte, whose Content-Range carries the full size.
+        """
+        headers = {'User-Agent': get_random_user_agent()}
+        try:
+            response = self.retry.request("HEAD", url, session=self.session, headers=headers,
+                                          allow_redirects=True, timeout=10)
+            if response.ok and response.headers.get("Content-Length", "").isdigit():
+                return int(response.headers["Content-Length"])
+            headers['Range'] = "bytes=0-0"
+            response = self.retry.request("GET", url, session=self.session, headers=headers,
+                                          allow_redirects=True, timeout=10, stream=True)
+            response.close()
+        except requests.exceptions.RequestException:
+            return None
+        match = CONTENT_RANGE_PATTERN.search(response.headers.get("Content-Range", ""))
+        if response.status_code == 206 and match:
+            return int(match.group(1))
+        length = response.headers.get("Content-Length", "")
+        return int(length) if response.status_code == 200 and length.isdigit() else None
+
+    def _done(self, url, future):
+        with self.lock:
+            self.in_flight.pop(url, None)
+            if not future.exception():
+                self.sizes.put(url, (future.result(),))
+
+    def sizes_of(self, urls):
+        """
+        Returns the transfer sizes of several assets, measuring the uncached ones concurrently.
+
+        Args:
+            urls (iterable): The asset URLs.
+
+        Returns:
+            dict: Asset URL to size in bytes, or None if unknown.
+        """
+        results = {}
+        futures = {}
+        with self.lock:
+            if self.executor is None:
+                self.session = self.session or create_pooled_session()
+                self.executor = ThreadPoolExecutor(max_workers=self.workers)
+            for url in urls:
+                cached = self.sizes.get(url)
+                if cached is not None:
+                    results[url] = cached[0]
+                elif url in self.in_flight:
+                    futures[url] = self.in_flight[url]
+                else:
+                    future = self.executor.submit(self.measure, url)
+                    self.requests += 1
+                    self.in_flight[url] = futures[url] = future
+                    future.add_done_callback(lambda done, url=url: self._done(url, done))
+        for url, future in futures.items():
+            results[url] = future.result()
+        return results
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def fetch_timed_page(url, session=None, headers=None, max_bytes=MAX_CONTENT_BYTES, retry=DEFAULT_RETRY_POLICY):
+    """
+    Downloads a page and times it: TTFB is the time until the response headers
+    arrived, including DNS, connection and TLS setup, and the total time includes
+    reading the whole body. Only the attempt that returned the page is timed, so
+    retries and their backoff do not inflate either.
+
+    Returns:
+        tuple: The response, the body, TTFB and total time in seconds, and the transfer
+        size (the compressed size when the body was compressed).
+    """
+    response = open_stream(url, session, headers, max_bytes=max_bytes, retry=retry)
+    ttfb = response.elapsed.total_seconds()
+    started = time.perf_counter()
+    try:
+        body = b"".join(iter_body(response, max_bytes))
+    finally:
+        response.close()
+    total = ttfb + time.perf_counter() - started
+    try:
+        transfer_bytes = response.raw.tell()
+    except (AttributeError, OSError):
+        transfer_bytes = len(body)
+    return response, body, ttfb, total, transfer_bytes or len(body)
+
+
+def page_weight_report(url, soup, ttfb, total_time, html_bytes, assets, limits=None):
+    """
+    Builds the performance report of a page from its timing, its HTML size and an
+    AssetSizeCache.
+
+    Args:
+        url (str): The page URL.
+        soup (BeautifulSoup): The parsed page.
+        ttfb (float): Time to first byte in seconds.
+        total_time (float): Total HTML transfer time in seconds.
+        html_bytes (int): Transfer size of the HTML.
+        assets (AssetSizeCache): Measures the referenced assets.
+        limits (dict, optional): Oversized thresholds by asset kind; defaults to OVERSIZED_ASSET_BYTES.
+
+    Returns:
+        dict: The page report.
+    """
+    limits = limits or OVERSIZED_ASSET_BYTES
+    asset_urls, blocking = find_page_assets(soup, url)
+    sizes = assets.sizes_of(url for urls in asset_urls.values() for url in urls)
+
+    asset_bytes = {}
+    oversized = []
+    unknown = 0
+    for kind, urls in asset_urls.items():
+        asset_bytes[kind] = 0
+        for asset_url in urls:
+            size = sizes.get(asset_url)
+            if size is None:
+                unknown += 1
+                continue
+            asset_bytes[kind] += size
+            if size > limits.get(kind, float("inf")):
+                oversized.append({'url': asset_url, 'kind': kind, 'bytes': size})
+    total_bytes = html_bytes + sum(asset_bytes.values())
+
+    return {
+        'ttfb': round(ttfb, 3),
+        'total_time': round(total_time, 3),
+        'html_bytes': html_bytes,
+        'asset_bytes': asset_bytes,
+        'asset_counts': {kind: len(urls) for kind, urls in asset_urls.items()},
+        'unknown_size_assets': unknown,
+        'total_bytes': total_bytes,
+        'over_budget': total_bytes > PAGE_WEIGHT_BUDGET,
+        'oversized_assets': sorted(oversized, key=lambda asset: -asset['bytes']),
+        'render_blocking': blocking,
+    }
+
+
+def analyze_page_weight(url, session=None, assets=None, max_bytes=MAX_CONTENT_BYTES, retry=DEFAULT_RETRY_POLICY,
+                        limits=None):
+    """
+    Measures a page's TTFB, HTML transfer time and total weight, and finds its
+    oversized assets and render-blocking resources.
+
+    Args:
+        url (str): The page URL.
+        session (Session, optional): A session object for authenticated requests.
+        assets (AssetSizeCache, optional): Shared asset size cache; pass one to reuse sizes across pages.
+        max_bytes (int, optional): Maximum page size in bytes.
+        retry (RetryPolicy): Retry and circuit breaker policy for the requests.
+        limits (dict, optional): Oversized thresholds by asset kind.
+
+    Returns:
+        dict: The page report (see page_weight_report).
+    """
+    response, body, ttfb, total_time, html_bytes = fetch_timed_page(
+        url, session=session, headers={'User-Agent': get_random_user_agent()}, max_bytes=max_bytes, retry=retry)
+    response.raise_for_status()
+    soup = BeautifulSoup(body, 'html.parser', from_encoding=get_body_encoding(response, body))
+    if assets is not None:
+        return page_weight_report(url, soup, ttfb, total_time, html_bytes, assets, limits)
+    with AssetSizeCache(retry=retry) as assets:
+        return page_weight_report(url, soup, ttfb, total_time, html_bytes, assets, limits)
+
+
+class PageWeightAggregator:
+    """
+    Streams per-page performance reports into site-level findings: timing percentiles,
+    the heaviest and slowest pages and the oversized assets shared by most pages.
+    Timings are kept in compact arrays and the rankings are bounded.
+    """
+
+    def __init__(self, top=20):
+        self.top = top
+        self.pages = 0
+        self.failed = 0
+        self.ttfb = array('d')
+        self.total_times = array('d')
+        self.total_bytes = 0
+        self.over_budget = 0
+        self.render_blocking_pages = 0
+        self.render_blocking = 0
+        self.heaviest = []
+        self.slowest = []
+        self.oversized = TopKCounter(1000)
+        self.oversized_bytes = {}
+
+    def add(self, url, report):
+        self.pages += 1
+        self.ttfb.append(report['ttfb'])
+        self.total_times.append(report['total_time'])
+        self.total_bytes += report['total_bytes']
+        self.over_budget += report['over_budget']
+        blocking = len(report['render_blocking']['scripts']) + len(report['render_blocking']['stylesheets'])
+        self.render_blocking += blocking
+        self.render_blocking_pages += bool(blocking)
+        self.heaviest = nlargest(self.top, self.heaviest + [(report['total_bytes'], url)])
+        self.slowest = nlargest(self.top, self.slowest + [(report['ttfb'], url)])
+        for asset in report['oversized_assets']:
+            self.oversized.add(asset['url'])
+            self.oversized_bytes[asset['url']] = asset['bytes']
+        if len(self.oversized_bytes) > 2 * self.oversized.capacity:
+            self.oversized_bytes = {url: size for url, size in self.oversized_bytes.items()
+                                    if url in self.oversized.counts}
+
+    def add_failure(self):
+        self.failed += 1
+
+    @staticmethod
+    def _percentile(values, fraction):
+        ordered = sorted(values)
+        return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] if ordered else None
+
+    def summary(self):
+        """
+        Returns the site-level findings as a dictionary.
+        """
+        return {
+            'pages_audited': self.pages,
+            'pages_failed': self.failed,
+            'ttfb_median': median(self.ttfb) if self.ttfb else None,
+            'ttfb_p90': self._percentile(self.ttfb, 0.9),
+            'total_time_median': median(self.total_times) if self.total_times else None,
+            'average_page_bytes': self.total_bytes // self.pages if self.pages else 0,
+            'pages_over_budget': self.over_budget,
+            'pages_with_render_blocking': self.render_blocking_pages,
+            'render_blocking_resources': self.render_blocking,
+            'heaviest_pages': [(url, size) for size, url in self.heaviest],
+            'slowest_pages': [(url, ttfb) for ttfb, url in self.slowest],
+            'oversized_assets': [{'url': url, 'bytes': self.oversized_bytes.get(url), 'pages': count}
+                                 for url, count in self.oversized.most_common(self.top)],
+        }
+
+
+def audit_page_weight(url, output=None, max_pages=500, workers=8, session=None, force=False,
+                      max_bytes=MAX_CONTENT_BYTES, scope=None, assets=None, limits=None, progress=None):
+    """
+    Audits the performance of a whole site concurrently. Pages come from the site's
+    sitemap, or from following internal links; every page is timed and weighed, with
+    asset sizes shared across pages, streamed to an optional NDJSON file and folded
+    into a PageWeightAggregator.
+
+    Args:
+        url (str): The site URL.
+        output (str, optional): Path of the per-page NDJSON file to write.
+        max_pages (int): Maximum number of pages to audit.
+        workers (int): Number of pages fetched concurrently.
+        session (Session, optional): A session object for authenticated requests.
+        force (bool): If True, ignores robots.txt.
+        max_bytes (int, optional): Maximum page size in bytes.
+        scope (CrawlScope, optional): Only pages in this scope are audited.
+        assets (AssetSizeCache, optional): Shared asset size cache.
+        limits (dict, optional): Oversized thresholds by asset kind.
+        progress (CrawlProgress, optional): Live progress view.
+
+    Returns:
+        dict: The site-level summary (see PageWeightAggregator.summary).
+    """
+    scope = load_scope(scope)
+    sitemap_urls = parse_sitemap(url.rstrip("/"), scope=scope)
+    aggregator = PageWeightAggregator()
+    own_assets = assets is None
+    assets = assets or AssetSizeCache()
+
+    def fetch(page_url, process_page, session, max_bytes):
+        response, body, ttfb, total_time, html_bytes = fetch_timed_page(
+            page_url, session=session, headers={'User-Agent': get_random_user_agent()}, max_bytes=max_bytes)
+        dynamic_delay(response, script=True)
+        response.raise_for_status()
+        soup = BeautifulSoup(body, 'html.parser', from_encoding=get_body_encoding(response, body))
+        internal_links, _ = extract_links(soup, page_url)
+        return page_weight_report(page_url, soup, ttfb, total_time, html_bytes, assets, limits), internal_links
+
+    output_file = open(output, "w") if output else None
+    try:
+        for page_url, report, _, error in crawl_site(url, seeds=sitemap_urls, follow_links=not sitemap_urls,
+                                                     max_pages=max_pages, workers=workers, session=session,
+                                                     force=force, max_bytes=max_bytes, fetch=fetch, scope=scope,
+                                                     progress=progress):
+            if error:
+                aggregator.add_failure()
+                record = {'url': page_url, 'error': str(error)}
+            else:
+                aggregator.add(page_url, report)
+                record = dict(url=page_url, **report)
+            if output_file:
+                output_file.write(json.dumps(record) + "\n")
+    finally:
+        if output_file:
+            output_file.close()
+        if own_assets:
+            assets.close()
+
+    summary = aggregator.summary()
+    summary['asset_requests'] = assets.requests
+    return summary
@@ -0,0 +1,171 @@
+import sys
+from array import array
+from urllib.parse import urlsplit
+from .data_extraction_functions import extract_links, format_meta_tag, parse_sitemap
+from .structured_data_functions import extract_structured_data
+
+# ============================================================
+# RECORD FUNCTIONS
+# Compact crawl result records for holding many pages in memory.
+# ============================================================
+
+
+def split_url(url):
+    """
+    Splits a URL into its interned origin (scheme and host) and the remainder.
+    Origins are shared by every record, so each distinct host is stored only once.
+
+    Args:
+        url (str): The URL to split.
+
+    Returns:
+        tuple: (origin, remainder), e.g. ("https://example.com", "/blog?page=2").
+    """
+    parts = urlsplit(url)
+    if not parts.scheme or not parts.netloc:
+        return "", url
+    origin = sys.intern(f"{parts.scheme}://{parts.netloc}")
+    return origin, url[len(origin):]
+
+
+class LinkList:
+    """
+    Immutable, memory-light list of URLs. Origins are stored once per list and each
+    URL keeps only a small origin index and its path, instead of repeating the same
+    scheme and host for thousands of links. Iterating yields the full URLs.
+    """
+
+    __slots__ = ("origins", "origin_index", "paths")
+
+    def __init__(self, urls=()):
+        origins = {}
+        origin_index = array("I")
+        paths = []
+        for url in urls:
+            origin, path = split_url(url)
+            origin_index.append(origins.setdefault(origin, len(origins)))
+            paths.append(path)
+        self.origins = tuple(origins)
+        self.origin_index = origin_index
+        self.paths = tuple(paths)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        return self.origins[self.origin_index[position]] + self.paths[position]
+
+    def __iter__(self):
+        origins = self.origins
+        for index, path in zip(self.origin_index, self.paths):
+            yield origins[index] + path
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return f"LinkList({list(self)!r})"
+
+
+class CrawlRecord:
+    """
+    Typed, slotted crawl result for one page. Open Graph and Twitter card tags are
+    kept as (property, content) pairs rather than serialized <meta> tags, and link
+    lists are LinkList objects. to_dict() returns the classic extract_crawl_data format.
+    """
+
+    __slots__ = ("url", "favicon", "meta_description", "title", "open_graph", "twitter_card", "canonical_url",
+                 "internal_links", "external_links", "image_urls", "structured_data", "sitemap_urls")
+
+    def __init__(self, url, favicon=None, meta_description=None, title=None, open_graph=(), twitter_card=(),
+                 canonical_url=None, internal_links=(), external_links=(), image_urls=(), structured_data=None,
+                 sitemap_urls=()):
+        """
+        Args:
+            url (str): The crawled URL.
+            favicon (str, optional): The favicon href.
+            meta_description (str, optional): The meta description.
+            title (str, optional): The page title.
+            open_graph (iterable): (property, content) pairs of og: meta tags.
+            twitter_card (iterable): (name, content) pairs of twitter: meta tags.
+            canonical_url (str, optional): The canonical URL.
+            internal_links (iterable): Internal link URLs.
+            external_links (iterable): External link URLs.
+            image_urls (iterable): Image URLs.
+            structured_data (dict, optional): JSON-LD, microdata and RDFa (see extract_structured_data).
+            sitemap_urls (iterable): URLs from the site's sitemap.
+        """
+        self.url = url
+        self.favicon = favicon
+        self.meta_description = meta_description
+        self.title = title
+        self.open_graph = tuple(open_graph)
+        self.twitter_card = tuple(twitter_card)
+        self.canonical_url = canonical_url
+        self.internal_links = LinkList(internal_links)
+        self.external_links = LinkList(external_links)
+        self.image_urls = LinkList(image_urls)
+        self.structured_data = structured_data or {'json_ld': [], 'microdata': [], 'rdfa': []}
+        self.sitemap_urls = LinkList(sitemap_urls)
+
+    def to_dict(self):
+        """
+        Converts the record to the dictionary format returned by extract_crawl_data.
+        Meta tags are re-rendered from their parsed pairs.
+        """
+        return {
+            'favicon': self.favicon,
+            'meta_description': self.meta_description,
+            'title': self.title,
+            'open_graph_tags': [format_meta_tag({'property': prop, 'content': content})
+                                for prop, content in self.open_graph],
+            'twitter_card_tags': [format_meta_tag({'name': name, 'content': content})
+                                  for name, content in self.twitter_card],
+            'canonical_url': self.canonical_url,
+            'internal_links': list(self.internal_links),
+            'external_links': list(self.external_links),
+            'image_urls': list(self.image_urls),
+            'structured_data': self.structured_data,
+            'sitemap_urls': list(self.sitemap_urls),
+        }
+
+    def __repr__(self):
+        return f"CrawlRecord(url={self.url!r}, title={self.title!r})"
+
+
+def extract_crawl_record(soup, url, sitemap_urls=None):
+    """
+    Extracts the same data as extract_crawl_data into a compact CrawlRecord.
+
+    Args:
+        soup (BeautifulSoup): BeautifulSoup object of the crawled page.
+        url (str): The URL being crawled.
+        sitemap_urls (iterable, optional): The site's sitemap URLs. Fetched when not given.
+
+    Returns:
+        CrawlRecord: The extracted page data.
+    """
+    favicon_tag = soup.find("link", {"rel": "icon"})
+    meta_description_tag = soup.find("meta", {"name": "description"})
+    title_tag = soup.find("title")
+    canonical_tag = soup.find("link", {"rel": "canonical"})
+    internal_links, external_links = extract_links(soup, url)
+
+    return CrawlRecord(
+        url,
+        favicon=favicon_tag.get("href") if favicon_tag else None,
+        meta_description=meta_description_tag.get("content") if meta_description_tag else None,
+        title=title_tag.get_text() if title_tag else None,
+        open_graph=[(tag["property"], tag.get("content", ""))
+                    for tag in soup.find_all("meta", property=lambda x: x and x.startswith("og:"))],
+        twitter_card=[(tag["name"], tag.get("content", ""))
+                      for tag in soup.find_all("meta", attrs={"name": lambda x: x and x.startswith("twitter:")})],
+        canonical_url=canonical_tag.get("href") if canonical_tag else None,
+        internal_links=internal_links,
+        external_links=external_links,
+        image_urls=[img['src'] for img in soup.find_all('img', src=True)],
+        structured_data=extract_structured_data(soup),
+        sitemap_urls=parse_sitemap(url) if sitemap_urls is None else sitemap_urls,
+    )
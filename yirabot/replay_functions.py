@@ -0,0 +1,193 @@
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import requests
+from bs4 import BeautifulSoup
+from requests.structures import CaseInsensitiveDict
+from rich import print
+from .data_extraction_functions import extract_page_data, extract_content_data
+from .display_functions import CrawlProgress
+from .request_functions import get_body_encoding, HTML_CONTENT_TYPES
+from .seo_functions import analyze_page_seo
+from .warc_functions import iter_warc_responses
+
+# ============================================================
+# REPLAY FUNCTIONS
+# Offline extraction over saved HTML and WARC files.
+# ============================================================
+
+# Extractors run on replayed pages, with the parser each one uses on live pages
+REPLAY_EXTRACTORS = {
+    'crawl': ("html5lib", extract_page_data),
+    'content': ("html5lib", lambda soup, url: extract_content_data(soup)),
+    'seo': ("html.parser", lambda soup, url: analyze_page_seo(soup)),
+}
+SAVED_PAGE_PATTERN = re.compile(r"^(?P<name>.+?)(\.\d{4}-\d{2}-\d{2})?\.html?$")
+
+
+def url_from_filename(filename):
+    """
+    Recovers the URL of a page saved by get_html from its file name, e.g.
+    'example.com_blog.2024-01-31.html' becomes 'https://example.com/blog'. The name
+    does not keep the scheme or tell underscores from slashes, so this is a best guess.
+    """
+    match = SAVED_PAGE_PATTERN.match(os.path.basename(filename))
+    name = match.group("name") if match else os.path.basename(filename)
+    return "https://" + name.replace("_", "/")
+
+
+def iter_saved_pages(path):
+    """
+    Reads saved pages: .html files written by get_html and the HTML responses of
+    .warc/.warc.gz files, from a directory tree or a single file.
+
+    Args:
+        path (str): A directory or a file.
+
+    Yields:
+        tuple: (url, status, headers, body, error) for every page. A record that cannot
+        be read is yielded with its error instead of ending the replay; a WARC file
+        that breaks off (e.g. a truncated .gz) is reported once, under its path.
+    """
+    if os.path.isdir(path):
+        files = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+    else:
+        files = [path]
+
+    for file_path in files:
+        try:
+            if file_path.endswith((".warc", ".warc.gz")):
+                for url, status, headers, body, error in iter_warc_responses(file_path):
+                    if error:
+                        yield url, None, None, None, error
+                    elif headers.get("Content-Type", "").split(";")[0].strip().lower() in HTML_CONTENT_TYPES:
+                        yield url, status, headers, body, None
+            elif file_path.endswith((".html", ".htm")):
+                with open(file_path, "rb") as file:
+                    yield url_from_filename(file_path), 200, {}, file.read(), None
+        except (OSError, EOFError, ValueError) as e:
+            yield file_path, None, None, None, f"{type(e).__name__}: {e}"
+
+
+def replay_page(url, status, headers, body, extractors=tuple(REPLAY_EXTRACTORS)):
+    """
+    Runs extractors over one saved page, exactly as they run on a live page but
+    without any network request (the crawl data has no sitemap URLs). Every parser
+    is run at most once.
+
+    Args:
+        url (str): The page URL, used to resolve links.
+        status (int): The archived status code.
+        headers (dict): The archived response headers, used to find the charset.
+        body (bytes): The page body.
+        extractors (tuple): Names of REPLAY_EXTRACTORS to run.
+
+    Returns:
+        dict: The result of every extractor, by name.
+    """
+    response = requests.Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers)
+    response.url = url
+    encoding = get_body_encoding(response, body)
+
+    soups = {}
+    result = {}
+    for name in extractors:
+        parser, extract = REPLAY_EXTRACTORS[name]
+        if parser not in soups:
+            soups[parser] = BeautifulSoup(body, parser, from_encoding=encoding)
+        result[name] = extract(soups[parser], url)
+    return result
+
+
+def _replay_batch(pages, extractors):
+    results = []
+    for url, status, headers, body, error in pages:
+        if error:
+            results.append((url, None, error))
+            continue
+        try:
+            results.append((url, replay_page(url, status, headers, body, extractors), None))
+        except Exception as e:  # One broken page must not lose the rest of the batch
+            results.append((url, None, f"{type(e).__name__}: {e}"))
+    return results
+
+
+def replay(path, extractors=tuple(REPLAY_EXTRACTORS), workers=None, batch_size=32):
+    """
+    Re-runs the extraction and SEO pipeline over saved pages on a process pool, with
+    no network access. Pages are sent to the workers in batches and only a bounded
+    number of batches is in flight, so memory stays flat for any archive size.
+
+    Args:
+        path (str): Directory or file of saved .html, .warc and .warc.gz files.
+        extractors (tuple): Names of REPLAY_EXTRACTORS to run: 'crawl', 'content', 'seo'.
+        workers (int, optional): Number of worker processes; defaults to the CPU count.
+            0 replays in the calling process.
+        batch_size (int): Number of pages sent to a worker at a time.
+
+    Yields:
+        tuple: (url, result, error) for every page as batches finish; error is None on success.
+    """
+    unknown = set(extractors) - set(REPLAY_EXTRACTORS)
+    if unknown:
+        raise ValueError(f"Unknown extractors: {', '.join(sorted(unknown))}")
+    extractors = tuple(extractors)
+
+    def batches():
+        batch = []
+        for page in iter_saved_pages(path):
+            batch.append(page)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    if workers == 0:
+        for batch in batches():
+            yield from _replay_batch(batch, extractors)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for batch in batches():
+            pending.add(executor.submit(_replay_batch, batch, extractors))
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        for future in pending:
+            yield from future.result()
+
+
+def replay_archive(path, output=None, extractors=tuple(REPLAY_EXTRACTORS), workers=None):
+    """
+    Replays saved pages and writes one NDJSON line per page.
+
+    Args:
+        path (str): Directory or file of saved .html, .warc and .warc.gz files.
+        output (str, optional): Path of the NDJSON file to write.
+        extractors (tuple): Names of REPLAY_EXTRACTORS to run.
+        workers (int, optional): Number of worker processes.
+
+    Returns:
+        None: Outputs to the console and a file.
+    """
+    output = output or os.path.basename(os.path.normpath(path)) + ".replay.ndjson"
+    pages = failures = 0
+    print(f"YiraBot: Replaying '{path}'")
+    try:
+        with open(output, "w") as file, CrawlProgress("Replay") as progress:
+            for url, result, error in replay(path, extractors, workers):
+                record = {'url': url, 'error': error} if error else dict(url=url, **result)
+                file.write(json.dumps(record, default=str) + "\n")
+                pages += 1
+                failures += bool(error)
+                progress.advance(url, error)
+    except KeyboardInterrupt:
+        print("\nYiraBot: Replay Aborted")
+    print(f"YiraBot: {pages} pages ({failures} failed) written to '{output}'.")
@@ -0,0 +1,208 @@
+import codecs
+import os
+import re
+import requests
+from urllib3.util.request import ACCEPT_ENCODING as SUPPORTED_ENCODINGS
+from . import errors
+from .retry_functions import DEFAULT_RETRY_POLICY
+
+# ============================================================
+# REQUEST FUNCTIONS
+# Streamed downloads with content type checks and size limits.
+# ============================================================
+
+MAX_CONTENT_BYTES = 10 * 1024 * 1024
+SITEMAP_MAX_BYTES = 50 * 1024 * 1024
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+CHUNK_SIZE = 64 * 1024
+
+HEAD_END_PATTERN = re.compile(rb"</head\s*>", re.IGNORECASE)
+CHARSET_PATTERN = re.compile(r"charset=[\"']?([\w.:-]+)", re.IGNORECASE)
+META_CHARSET_PATTERN = re.compile(rb"<meta[^>]+charset\s*=\s*[\"']?\s*([\w.:-]+)", re.IGNORECASE)
+META_PRESCAN_BYTES = 1024
+BOM_ENCODINGS = ((codecs.BOM_UTF8, "utf-8"), (codecs.BOM_UTF16_LE, "utf-16-le"), (codecs.BOM_UTF16_BE, "utf-16-be"))
+
+# Most compact encodings first. br and zstd are only offered when brotli or zstandard is
+# installed, since urllib3 can only decode those; bodies are decompressed while streaming.
+ACCEPT_ENCODING = ", ".join(encoding for encoding in ("br", "zstd", "gzip", "deflate")
+                            if encoding in SUPPORTED_ENCODINGS.split(","))
+
+
+def open_stream(url, session=None, headers=None, timeout=10, max_bytes=MAX_CONTENT_BYTES,
+                content_types=HTML_CONTENT_TYPES, retry=DEFAULT_RETRY_POLICY):
+    """
+    Sends a streamed GET request and validates the response headers before any of the
+    body is downloaded. Error responses are returned unchecked so callers can still
+    call raise_for_status on them. Failed requests are retried according to the retry policy.
+
+    Args:
+        url (str): The URL to request.
+        session (Session, optional): A session object for authenticated requests.
+        headers (dict, optional): Request headers.
+        timeout (int): Request timeout in seconds.
+        max_bytes (int, optional): Maximum accepted Content-Length. None disables the check.
+        content_types (tuple, optional): Accepted MIME types. None accepts any type.
+        retry (RetryPolicy): Retry and circuit breaker policy for the request.
+
+    Returns:
+        Response: The open response. The caller is responsible for closing it.
+
+    Raises:
+        errors.ContentTypeError: If the response has an unaccepted content type.
+        errors.ContentTooLargeError: If the declared Content-Length exceeds max_bytes.
+        errors.CircuitOpenError: If the host is skipped after repeated failures.
+    """
+    headers = dict(headers or {})
+    headers.setdefault("Accept-Encoding", ACCEPT_ENCODING)
+    response = retry.request("GET", url, session=session, headers=headers, timeout=timeout, stream=True)
+
+    if response.ok:
+        mime_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_types and mime_type and mime_type not in content_types:
+            response.close()
+            raise errors.ContentTypeError(url, mime_type)
+
+        content_length = response.headers.get("Content-Length", "")
+        if max_bytes and content_length.isdigit() and int(content_length) > max_bytes:
+            response.close()
+            raise errors.ContentTooLargeError(url, max_bytes)
+
+    return response
+
+
+def get_declared_charset(response):
+    """
+    Returns the charset declared in the Content-Type header of a response, without
+    falling back to defaults or guessing from the body.
+
+    Args:
+        response (Response): The HTTP response.
+
+    Returns:
+        str: The declared charset, or None if the header does not declare one.
+    """
+    match = CHARSET_PATTERN.search(response.headers.get("Content-Type", ""))
+    return match.group(1) if match else None
+
+
+def get_body_encoding(response, body):
+    """
+    Determines the encoding of an HTML body the cheap way browsers do, without
+    statistical sniffing: the Content-Type charset, then a byte order mark, then a
+    <meta charset> in the first kilobyte, falling back to UTF-8. The result is passed
+    to the parser together with the raw bytes, so pages are decoded once.
+
+    Args:
+        response (Response): The HTTP response.
+        body (bytes): The body, or at least its first kilobyte.
+
+    Returns:
+        str: A valid Python codec name.
+    """
+    candidates = [get_declared_charset(response)]
+    candidates += [encoding for bom, encoding in BOM_ENCODINGS if body.startswith(bom)]
+    match = META_CHARSET_PATTERN.search(body[:META_PRESCAN_BYTES])
+    candidates.append(match.group(1).decode("ascii") if match else None)
+    for encoding in candidates:
+        try:
+            if encoding:
+                return codecs.lookup(encoding).name
+        except LookupError:
+            continue
+    return "utf-8"
+
+
+def iter_body(response, max_bytes=MAX_CONTENT_BYTES, stop_at_head=False):
+    """
+    Yields the body of a streamed response chunk by chunk, enforcing the size limit
+    on the decoded bytes and optionally stopping after the closing </head> tag.
+
+    Args:
+        response (Response): A response opened with stream=True.
+        max_bytes (int, optional): Maximum number of body bytes. None disables the limit.
+        stop_at_head (bool): If True, stops reading once </head> has been received.
+
+    Yields:
+        bytes: Body chunks.
+
+    Raises:
+        errors.ContentTooLargeError: If the body exceeds max_bytes.
+    """
+    received = 0
+    tail = b""
+    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+        received += len(chunk)
+        if max_bytes and received > max_bytes:
+            raise errors.ContentTooLargeError(response.url, max_bytes)
+
+        if stop_at_head:
+            match = HEAD_END_PATTERN.search(tail + chunk)
+            if match:
+                yield chunk[:max(match.end() - len(tail), 0)]
+                return
+            tail = chunk[-16:]
+        yield chunk
+
+
+def fetch_page(url, session=None, headers=None, timeout=10, max_bytes=MAX_CONTENT_BYTES,
+               content_types=HTML_CONTENT_TYPES, stop_at_head=False, retry=DEFAULT_RETRY_POLICY):
+    """
+    Downloads a page with a streamed request, checking its content type and size
+    before and while the body is read.
+
+    Args:
+        url (str): The URL to download.
+        session (Session, optional): A session object for authenticated requests.
+        headers (dict, optional): Request headers.
+        timeout (int): Request timeout in seconds.
+        max_bytes (int, optional): Maximum number of body bytes. None disables the limit.
+        content_types (tuple, optional): Accepted MIME types. None accepts any type.
+        stop_at_head (bool): If True, stops downloading once </head> has been received.
+        retry (RetryPolicy): Retry and circuit breaker policy for the request.
+
+    Returns:
+        tuple: The response and its (possibly partial) body as bytes.
+    """
+    response = open_stream(url, session, headers, timeout, max_bytes, content_types, retry)
+    try:
+        body = b"".join(iter_body(response, max_bytes, stop_at_head))
+    finally:
+        response.close()
+    return response, body
+
+
+def download_to_file(url, filename, session=None, headers=None, timeout=10, max_bytes=MAX_CONTENT_BYTES,
+                     content_types=HTML_CONTENT_TYPES, retry=DEFAULT_RETRY_POLICY):
+    """
+    Streams a response body straight to a file without holding it in memory.
+    A partially written file is removed if the download fails.
+
+    Args:
+        url (str): The URL to download.
+        filename (str): The name of the file to write to.
+        session (Session, optional): A session object for authenticated requests.
+        headers (dict, optional): Request headers.
+        timeout (int): Request timeout in seconds.
+        max_bytes (int, optional): Maximum number of body bytes. None disables the limit.
+        content_types (tuple, optional): Accepted MIME types. None accepts any type.
+        retry (RetryPolicy): Retry and circuit breaker policy for the request.
+
+    Returns:
+        int: The number of bytes written.
+    """
+    response = open_stream(url, session, headers, timeout, max_bytes, content_types, retry)
+    written = 0
+    try:
+        response.raise_for_status()
+        with open(filename, "wb") as file:
+            try:
+                for chunk in iter_body(response, max_bytes):
+                    file.write(chunk)
+                    written += len(chunk)
+            except BaseException:
+                file.close()
+                os.remove(filename)
+                raise
+    finally:
+        response.close()
+    return written
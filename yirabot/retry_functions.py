@@ -0,0 +1,167 @@
+import random
+import threading
+import time
+from datetime import timedelta
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+import requests
+from . import errors
+
+# ============================================================
+# RETRY FUNCTIONS
+# Retries with exponential backoff and a per-host circuit breaker.
+# ============================================================
+
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"})
+RETRY_EXCEPTIONS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+
+class CircuitBreaker:
+    """
+    Tracks consecutive failures per host. After failure_threshold failures in a row the
+    host's circuit opens and requests to it fail immediately with errors.CircuitOpenError,
+    so a crawl stops spending workers and timeouts on a host that is down. Once
+    reset_timeout seconds have passed, a single trial request is let through: a success
+    closes the circuit again, a failure keeps it open for another reset_timeout.
+    Thread-safe, so one breaker can be shared by all workers of a crawl.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = {}
+        self.opened_at = {}
+        self.lock = threading.Lock()
+
+    def allow(self, host):
+        """
+        Returns True if a request to the host may be sent now.
+        """
+        with self.lock:
+            opened_at = self.opened_at.get(host)
+            if opened_at is None:
+                return True
+            if time.monotonic() - opened_at >= self.reset_timeout:
+                self.opened_at[host] = time.monotonic()  # Let one trial request through
+                return True
+            return False
+
+    def record_success(self, host):
+        with self.lock:
+            self.failures.pop(host, None)
+            self.opened_at.pop(host, None)
+
+    def record_failure(self, host):
+        with self.lock:
+            failures = self.failures[host] = self.failures.get(host, 0) + 1
+            if failures >= self.failure_threshold:
+                self.opened_at[host] = time.monotonic()
+
+    def is_open(self, host):
+        with self.lock:
+            return host in self.opened_at
+
+    def reset(self):
+        with self.lock:
+            self.failures.clear()
+            self.opened_at.clear()
+
+
+class RetryPolicy:
+    """
+    Sends requests and retries them on connection errors, timeouts and retryable status
+    codes (429 and 5xx). Waits grow exponentially with full jitter, and a numeric
+    Retry-After header is honored up to max_backoff. Only idempotent methods are
+    retried. Every outcome is reported to the optional CircuitBreaker.
+    """
+
+    def __init__(self, retries=3, backoff=0.5, max_backoff=30, status_codes=RETRY_STATUS_CODES,
+                 methods=IDEMPOTENT_METHODS, breaker=None):
+        """
+        Args:
+            retries (int): Maximum number of retries after the first attempt.
+            backoff (float): Base delay in seconds; attempt n waits up to backoff * 2 ** n.
+            max_backoff (float): Upper bound for a single delay in seconds.
+            status_codes (set): Response status codes that are retried.
+            methods (set): HTTP methods that may be retried.
+            breaker (CircuitBreaker, optional): Per-host circuit breaker.
+        """
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.status_codes = status_codes
+        self.methods = methods
+        self.breaker = breaker
+
+    def delay(self, attempt, response=None):
+        """
+        Returns the number of seconds to wait before the given retry (0-based).
+        """
+        retry_after = response.headers.get("Retry-After", "") if response is not None else ""
+        if retry_after.isdigit():
+            return min(int(retry_after), self.max_backoff)
+        if retry_after:
+            try:
+                seconds = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                return min(max(seconds, 0), self.max_backoff)
+            except (TypeError, ValueError):
+                pass
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def request(self, method, url, session=None, **kwargs):
+        """
+        Sends a request, retrying it according to the policy.
+
+        Args:
+            method (str): The HTTP method.
+            url (str): The URL to request.
+            session (Session, optional): A session object for authenticated requests.
+            **kwargs: Passed on to requests, e.g. headers, timeout and stream.
+
+        Returns:
+            Response: The final response, which may still have a retryable status code
+            once the retries are used up. Its elapsed time covers only the attempt that
+            produced it (redirects included), not the failed attempts and backoff before it.
+
+        Raises:
+            errors.CircuitOpenError: If the host's circuit is open.
+            requests.exceptions.RequestException: If the last attempt failed.
+        """
+        host = urlparse(url).netloc
+        breaker = self.breaker
+        if breaker and not breaker.allow(host):
+            raise errors.CircuitOpenError(host)
+
+        attempts = self.retries + 1 if method.upper() in self.methods else 1
+        sender = session or requests
+        for attempt in range(attempts):
+            started = time.perf_counter()
+            try:
+                response = sender.request(method, url, **kwargs)
+            except RETRY_EXCEPTIONS:
+                if breaker:
+                    breaker.record_failure(host)
+                if attempt + 1 == attempts or (breaker and breaker.is_open(host)):
+                    raise
+                time.sleep(self.delay(attempt))
+                continue
+
+            response.elapsed = timedelta(seconds=time.perf_counter() - started)
+            if response.status_code not in self.status_codes:
+                if breaker:
+                    breaker.record_success(host)
+                return response
+
+            if breaker:
+                breaker.record_failure(host)
+            if attempt + 1 == attempts or (breaker and breaker.is_open(host)):
+                return response
+            wait = self.delay(attempt, response)
+            response.close()
+            time.sleep(wait)
+
+
+# Shared by every fetch unless a caller passes its own policy, so the breaker sees all requests
+DEFAULT_RETRY_POLICY = RetryPolicy(breaker=CircuitBreaker())
+NO_RETRY_POLICY = RetryPolicy(retries=0)
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import re
+import soupsieve
+from bs4 import Tag
+from .data_extraction_functions import CRAWL_FIELDS, CONTENT_FIELDS
+
+# ============================================================
+# RULES FUNCTIONS
+# Custom extraction rules: CSS selectors and attributes mapped to output fields.
+# ============================================================
+
+RESERVED_FIELDS = frozenset(CRAWL_FIELDS) | frozenset(CONTENT_FIELDS)
+ATTRIBUTE_PATTERN = re.compile(r"^(?P<selector>.+)@(?P<attribute>[\w:-]+)$")
+
+
+class ExtractionRule:
+    """
+    One compiled rule: the elements matching a CSS selector, read as text or as an
+    attribute, optionally decoded as JSON.
+    """
+
+    __slots__ = ("name", "selector", "pattern", "attribute", "all", "json")
+
+    def __init__(self, name, spec):
+        """
+        Args:
+            name (str): The output field name.
+            spec (str or dict): Either "selector" (text of the first match), "selector@attribute",
+                or a dict with "selector" and optionally "attribute", "all" (a list of every
+                match instead of the first) and "json" (decode the value as JSON).
+
+        Raises:
+            ValueError: If the spec or its selector is invalid.
+        """
+        if isinstance(spec, str):
+            match = ATTRIBUTE_PATTERN.match(spec)
+            spec = {'selector': match.group("selector"), 'attribute': match.group("attribute")} if match \
+                else {'selector': spec}
+        if not isinstance(spec, dict) or not isinstance(spec.get("selector"), str):
+            raise ValueError(f"Rule '{name}' needs a CSS selector")
+        self.name = name
+        self.selector = spec["selector"].strip()
+        try:
+            self.pattern = soupsieve.compile(self.selector)
+        except soupsieve.SelectorSyntaxError as e:
+            raise ValueError(f"Rule '{name}' has an invalid selector: {e}")
+        self.attribute = spec.get("attribute")
+        self.all = bool(spec.get("all"))
+        self.json = bool(spec.get("json"))
+
+    def value(self, tag):
+        value = tag.get(self.attribute) if self.attribute else tag.get_text().strip()
+        if isinstance(value, list):  # Multi-valued attributes such as class
+            value = " ".join(value)
+        if self.json and value is not None:
+            try:
+                value = json.loads(value)
+            except ValueError:
+                value = None
+        return value
+
+
+class RuleSet:
+    """
+    Custom extraction rules compiled once and evaluated together in a single walk over
+    an already parsed page, so custom fields cost no extra parse and one traversal
+    however many rules there are. Rules that only need their first match stop being
+    tested once they have it, and the walk ends early when no rule needs more.
+    """
+
+    def __init__(self, rules):
+        """
+        Args:
+            rules (dict): Output field names mapped to rule specs (see ExtractionRule).
+
+        Raises:
+            ValueError: If a rule is invalid or its name is a built-in field.
+        """
+        if not isinstance(rules, dict) or not rules:
+            raise ValueError("Rules must be a non-empty JSON object of field names to selectors")
+        reserved = RESERVED_FIELDS.intersection(rules)
+        if reserved:
+            raise ValueError(f"Rule names clash with built-in fields: {', '.join(sorted(reserved))}")
+        self.rules = tuple(ExtractionRule(name, spec) for name, spec in rules.items())
+        self.names = tuple(rule.name for rule in self.rules)
+        # Identifies the rules in extraction cache keys
+        self.key = hashlib.blake2b(json.dumps(rules, sort_keys=True).encode("utf-8"), digest_size=8).hexdigest()
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Loads rules from a JSON file, e.g.
+        {"price": ".price", "author": "meta[name=author]@content",
+         "json_ld": {"selector": "script[type='application/ld+json']", "all": true, "json": true}}
+        """
+        with open(path) as file:
+            return cls(json.load(file))
+
+    def extract(self, soup, names=None):
+        """
+        Evaluates the rules on a parsed page.
+
+        Args:
+            soup (BeautifulSoup): The parsed page.
+            names (tuple, optional): Only evaluate these rules.
+
+        Returns:
+            dict: Every rule's value: the first match (None without one), or a list with "all".
+        """
+        rules = [rule for rule in self.rules if names is None or rule.name in names]
+        result = {rule.name: [] if rule.all else None for rule in rules}
+        pending = list(rules)
+        for tag in soup.descendants:
+            if not pending:
+                break
+            if not isinstance(tag, Tag):
+                continue
+            for rule in tuple(pending):
+                if rule.pattern.match(tag):
+                    if rule.all:
+                        result[rule.name].append(rule.value(tag))
+                    else:
+                        result[rule.name] = rule.value(tag)
+                        pending.remove(rule)
+        return result
+
+
+def load_rules(rules):
+    """
+    Returns a RuleSet from a RuleSet, a dict of rules or the path of a JSON rules file.
+    """
+    if rules is None or isinstance(rules, RuleSet):
+        return rules
+    return RuleSet(rules) if isinstance(rules, dict) else RuleSet.from_file(rules)
@@ -0,0 +1,129 @@
+import fnmatch
+import json
+import re
+from urllib.parse import urlsplit
+
+# ============================================================
+# SCOPE FUNCTIONS
+# Crawl scope filters applied to candidate URLs before they are enqueued.
+# ============================================================
+
+SCOPE_KEYS = ("include", "exclude", "path_prefixes", "max_query_params", "exclude_extensions")
+REGEX_PREFIX = "re:"
+# Prefixed to patterns starting with "/" so they are matched against the URL path
+URL_ORIGIN_PATTERN = r"[^:/?#]+://[^/?#]*"
+
+
+def compile_url_patterns(patterns):
+    """
+    Compiles globs and regexes into one regex, so a URL is tested against all of them
+    in a single match call.
+
+    Args:
+        patterns (list): Globs matched against the whole URL ("*://*/calendar/*"), globs
+            starting with "/" matched against the path ("/search*"), or regexes prefixed
+            with "re:" searched anywhere in the URL ("re:[?&]sessionid=").
+
+    Returns:
+        Pattern: The combined regex, or None without patterns.
+    """
+    alternatives = []
+    for pattern in patterns:
+        if pattern.startswith(REGEX_PREFIX):
+            expression = pattern[len(REGEX_PREFIX):]
+            try:
+                re.compile(expression)
+            except re.error as e:
+                raise ValueError(f"Invalid scope regex '{expression}': {e}")
+            alternatives.append(f".*?(?:{expression})")
+        elif pattern.startswith("/"):
+            alternatives.append(URL_ORIGIN_PATTERN + fnmatch.translate(pattern))
+        else:
+            alternatives.append(fnmatch.translate(pattern))
+    if not alternatives:
+        return None
+    return re.compile("|".join(f"(?:{alternative})" for alternative in alternatives))
+
+
+class CrawlScope:
+    """
+    Decides which discovered URLs a crawl may enqueue. Every rule is compiled once:
+    the include and exclude patterns into one regex each, path prefixes into a tuple
+    for str.startswith and extensions into a set, so testing a URL costs at most one
+    urlsplit and two regex matches, and rejected URLs are never fetched.
+    """
+
+    def __init__(self, include=(), exclude=(), path_prefixes=(), max_query_params=None, exclude_extensions=()):
+        """
+        Args:
+            include (list): URL patterns (see compile_url_patterns); if given, URLs must match one.
+            exclude (list): URL patterns; URLs matching one are rejected.
+            path_prefixes (list): If given, URL paths must start with one of them, e.g. "/blog/".
+            max_query_params (int, optional): Rejects URLs with more query parameters.
+            exclude_extensions (list): File extensions to reject, e.g. ["pdf", ".jpg"].
+
+        Raises:
+            ValueError: If a pattern is invalid.
+        """
+        self.include = compile_url_patterns(include)
+        self.exclude = compile_url_patterns(exclude)
+        self.path_prefixes = tuple(path_prefixes)
+        self.max_query_params = max_query_params
+        self.exclude_extensions = frozenset(extension.lower().lstrip(".") for extension in exclude_extensions)
+        self.spec = {'include': list(include), 'exclude': list(exclude), 'path_prefixes': list(path_prefixes),
+                     'max_query_params': max_query_params, 'exclude_extensions': list(exclude_extensions)}
+        self.needs_parts = bool(self.path_prefixes or self.exclude_extensions or max_query_params is not None)
+
+    @classmethod
+    def from_dict(cls, config):
+        if not isinstance(config, dict):
+            raise ValueError("A scope must be a JSON object")
+        unknown = set(config) - set(SCOPE_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown scope keys: {', '.join(sorted(unknown))}")
+        return cls(**config)
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Loads a scope from a JSON file, e.g.
+        {"exclude": ["/search*", "re:[?&](sessionid|sort)="], "path_prefixes": ["/blog/", "/docs/"],
+         "max_query_params": 1, "exclude_extensions": ["pdf", "zip", "jpg"]}
+        """
+        with open(path) as file:
+            return cls.from_dict(json.load(file))
+
+    def allows(self, url):
+        """
+        Returns True if the URL is in scope.
+        """
+        if self.needs_parts:
+            parts = urlsplit(url)
+            path = parts.path
+            if self.path_prefixes and not path.startswith(self.path_prefixes):
+                return False
+            if self.exclude_extensions:
+                name = path.rpartition("/")[2]
+                if "." in name and name.rpartition(".")[2].lower() in self.exclude_extensions:
+                    return False
+            if self.max_query_params is not None and parts.query and \
+                    sum(1 for parameter in parts.query.split("&") if parameter) > self.max_query_params:
+                return False
+        if self.exclude is not None and self.exclude.match(url):
+            return False
+        return self.include is None or self.include.match(url) is not None
+
+    def filter(self, urls):
+        """
+        Returns the URLs that are in scope, in order.
+        """
+        return [url for url in urls if self.allows(url)]
+
+
+def load_scope(scope):
+    """
+    Returns a CrawlScope from a CrawlScope, a dict of scope rules or the path of a JSON scope file.
+    """
+    if scope is None or isinstance(scope, CrawlScope):
+        return scope
+    return CrawlScope.from_dict(scope) if isinstance(scope, dict) else CrawlScope.from_file(scope)
@@ -4,12 +4,19 @@ from urllib.parse import unquote
 import requests
 from bs4 import BeautifulSoup
 from rich import print
-from .display_functions import display_seo_results
+from . import errors
+from .data_extraction_functions import fetch_head_data, parse_fields, project_fields
+from .display_functions import display_seo_results, display_crawl_data
+from .keyword_functions import count_keywords
+from .request_functions import fetch_page, get_body_encoding, MAX_CONTENT_BYTES
+from .retry_functions import DEFAULT_RETRY_POLICY
+from .structured_data_functions import extract_structured_data, structured_data_types, count_invalid_json_ld
 
 # ============================================================
 # SEO ANALYSIS FUNCTIONS
 # Functions dedicated to performing SEO analysis.
 # ============================================================
+# Words left out of the single-page keyword results (see keyword_analysis)
 STOPWORDS = set(
     ["a", "an", "the", "and", "or", "in", "of", "by", "for", "with", "on", "at", "to", "from", "up", "down", "in",
      "out", "on", "off", "over", "under", "again", "further", "then", "once", "here", "there", "when", "where", "why",
@@ -19,61 +26,53 @@ STOPWORDS = set(
 
 def check_website_language(url):
     try:
-        response = requests.get(url, timeout=10)
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        html_tag = soup.find('html')
-        if html_tag and 'lang' in html_tag.attrs:
-            language = html_tag.attrs['lang']
-            return language
-        else:
-            return "Language attribute not found"
-    except requests.exceptions.RequestException as e:
+        # The lang attribute sits on the <html> tag, so only the head is downloaded and parsed
+        response, head = fetch_head_data(url)
+        return evaluate_language(head['language'])
+    except (requests.exceptions.RequestException, errors.ContentTypeError, errors.ContentTooLargeError) as e:
         return f"Error occurred: {e}"
 
 
 def check_social_media_integration(url):
     try:
-        response = requests.get(url, timeout=10)
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        social_media = {
-            "Facebook": False,
-            "Twitter": False,
-            "Instagram": False,
-            "LinkedIn": False,
-            "YouTube": False
-        }
-
-        for link in soup.find_all('a', href=True):
-            href = link['href']
-            if "facebook.com" in href:
-                social_media["Facebook"] = True
-            elif "twitter.com" in href:
-                social_media["Twitter"] = True
-            elif "instagram.com" in href:
-                social_media["Instagram"] = True
-            elif "linkedin.com" in href:
-                social_media["LinkedIn"] = True
-            elif "youtube.com" in href:
-                social_media["YouTube"] = True
-
-        return social_media
-    except requests.exceptions.RequestException as e:
+        response, body = fetch_page(url)
+        soup = BeautifulSoup(body, 'html.parser', from_encoding=get_body_encoding(response, body))
+        return analyze_social_media(soup)
+    except (requests.exceptions.RequestException, errors.ContentTypeError, errors.ContentTooLargeError) as e:
         return {"Error": str(e)}
 
 
+def analyze_social_media(soup):
+    social_media = {
+        "Facebook": False,
+        "Twitter": False,
+        "Instagram": False,
+        "LinkedIn": False,
+        "YouTube": False
+    }
+
+    for link in soup.find_all('a', href=True):
+        href = link['href']
+        if "facebook.com" in href:
+            social_media["Facebook"] = True
+        elif "twitter.com" in href:
+            social_media["Twitter"] = True
+        elif "instagram.com" in href:
+            social_media["Instagram"] = True
+        elif "linkedin.com" in href:
+            social_media["LinkedIn"] = True
+        elif "youtube.com" in href:
+            social_media["YouTube"] = True
+
+    return social_media
+
+
 def check_mobile_responsiveness(url):
     try:
-        response = requests.get(url,timeout=10)
-        soup = BeautifulSoup(response.content, 'html.parser')
-        viewport_meta = soup.find("meta", {"name": "viewport"})
-
-        if viewport_meta and "width=device-width" in viewport_meta.get("content", ""):
-            return True, "Mobile Responsive"
-        else:
-            return False, "Not Mobile Responsive"
-    except requests.exceptions.RequestException as e:
+        # The viewport meta tag lives in <head>, so only the head is downloaded and parsed
+        response, head = fetch_head_data(url)
+        return evaluate_viewport(head['viewport'])
+    except (requests.exceptions.RequestException, errors.ContentTypeError, errors.ContentTooLargeError) as e:
         return False, f"Error occurred: {e}"
 
 
@@ -83,7 +82,7 @@ def check_link_status(url, session=None):
     Returns a tuple of (is_broken, status_code, reason).
     """
     try:
-        response = session.head(url, allow_redirects=True, timeout=10) if session else requests.head(url, allow_redirects=True, timeout=10)
+        response = DEFAULT_RETRY_POLICY.request("HEAD", url, session=session, allow_redirects=True, timeout=10)
         if response.status_code == 404:
             return True, 404, "Not Found"
         elif 300 <= response.status_code < 400:
@@ -93,14 +92,17 @@ def check_link_status(url, session=None):
         return True, None, f"Error: {e}"
 
 
-def keyword_analysis(text):
+def keyword_analysis(text, top=5, ngram=1, language=None):
     """
-    Analyzes the text for the most frequent non-stopwords.
+    Analyzes the text for the most frequent non-stopwords, or n-grams of the given size.
+    Without a language, single words are counted as the SEO report always has: numbers
+    included and only the short STOPWORDS list left out. With a language, or for n-grams,
+    the language's full stopword list is used and numbers are skipped (see count_keywords).
     """
-    words = re.findall(r'\w+', text.lower())
-    filtered_words = [word for word in words if word not in STOPWORDS]
-    word_counts = Counter(filtered_words)
-    return word_counts.most_common(5)
+    if language is None and ngram == 1:
+        words = re.findall(r'\w+', text.lower())
+        return Counter(word for word in words if word not in STOPWORDS).most_common(top)
+    return count_keywords(text, (ngram, ngram), language)[ngram].most_common(top)
 
 
 def is_seo_friendly_url(url):
@@ -126,7 +128,11 @@ def is_seo_friendly_url(url):
 
 def analyze_title(soup):
     title_tag = soup.find('title')
-    title_length = len(title_tag.get_text()) if title_tag else 0
+    return evaluate_title(title_tag.get_text() if title_tag else None)
+
+
+def evaluate_title(title):
+    title_length = len(title) if title else 0
     if title_length == 0:
         return 0, "Missing or Empty"
     return title_length, "Too Long (Max 60)" if title_length > 60 else "OK"
@@ -134,12 +140,38 @@ def analyze_title(soup):
 
 def analyze_meta_description(soup):
     meta_description_tag = soup.find("meta", {"name": "description"})
-    meta_desc_length = len(meta_description_tag.get("content")) if meta_description_tag else 0
+    return evaluate_meta_description(meta_description_tag.get("content") if meta_description_tag else None)
+
+
+def evaluate_meta_description(meta_description):
+    meta_desc_length = len(meta_description) if meta_description else 0
     if meta_desc_length == 0:
         return 0, "Missing or Empty"
     return meta_desc_length, "Too Long (Max 300)" if meta_desc_length > 300 else "OK"
 
 
+def evaluate_viewport(viewport):
+    if viewport and "width=device-width" in viewport:
+        return True, "Mobile Responsive"
+    return False, "Not Mobile Responsive"
+
+
+def evaluate_language(language):
+    return language if language is not None else "Language attribute not found"
+
+
+def head_seo_analysis(head):
+    """
+    Runs the SEO checks that only need <head> metadata, as returned by fetch_head_data.
+    """
+    return {
+        'title_length': evaluate_title(head['title']),
+        'meta_desc_length': evaluate_meta_description(head['meta_description']),
+        'is_responsive': evaluate_viewport(head['viewport']),
+        'website_language': evaluate_language(head['language']),
+    }
+
+
 def analyze_headings(soup):
     headings = defaultdict(int)
     heading_sequence = []
@@ -166,14 +198,122 @@ def evaluate_heading_structure(headings, heading_sequence):
 
 def analyze_images_for_alt_text(soup):
     images = soup.find_all('img')
-    return [img['src'] for img in images if img.get('alt') is None]
+    return [img.get('src', '') for img in images if img.get('alt') is None]
+
+
+def analyze_schema_types(soup):
+    """
+    Returns the schema types a page declares with their formats, and the number of its
+    JSON-LD scripts that are not valid JSON.
+    """
+    structured_data = extract_structured_data(soup)
+    return structured_data_types(structured_data), count_invalid_json_ld(structured_data)
 
 
-def seo_error_analysis(url, session=None):
+def analyze_page_seo(soup):
+    """
+    Runs every single-page SEO check on an already parsed page, so a page only needs
+    to be fetched once. Used by the site-wide audit.
+    """
+    title_tag = soup.find('title')
+    title = title_tag.get_text() if title_tag else None
+    meta_description_tag = soup.find("meta", {"name": "description"})
+    meta_description = meta_description_tag.get("content") if meta_description_tag else None
+    viewport_tag = soup.find("meta", {"name": "viewport"})
+    html_tag = soup.find('html')
+    headings, heading_structure_status = analyze_headings(soup)
+    schema_types, invalid_json_ld = analyze_schema_types(soup)
+
+    return {
+        'title': title,
+        'title_length': evaluate_title(title),
+        'meta_description': meta_description,
+        'meta_desc_length': evaluate_meta_description(meta_description),
+        'headings': dict(headings),
+        'heading_structure': heading_structure_status,
+        'images_without_alt': analyze_images_for_alt_text(soup),
+        'is_responsive': evaluate_viewport(viewport_tag.get("content", "") if viewport_tag else None),
+        'website_language': html_tag.get('lang') if html_tag else None,
+        'social_media_integration': analyze_social_media(soup),
+        'schema_types': schema_types,
+        'invalid_json_ld': invalid_json_ld,
+    }
+
+
+# SEO checks run on the fetched page, in output order
+SEO_BODY_CHECKS = {
+    'title_length': analyze_title,
+    'meta_desc_length': analyze_meta_description,
+    'headings': analyze_headings,
+    'images_without_alt': analyze_images_for_alt_text,
+    'keyword_results': lambda soup: keyword_analysis(get_combined_text(soup)),
+    'schema_types': analyze_schema_types,
+}
+# SEO checks that fetch the page again on their own
+SEO_NETWORK_CHECKS = {
+    'is_responsive': check_mobile_responsiveness,
+    'social_media_integration': check_social_media_integration,
+    'website_language': check_website_language,
+}
+SEO_FIELDS = tuple(SEO_BODY_CHECKS) + tuple(SEO_NETWORK_CHECKS)
+# SEO checks answered by <head> alone (see head_seo_analysis)
+HEAD_SEO_FIELDS = frozenset(('title_length', 'meta_desc_length', 'is_responsive', 'website_language'))
+
+
+def seo_field_analysis(url, fields=None, session=None, headers=None, max_bytes=MAX_CONTENT_BYTES,
+                       retry=DEFAULT_RETRY_POLICY, cache=None):
+    """
+    Runs the requested SEO checks of a page and skips the others, including the requests
+    behind them. When every requested check is answered by <head>, only the head is
+    downloaded and parsed.
+
+    Args:
+        url (str): The page URL.
+        fields (str or list, optional): The checks to run (see SEO_FIELDS). None runs all of them.
+        session (Session, optional): A session object for authenticated requests.
+        headers (dict, optional): Request headers.
+        max_bytes (int, optional): Maximum page size in bytes.
+        retry (RetryPolicy): Retry and circuit breaker policy for the page request.
+        cache (ExtractionCache, optional): Cache for the checks run on the page body.
+
+    Returns:
+        dict: The results of the requested checks.
+    """
+    fields = parse_fields(fields, SEO_FIELDS)
+    if fields and HEAD_SEO_FIELDS.issuperset(fields):
+        response, head = fetch_head_data(url, session=session, headers=headers, max_bytes=max_bytes, retry=retry)
+        response.raise_for_status()
+        return project_fields(head_seo_analysis(head), fields)
+
+    requested = fields or SEO_FIELDS
+    body_checks = tuple(field for field in requested if field in SEO_BODY_CHECKS)
+    data = {}
+    if body_checks:
+        response, body = fetch_page(url, session=session, headers=headers, max_bytes=max_bytes, retry=retry)
+        response.raise_for_status()
+
+        def analyze():
+            soup = BeautifulSoup(body, 'html.parser', from_encoding=get_body_encoding(response, body))
+            return {field: SEO_BODY_CHECKS[field](soup) for field in body_checks}
+
+        # A projection caches separately from the full analysis
+        context = () if fields is None else body_checks
+        data = cache.extract('seo', body, analyze, *context) if cache is not None else analyze()
+    for field in requested:
+        if field in SEO_NETWORK_CHECKS:
+            data[field] = SEO_NETWORK_CHECKS[field](url)
+    return project_fields(data, fields)
+
+
+def seo_error_analysis(url, session=None, max_bytes=MAX_CONTENT_BYTES, fields=None):
     try:
         print("YiraBot: Starting SEO Analysis")
-        response = session.get(url, timeout=10) if session else requests.get(url, timeout=10)
-        soup = BeautifulSoup(response.content, 'html.parser')
+        if fields:
+            # A projection has no fixed layout, so its results are shown as a key/value table
+            display_crawl_data(seo_field_analysis(url, fields, session=session, max_bytes=max_bytes))
+            return
+        response, body = fetch_page(url, session=session, max_bytes=max_bytes)
+        soup = BeautifulSoup(body, 'html.parser', from_encoding=get_body_encoding(response, body))
 
         title_length, title_status = analyze_title(soup)
         meta_desc_length, meta_desc_status = analyze_meta_description(soup)
@@ -205,7 +345,7 @@ def seo_error_analysis(url, session=None):
             website_language
         )
 
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, errors.ContentTypeError, errors.ContentTooLargeError) as e:
         print(f"Error occurred during SEO analysis: {e}")
 
 
@@ -0,0 +1,354 @@
+import itertools
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from requests.exceptions import RequestException
+from rich import print
+from . import errors
+from .connection_functions import create_pooled_session, DEFAULT_DNS_CACHE
+from .data_extraction_functions import parse_sitemap
+from .helper_functions import get_random_user_agent
+from .request_functions import fetch_page, get_body_encoding, MAX_CONTENT_BYTES
+
+# ============================================================
+# SERVER FUNCTIONS
+# Local HTTP server running crawl jobs on shared, warm state.
+# ============================================================
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8787
+MAX_REQUEST_BYTES = 1024 * 1024
+
+# HTTP status returned for each error raised by a job
+ERROR_STATUS = (
+    (errors.RobotsError, 403),
+    (errors.ContentTypeError, 415),
+    (errors.ContentTooLargeError, 413),
+    (errors.CircuitOpenError, 503),
+    (errors.QueueFullError, 503),
+    (errors.HTTPError, 502),
+    (errors.ConnectionError, 502),
+    (errors.TimeoutError, 504),
+    (errors.RequestError, 502),
+    (RequestException, 502),
+    (ValueError, 400),
+)
+
+
+def error_status(error):
+    for error_type, status in ERROR_STATUS:
+        if isinstance(error, error_type):
+            return status
+    return 500
+
+
+class JobQueue:
+    """
+    Shared worker pool for every request the server handles. At most `workers` jobs
+    run at once and at most `max_queued` are queued or running; beyond that, new jobs
+    are refused (or, for streamed batches, wait for a free slot). Finished jobs started
+    with submit_job stay retrievable by ID until `keep` newer ones have finished.
+    """
+
+    def __init__(self, workers=8, max_queued=1000, keep=1000):
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.workers = workers
+        self.max_queued = max_queued
+        self.slots = threading.BoundedSemaphore(max_queued)
+        self.jobs = OrderedDict()
+        self.keep = keep
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.pending = 0
+
+    def submit(self, function, *args, block=False):
+        """
+        Queues a call on the worker pool.
+
+        Raises:
+            errors.QueueFullError: If the queue is full and block is False.
+        """
+        if not self.slots.acquire(blocking=block):
+            raise errors.QueueFullError(self.max_queued)
+        with self.lock:
+            self.pending += 1
+        future = self.executor.submit(function, *args)
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future):
+        with self.lock:
+            self.pending -= 1
+        self.slots.release()
+
+    def submit_job(self, function, *args):
+        """
+        Queues a call and returns its job ID for later polling.
+        """
+        future = self.submit(function, *args)
+        with self.lock:
+            job_id = str(next(self.ids))
+            self.jobs[job_id] = future
+            while len(self.jobs) > self.keep and next(iter(self.jobs.values())).done():
+                self.jobs.popitem(last=False)
+        return job_id
+
+    def job(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def stats(self):
+        return {'workers': self.workers, 'pending': self.pending, 'max_queued': self.max_queued}
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+class YirabotServer(ThreadingHTTPServer):
+    """
+    Local HTTP server exposing the crawl, scrape, SEO, validate and get-html commands.
+    Every request shares one Yirabot instance, one pooled session, the DNS cache,
+    robots.txt and sitemap caches, the extraction cache and one job queue, so that
+    state stays warm across thousands of jobs instead of being rebuilt per process.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, bot, workers=8, max_queued=1000, owns_bot=False):
+        super().__init__(address, YirabotRequestHandler)
+        self.bot = bot
+        self.owns_bot = owns_bot  # A bot created for the server is closed with it
+        self.session = create_pooled_session()
+        self.jobs = JobQueue(workers, max_queued)
+        DEFAULT_DNS_CACHE.install()
+
+    def run_job(self, command, url, options):
+        """
+        Runs one command for one URL and returns its JSON-serializable result.
+        """
+        bot, session = self.bot, self.session
+        force = bool(options.get('force'))
+        head_only = bool(options.get('head_only'))
+        fields = options.get('fields')
+        if command == "crawl":
+            return bot.crawl(url, session, force=force, head_only=head_only, fields=fields)
+        if command == "scrape":
+            return bot.scrape(url, session, force=force, fields=fields)
+        if command == "seo":
+            return bot.seo_analysis(url, session, head_only=head_only, fields=fields)
+        if command == "check":
+            try:
+                return bot.retry.request("HEAD", url, session=session, allow_redirects=True, timeout=10).status_code
+            except RequestException:
+                return None
+        if command == "get-html":
+            response, body = fetch_page(url, session=session, headers={'User-Agent': get_random_user_agent()},
+                                        max_bytes=bot.max_bytes, retry=bot.retry)
+            response.raise_for_status()
+            return body.decode(get_body_encoding(response, body), "replace")
+        raise ValueError(f"Unknown command: {command}")
+
+    def iter_results(self, command, urls, options):
+        """
+        Runs a command for many URLs on the shared pool and yields (url, result, error)
+        as jobs finish. A batch keeps at most `workers` jobs queued at a time, so one
+        large batch cannot starve other clients.
+        """
+        urls = iter(urls)
+        pending = {}
+        try:
+            while True:
+                for url in urls:
+                    pending[self.jobs.submit(self.run_job, command, url, options, block=True)] = url
+                    if len(pending) >= self.jobs.workers:
+                        break
+                if not pending:
+                    return
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = pending.pop(future)
+                    error = future.exception()
+                    yield url, None if error else future.result(), error
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def server_close(self):
+        self.jobs.shutdown()
+        DEFAULT_DNS_CACHE.uninstall()
+        if self.owns_bot:
+            self.bot.close()
+        super().server_close()
+
+
+class YirabotRequestHandler(BaseHTTPRequestHandler):
+    """
+    Routes:
+        GET  /health                      Server, queue and cache statistics.
+        GET  /jobs/<id>                   Status and result of a job queued with "async".
+        GET|POST /crawl, /scrape, /seo, /get-html
+             ?url=...                     Runs the command and returns its JSON result.
+             ?url=...&async=1             Queues the command and returns a job ID (202).
+             {"urls": [...]}              Streams one NDJSON line per URL as jobs finish.
+        GET|POST /validate?url=<sitemap>  Streams the status code of every sitemap URL as NDJSON.
+    Options (query string or JSON body): force, head_only, fields (e.g. fields=title,canonical_url).
+    """
+
+    protocol_version = "HTTP/1.1"
+    server_version = "YiraBot"
+    COMMANDS = {"/crawl": "crawl", "/scrape": "scrape", "/seo": "seo", "/get-html": "get-html"}
+
+    def do_GET(self):
+        self.handle_request()
+
+    def do_POST(self):
+        self.handle_request()
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_params(self):
+        parts = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_REQUEST_BYTES:
+            raise ValueError("Request body too large")
+        if length:
+            body = json.loads(self.rfile.read(length))
+            if not isinstance(body, dict):
+                raise ValueError("Request body must be a JSON object")
+            params.update(body)
+        for flag in ("force", "head_only", "async"):
+            if isinstance(params.get(flag), str):
+                params[flag] = params[flag].lower() in ("1", "true", "yes")
+        return parts.path.rstrip("/") or "/", params
+
+    def handle_request(self):
+        try:
+            path, params = self.read_params()
+        except ValueError as e:
+            return self.send_json({'error': str(e)}, 400)
+
+        if path == "/health":
+            return self.send_json({
+                'status': 'ok',
+                'jobs': self.server.jobs.stats(),
+                'extraction_cache': self.server.bot.cache.stats(),
+                'dns_cache': DEFAULT_DNS_CACHE.stats(),
+                'robots_cached': len(self.server.bot.robots),
+            })
+        if path.startswith("/jobs/"):
+            return self.send_job(path[len("/jobs/"):])
+        if path == "/validate":
+            return self.send_validation(params)
+        if path not in self.COMMANDS:
+            return self.send_json({'error': f"Unknown endpoint: {path}"}, 404)
+
+        command = self.COMMANDS[path]
+        if isinstance(params.get('urls'), list):
+            return self.send_stream(self.server.iter_results(command, params['urls'], params))
+        url = params.get('url')
+        if not isinstance(url, str) or not url.startswith(("http://", "https://")):
+            return self.send_json({'error': "An http(s) 'url' or a 'urls' list is required"}, 400)
+
+        try:
+            if params.get('async'):
+                job_id = self.server.jobs.submit_job(self.server.run_job, command, url, params)
+                return self.send_json({'job': job_id, 'status_url': f"/jobs/{job_id}"}, 202)
+            result = self.server.jobs.submit(self.server.run_job, command, url, params).result()
+        except Exception as e:
+            return self.send_error_json(url, e)
+        self.send_json({'url': url, 'data': result})
+
+    def send_job(self, job_id):
+        future = self.server.jobs.job(job_id)
+        if future is None:
+            return self.send_json({'error': f"Unknown job: {job_id}"}, 404)
+        if not future.done():
+            return self.send_json({'job': job_id, 'status': 'running' if future.running() else 'queued'})
+        error = future.exception()
+        if error:
+            return self.send_json({'job': job_id, 'status': 'failed', 'error': str(error),
+                                   'type': type(error).__name__})
+        self.send_json({'job': job_id, 'status': 'done', 'data': future.result()})
+
+    def send_validation(self, params):
+        url = params.get('url')
+        if not isinstance(url, str) or not url.startswith(("http://", "https://")):
+            return self.send_json({'error': "An http(s) sitemap 'url' is required"}, 400)
+        urls = parse_sitemap(url, script=True, retry=self.server.bot.retry)
+        self.send_stream(self.server.iter_results("check", urls, params))
+
+    def send_error_json(self, url, error):
+        self.send_json({'url': url, 'error': str(error), 'type': type(error).__name__}, error_status(error))
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 503:
+            self.send_header("Retry-After", "5")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_stream(self, results):
+        """
+        Streams (url, result, error) tuples as chunked NDJSON, one line per finished job.
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for url, result, error in results:
+                record = {'url': url, 'error': str(error), 'type': type(error).__name__} if error \
+                    else {'url': url, 'data': result}
+                line = json.dumps(record, default=str).encode("utf-8") + b"\n"
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        finally:
+            results.close()  # Cancels the batch's queued jobs if the client went away
+
+
+def create_server(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=8, max_queued=1000, bot=None,
+                  max_bytes=MAX_CONTENT_BYTES):
+    """
+    Creates the local YiraBot server without starting it.
+
+    Args:
+        host (str): Interface to listen on. Keep the default to only accept local clients.
+        port (int): Port to listen on.
+        workers (int): Number of jobs run concurrently.
+        max_queued (int): Maximum number of queued and running jobs.
+        bot (Yirabot, optional): The instance whose caches and settings are shared by all jobs.
+        max_bytes (int, optional): Maximum page size in bytes, when no bot is given.
+
+    Returns:
+        YirabotServer: The server; call serve_forever() to start it.
+    """
+    owns_bot = bot is None
+    if owns_bot:
+        from . import Yirabot  # Imported here because the package imports this module
+        bot = Yirabot(max_bytes=max_bytes)
+    return YirabotServer((host, port), bot, workers, max_queued, owns_bot)
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=8, max_queued=1000):
+    """
+    Runs the local YiraBot server until interrupted.
+    """
+    server = create_server(host, port, workers, max_queued)
+    print(f"YiraBot: Serving on http://{host}:{port} with {workers} workers (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nYiraBot: Server Stopped")
+    finally:
+        server.server_close()
@@ -0,0 +1,274 @@
+import hashlib
+import json
+import urllib.robotparser
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from urllib.parse import urljoin, urlparse
+import requests
+from bs4 import BeautifulSoup
+from . import errors
+from .data_extraction_functions import extract_links, parse_sitemap
+from .helper_functions import get_random_user_agent, dynamic_delay
+from .keyword_functions import TopKCounter
+from .request_functions import fetch_page, get_body_encoding, MAX_CONTENT_BYTES
+from .scope_functions import load_scope
+from .seo_functions import analyze_page_seo
+from .structured_data_functions import SchemaTypeAggregator
+
+# ============================================================
+# SITE AUDIT FUNCTIONS
+# Concurrent site-wide SEO audit with streaming aggregates.
+# ============================================================
+
+
+class DuplicateTracker:
+    """
+    Finds values (titles, meta descriptions) shared by several pages with bounded memory.
+    Values are tracked by an 8-byte digest in a TopKCounter, so the most duplicated
+    values are always reported while rare ones may be forgotten on very large sites.
+    """
+
+    def __init__(self, capacity=10000, samples=5):
+        self.counter = TopKCounter(capacity)
+        self.samples = {}
+        self.sample_size = samples
+
+    def add(self, value, url):
+        key = hashlib.blake2b(value.strip().lower().encode("utf-8"), digest_size=8).digest()
+        self.counter.add(key)
+        entry = self.samples.setdefault(key, [value.strip(), []])
+        if len(entry[1]) < self.sample_size:
+            entry[1].append(url)
+        if len(self.samples) > 2 * self.counter.capacity:
+            self.samples = {key: entry for key, entry in self.samples.items() if key in self.counter.counts}
+
+    def duplicates(self, top=20):
+        """
+        Returns the most shared values with their page count and a few example URLs.
+        """
+        return [{'value': self.samples[key][0], 'pages': count, 'examples': self.samples[key][1]}
+                for key, count in self.counter.most_common(top) if count > 1 and key in self.samples]
+
+
+class SiteAuditAggregator:
+    """
+    Streams per-page SEO results into site-level findings. Apart from the bounded
+    duplicate trackers, it only keeps counters, so memory does not grow with the
+    number of audited pages.
+    """
+
+    def __init__(self):
+        self.pages = 0
+        self.failed = 0
+        self.titles = DuplicateTracker()
+        self.meta_descriptions = DuplicateTracker()
+        self.h1_distribution = {"0": 0, "1": 0, "2+": 0}
+        self.missing_title = 0
+        self.long_title = 0
+        self.missing_meta_description = 0
+        self.long_meta_description = 0
+        self.images_without_alt = 0
+        self.pages_with_images_without_alt = 0
+        self.missing_viewport = 0
+        self.missing_language = 0
+        self.bad_heading_structure = 0
+        self.schema = SchemaTypeAggregator()
+
+    def add(self, url, page):
+        """
+        Adds the result of analyze_page_seo for one page.
+        """
+        self.pages += 1
+        if page['title']:
+            self.titles.add(page['title'], url)
+        if page['meta_description']:
+            self.meta_descriptions.add(page['meta_description'], url)
+
+        h1_count = page['headings'].get('h1', 0)
+        self.h1_distribution["0" if h1_count == 0 else "1" if h1_count == 1 else "2+"] += 1
+        self.missing_title += page['title_length'][1] == "Missing or Empty"
+        self.long_title += page['title_length'][1] != "OK" and page['title_length'][0] > 0
+        self.missing_meta_description += page['meta_desc_length'][1] == "Missing or Empty"
+        self.long_meta_description += page['meta_desc_length'][1] != "OK" and page['meta_desc_length'][0] > 0
+        self.images_without_alt += len(page['images_without_alt'])
+        self.pages_with_images_without_alt += bool(page['images_without_alt'])
+        self.missing_viewport += not page['is_responsive'][0]
+        self.missing_language += not page['website_language']
+        self.bad_heading_structure += page['heading_structure'] != "OK"
+        self.schema.add(url, page['schema_types'], page['invalid_json_ld'])
+
+    def add_failure(self):
+        self.failed += 1
+
+    def summary(self, top=20):
+        """
+        Returns the site-level findings as a dictionary.
+        """
+        return {
+            'pages_audited': self.pages,
+            'pages_failed': self.failed,
+            'duplicate_titles': self.titles.duplicates(top),
+            'duplicate_meta_descriptions': self.meta_descriptions.duplicates(top),
+            'h1_distribution': self.h1_distribution,
+            'missing_title': self.missing_title,
+            'long_title': self.long_title,
+            'missing_meta_description': self.missing_meta_description,
+            'long_meta_description': self.long_meta_description,
+            'images_without_alt': self.images_without_alt,
+            'pages_with_images_without_alt': self.pages_with_images_without_alt,
+            'missing_viewport': self.missing_viewport,
+            'missing_language': self.missing_language,
+            'bad_heading_structure': self.bad_heading_structure,
+            'structured_data': self.schema.summary(top),
+        }
+
+
+def fetch_site_page(url, process_page=None, session=None, max_bytes=MAX_CONTENT_BYTES):
+    """
+    Fetches and parses one page of a site crawl.
+
+    Args:
+        url (str): The page URL.
+        process_page (callable, optional): Called with the parsed page; its return value is the page result.
+        session (Session, optional): A session object for authenticated requests.
+        max_bytes (int, optional): Maximum page size in bytes.
+
+    Returns:
+        tuple: The page result (None without process_page) and the page's internal links.
+    """
+    response, body = fetch_page(url, session=session, headers={'User-Agent': get_random_user_agent()},
+                                max_bytes=max_bytes)
+    dynamic_delay(response, script=True)
+    response.raise_for_status()
+    soup = BeautifulSoup(body, 'html.parser', from_encoding=get_body_encoding(response, body))
+    internal_links, _ = extract_links(soup, url)
+    return (process_page(soup) if process_page else None), internal_links
+
+
+def crawl_site(url, process_page=None, seeds=None, follow_links=True, max_pages=500, workers=8, session=None,
+               force=False, max_bytes=MAX_CONTENT_BYTES, fetch=fetch_site_page, scope=None, progress=None):
+    """
+    Crawls the pages of one site concurrently, yielding each page as soon as it is done.
+    Only a bounded number of requests is in flight at a time. The seeds are always
+    crawled; discovered links outside the scope are dropped before they are enqueued,
+    so a scope that excludes the start page still crawls from it. Once max_pages links
+    have been enqueued, further links are ignored, so memory is bounded by max_pages
+    rather than by the size of the site.
+
+    Args:
+        url (str): The site URL, used as the start page and to scope the crawl to its host.
+        process_page (callable, optional): Called with every parsed page to produce its result.
+        seeds (list, optional): Start URLs. Defaults to [url].
+        follow_links (bool): If True, internal links of crawled pages are crawled as well.
+        max_pages (int): Maximum number of pages to fetch.
+        workers (int): Number of pages fetched concurrently.
+        session (Session, optional): A session object for authenticated requests.
+        force (bool): If True, ignores robots.txt.
+        max_bytes (int, optional): Maximum page size in bytes.
+        fetch (callable, optional): Fetches one page; same signature and result as fetch_site_page.
+        scope (CrawlScope, optional): Scope filter, or the path of a JSON scope file.
+        progress (CrawlProgress, optional): Live progress view advanced after every page.
+
+    Yields:
+        tuple: (url, result, internal_links, error) for every page; error is None on success.
+    """
+    session = session or requests.Session()
+    robots = urllib.robotparser.RobotFileParser(urljoin(url, "/robots.txt"))
+    if not force:
+        try:
+            robots.read()
+        except (OSError, ValueError):
+            robots.allow_all = True  # robots.txt is unavailable, so nothing is disallowed
+
+    scope = load_scope(scope)
+    frontier = deque(seeds or [url])
+    host = urlparse(url).netloc
+    seen = set(frontier)
+    allows = scope.allows if scope else None
+    disallowed = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+        submitted = 0
+        while frontier or pending:
+            while frontier and len(pending) < workers * 2 and submitted < max_pages:
+                page_url = frontier.popleft()
+                if not force and not robots.can_fetch("*", page_url):
+                    disallowed += 1
+                    continue
+                pending[executor.submit(fetch, page_url, process_page, session, max_bytes)] = page_url
+                submitted += 1
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                page_url = pending.pop(future)
+                try:
+                    result, internal_links = future.result()
+                except (requests.exceptions.RequestException, errors.ContentTypeError,
+                        errors.ContentTooLargeError) as e:
+                    if progress:
+                        progress.advance(page_url, e, len(frontier) + len(pending))
+                    yield page_url, None, [], e
+                    continue
+                if follow_links:
+                    for link in internal_links:
+                        # Links past the page budget could never be fetched, so they are not remembered
+                        if len(seen) - disallowed >= max_pages:
+                            break
+                        if link not in seen and urlparse(link).netloc == host and (allows is None or allows(link)):
+                            seen.add(link)
+                            frontier.append(link)
+                if progress:
+                    progress.advance(page_url, None, len(frontier) + len(pending))
+                yield page_url, result, internal_links, None
+
+
+def audit_site(url, output=None, max_pages=500, workers=8, session=None, force=False, max_bytes=MAX_CONTENT_BYTES,
+               on_page=None, scope=None, progress=None):
+    """
+    Audits a whole site concurrently. Pages come from the site's sitemap, or, if there
+    is none, from following internal links starting at the given URL. Every page is
+    fetched once, its results are streamed to an optional NDJSON file and folded into
+    a SiteAuditAggregator.
+
+    Args:
+        url (str): The site URL.
+        output (str, optional): Path of the per-page NDJSON file to write.
+        max_pages (int): Maximum number of pages to audit.
+        workers (int): Number of pages fetched concurrently.
+        session (Session, optional): A session object for authenticated requests.
+        force (bool): If True, ignores robots.txt.
+        max_bytes (int, optional): Maximum page size in bytes.
+        on_page (callable, optional): Called with (url, result, error) after every page.
+        scope (CrawlScope, optional): Only pages in this scope are audited.
+        progress (CrawlProgress, optional): Live progress view.
+
+    Returns:
+        dict: The site-level summary (see SiteAuditAggregator.summary).
+    """
+    scope = load_scope(scope)
+    sitemap_urls = parse_sitemap(url.rstrip("/"), scope=scope)
+    aggregator = SiteAuditAggregator()
+    output_file = open(output, "w") if output else None
+
+    try:
+        for page_url, result, _, error in crawl_site(url, analyze_page_seo, seeds=sitemap_urls,
+                                                     follow_links=not sitemap_urls, max_pages=max_pages,
+                                                     workers=workers, session=session, force=force,
+                                                     max_bytes=max_bytes, scope=scope, progress=progress):
+            if error:
+                aggregator.add_failure()
+                record = {'url': page_url, 'error': str(error)}
+            else:
+                aggregator.add(page_url, result)
+                record = dict(url=page_url, **result)
+            on_page(page_url, result, error) if on_page else None
+            if output_file:
+                output_file.write(json.dumps(record) + "\n")
+    finally:
+        if output_file:
+            output_file.close()
+
+    return aggregator.summary()
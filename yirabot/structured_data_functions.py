@@ -0,0 +1,226 @@
+import json
+from functools import cached_property
+from bs4 import Tag
+
+# ============================================================
+# STRUCTURED DATA FUNCTIONS
+# JSON-LD, microdata and RDFa extraction and schema type aggregation.
+# ============================================================
+
+STRUCTURED_DATA_FORMATS = ("json_ld", "microdata", "rdfa")
+JSON_LD_TYPE = "application/ld+json"
+SCHEMA_ORG_PREFIXES = ("https://schema.org/", "http://schema.org/", "schema:")
+# Elements whose microdata value is an attribute rather than their text
+MICRODATA_VALUE_ATTRIBUTES = {
+    'meta': 'content', 'a': 'href', 'area': 'href', 'link': 'href', 'audio': 'src', 'embed': 'src',
+    'iframe': 'src', 'img': 'src', 'source': 'src', 'track': 'src', 'video': 'src', 'object': 'data',
+    'data': 'value', 'meter': 'value', 'time': 'datetime',
+}
+
+
+class JSONLD(str):
+    """
+    The text of a JSON-LD script. It is only decoded when `data` (or `types`) is first
+    read, and the decoded value is kept, so pages whose JSON-LD is never inspected skip
+    JSON parsing entirely. It serializes as the original text.
+    """
+
+    @cached_property
+    def data(self):
+        """
+        The decoded JSON-LD, or None if it is not valid JSON.
+        """
+        try:
+            return json.loads(self)
+        except ValueError:
+            return None
+
+    @property
+    def valid(self):
+        return self.data is not None
+
+    @property
+    def types(self):
+        """
+        The schema types of the top-level objects, including those of an @graph.
+        """
+        data = self.data
+        objects = data if isinstance(data, list) else [data]
+        types = []
+        for entry in objects:
+            if not isinstance(entry, dict):
+                continue
+            graph = entry.get("@graph")
+            for node in (graph if isinstance(graph, list) else []) + [entry]:
+                node_types = node.get("@type") if isinstance(node, dict) else None
+                types.extend(node_types if isinstance(node_types, list) else [node_types] if node_types else [])
+        return [schema_type_name(node_type) for node_type in types if isinstance(node_type, str)]
+
+    def __reduce__(self):
+        # Pickled (for process pools) without the decoded value
+        return JSONLD, (str(self),)
+
+
+def schema_type_name(schema_type):
+    """
+    Shortens a schema.org type URL to its name, e.g. 'https://schema.org/Product' to 'Product'.
+    """
+    for prefix in SCHEMA_ORG_PREFIXES:
+        if schema_type.startswith(prefix):
+            return schema_type[len(prefix):]
+    return schema_type
+
+
+def _as_json_ld(script):
+    # Results read back from JSON files hold plain strings
+    return script if isinstance(script, JSONLD) else JSONLD(script)
+
+
+def _add_property(entity, names, value):
+    for name in names:
+        entity['properties'].setdefault(name, []).append(value)
+
+
+def _microdata_value(tag):
+    attribute = MICRODATA_VALUE_ATTRIBUTES.get(tag.name)
+    if attribute and tag.has_attr(attribute):
+        return tag[attribute]
+    return tag.get_text(" ", strip=True)
+
+
+def _rdfa_value(tag):
+    for attribute in ("content", "resource", "href", "src"):
+        if tag.has_attr(attribute):
+            return tag[attribute]
+    return tag.get_text(" ", strip=True)
+
+
+def _rdfa_type(type_name, vocab):
+    return vocab.rstrip("/") + "/" + type_name if vocab and ":" not in type_name else type_name
+
+
+def extract_structured_data(soup):
+    """
+    Extracts JSON-LD, microdata and RDFa (Lite) from an already parsed page in a single
+    walk over the tree. Microdata items and RDFa entities are nested as they are in
+    the page; JSON-LD scripts are kept as lazily decoded JSONLD strings.
+
+    Parameters:
+    - soup (BeautifulSoup): BeautifulSoup object of the crawled page.
+
+    Returns:
+    - dict: 'json_ld' (list of JSONLD), 'microdata' and 'rdfa' (lists of items, each a dict
+      with 'type', 'properties' mapping names to lists of values, and optionally 'id').
+    """
+    json_ld, microdata, rdfa = [], [], []
+    # Every entry is a tag with the microdata item, RDFa entity and RDFa vocabulary it is in
+    stack = [(child, None, None, None) for child in reversed(soup.contents) if isinstance(child, Tag)]
+    while stack:
+        tag, item, entity, vocab = stack.pop()
+        if tag.name == "script":
+            if (tag.get("type") or "").split(";")[0].strip().lower() == JSON_LD_TYPE:
+                json_ld.append(JSONLD((tag.string or "").strip()))
+            continue
+
+        item_properties = (tag.get("itemprop") or "").split()
+        if tag.has_attr("itemscope"):
+            new_item = {'type': (tag.get("itemtype") or "").split(), 'properties': {}}
+            if tag.get("itemid"):
+                new_item['id'] = tag["itemid"]
+            if item_properties and item is not None:
+                _add_property(item, item_properties, new_item)
+            else:
+                microdata.append(new_item)
+            item = new_item
+        elif item_properties and item is not None:
+            _add_property(item, item_properties, _microdata_value(tag))
+
+        vocab = tag.get("vocab", vocab)
+        rdfa_properties = (tag.get("property") or "").split()
+        if tag.has_attr("typeof"):
+            new_entity = {'type': [_rdfa_type(name, vocab) for name in tag["typeof"].split()], 'properties': {}}
+            if tag.get("resource") or tag.get("about"):
+                new_entity['id'] = tag.get("resource") or tag.get("about")
+            if rdfa_properties and entity is not None:
+                _add_property(entity, rdfa_properties, new_entity)
+            else:
+                rdfa.append(new_entity)
+            entity = new_entity
+        elif rdfa_properties and entity is not None:
+            _add_property(entity, rdfa_properties, _rdfa_value(tag))
+
+        stack.extend((child, item, entity, vocab) for child in reversed(tag.contents) if isinstance(child, Tag))
+    return {'json_ld': json_ld, 'microdata': microdata, 'rdfa': rdfa}
+
+
+def structured_data_types(structured_data):
+    """
+    Lists the top-level schema types of a page's structured data with the formats
+    they are declared in. Decodes the page's JSON-LD.
+
+    Parameters:
+    - structured_data (dict): The result of extract_structured_data.
+
+    Returns:
+    - dict: Type name to the list of formats, e.g. {'Product': ['json_ld', 'microdata']}.
+    """
+    types = {}
+    for script in structured_data['json_ld']:
+        for schema_type in _as_json_ld(script).types:
+            types.setdefault(schema_type, []).append("json_ld")
+    for data_format in STRUCTURED_DATA_FORMATS[1:]:
+        for entry in structured_data[data_format]:
+            for schema_type in entry['type']:
+                types.setdefault(schema_type_name(schema_type), []).append(data_format)
+    return {schema_type: sorted(set(formats)) for schema_type, formats in types.items()}
+
+
+def count_invalid_json_ld(structured_data):
+    return sum(not _as_json_ld(script).valid for script in structured_data['json_ld'])
+
+
+class SchemaTypeAggregator:
+    """
+    Aggregates the schema types of many pages into a site-level report: how many pages
+    declare each type, in which formats, with a few example URLs.
+    """
+
+    def __init__(self, samples=3):
+        self.pages = 0
+        self.pages_with_data = 0
+        self.invalid_json_ld = 0
+        self.types = {}
+        self.sample_size = samples
+
+    def add(self, url, schema_types, invalid_json_ld=0):
+        """
+        Adds one page's schema types (see structured_data_types).
+        """
+        self.pages += 1
+        self.pages_with_data += bool(schema_types)
+        self.invalid_json_ld += bool(invalid_json_ld)
+        for schema_type, formats in schema_types.items():
+            entry = self.types.setdefault(schema_type, {'pages': 0, 'formats': set(), 'examples': []})
+            entry['pages'] += 1
+            entry['formats'].update(formats)
+            if len(entry['examples']) < self.sample_size:
+                entry['examples'].append(url)
+
+    def add_page(self, url, structured_data):
+        """
+        Adds one page's structured data, e.g. the 'structured_data' field of a crawl result.
+        """
+        self.add(url, structured_data_types(structured_data), count_invalid_json_ld(structured_data))
+
+    def summary(self, top=50):
+        """
+        Returns the site-level schema report, most common types first.
+        """
+        ranked = sorted(self.types.items(), key=lambda entry: -entry[1]['pages'])[:top]
+        return {
+            'pages': self.pages,
+            'pages_with_structured_data': self.pages_with_data,
+            'pages_with_invalid_json_ld': self.invalid_json_ld,
+            'types': [{'type': schema_type, 'pages': entry['pages'], 'formats': sorted(entry['formats']),
+                       'examples': entry['examples']} for schema_type, entry in ranked],
+        }
@@ -0,0 +1,431 @@
+import base64
+import bisect
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+from requests.structures import CaseInsensitiveDict
+from .request_functions import open_stream, iter_body, CHUNK_SIZE, MAX_CONTENT_BYTES, HTML_CONTENT_TYPES
+from .retry_functions import DEFAULT_RETRY_POLICY
+
+# ============================================================
+# WARC FUNCTIONS
+# Writing and reading web archive (WARC) files with CDX indexes.
+# ============================================================
+
+WARC_MAX_SIZE = 1024 * 1024 * 1024
+SPOOL_BYTES = 1024 * 1024
+CDX_HEADER = " CDX N b a m s k r M S V g\n"
+# Hop-by-hop and encoding headers that no longer describe the archived (decoded) body
+REWRITTEN_HEADERS = ("content-encoding", "transfer-encoding", "content-length")
+
+
+def open_warc(path):
+    """
+    Opens a WARC file for reading; .gz files may hold one gzip member per record.
+    """
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+def _read_headers(stream):
+    headers = CaseInsensitiveDict()
+    while True:
+        line = stream.readline()
+        if not line or line in (b"\r\n", b"\n"):
+            return headers
+        name, _, value = line.decode("utf-8", "replace").partition(":")
+        headers[name.strip()] = value.strip()
+
+
+def iter_warc_records(path):
+    """
+    Reads the records of a WARC file one at a time.
+
+    Args:
+        path (str): Path of the .warc or .warc.gz file.
+
+    Yields:
+        tuple: The record's WARC headers and its content block (bytes).
+
+    Raises:
+        ValueError: If the file is not a WARC file.
+    """
+    with open_warc(path) as stream:
+        while True:
+            line = stream.readline()
+            if not line:
+                return
+            if not line.strip():
+                continue  # Blank lines separating records
+            if not line.startswith(b"WARC/"):
+                raise ValueError(f"Not a WARC record in '{path}': {line[:40]!r}")
+            headers = _read_headers(stream)
+            block = stream.read(int(headers.get("Content-Length", 0)))
+            yield headers, block
+
+
+def _dechunk(body):
+    chunks = []
+    position = 0
+    while True:
+        end = body.find(b"\r\n", position)
+        if end < 0:
+            break
+        size = int(body[position:end].split(b";")[0] or b"0", 16)
+        if size == 0:
+            break
+        chunks.append(body[end + 2:end + 2 + size])
+        position = end + 4 + size
+    return b"".join(chunks)
+
+
+def parse_http_response(block):
+    """
+    Splits the block of a WARC response record into status, headers and body. Chunked
+    and gzip/deflate-encoded bodies are decoded.
+
+    Args:
+        block (bytes): The record's content block.
+
+    Returns:
+        tuple: The status code, the response headers and the body.
+
+    Raises:
+        ValueError: If the body uses a content encoding that cannot be decoded.
+    """
+    head, _, body = block.partition(b"\r\n\r\n")
+    lines = head.decode("iso-8859-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    headers = CaseInsensitiveDict()
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip()] = value.strip()
+
+    if "chunked" in headers.get("Transfer-Encoding", "").lower():
+        body = _dechunk(body)
+    encoding = headers.get("Content-Encoding", "").lower()
+    if encoding in ("gzip", "x-gzip"):
+        body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+    elif encoding == "deflate":
+        try:
+            body = zlib.decompress(body)
+        except zlib.error:
+            body = zlib.decompress(body, -zlib.MAX_WBITS)
+    elif encoding not in ("", "identity"):
+        raise ValueError(f"Unsupported Content-Encoding: {encoding}")
+    return status, headers, body
+
+
+def iter_warc_responses(path):
+    """
+    Reads the HTTP responses archived in a WARC file.
+
+    Args:
+        path (str): Path of the .warc or .warc.gz file.
+
+    Yields:
+        tuple: (url, status, headers, body, error) for every response record. A record
+        that cannot be parsed or decoded has None for status, headers and body and the
+        reason in error, so the records after it are still read.
+    """
+    for headers, block in iter_warc_records(path):
+        if headers.get("WARC-Type") == "response" and \
+                headers.get("Content-Type", "").startswith("application/http"):
+            url = headers.get("WARC-Target-URI", "").strip("<>")
+            try:
+                status, response_headers, body = parse_http_response(block)
+            except (ValueError, IndexError, zlib.error) as e:
+                yield url, None, None, None, f"{type(e).__name__}: {e}"
+                continue
+            yield url, status, response_headers, body, None
+
+
+def surt(url):
+    """
+    Returns the sort-friendly URL key used in CDX indexes, e.g.
+    'https://www.Example.com/a?b' becomes 'com,example)/a?b'.
+    """
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    host = host[4:] if host.startswith("www.") else host
+    key = ",".join(reversed(host.split("."))) + ")" + (parts.path or "/")
+    return (key + "?" + parts.query if parts.query else key).lower()
+
+
+def _http_head(response, length):
+    version = {10: "HTTP/1.0", 20: "HTTP/2"}.get(getattr(response.raw, "version", 11), "HTTP/1.1")
+    lines = [f"{version} {response.status_code} {response.reason or ''}".rstrip()]
+    for name, value in response.headers.items():
+        if name.lower() in REWRITTEN_HEADERS:
+            if name.lower() == "content-encoding":
+                lines.append(f"X-Archive-Orig-Content-Encoding: {value}")
+            continue
+        lines.append(f"{name}: {value}")
+    lines.append(f"Content-Length: {length}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("iso-8859-1", "replace")
+
+
+class WARCWriter:
+    """
+    Writes fetched responses to WARC files, so a crawl archive is a few large
+    sequential files instead of one file per page. Each record is its own gzip member,
+    so it can be read on its own from its offset. Files roll over once they reach
+    max_size, and every file gets a sorted CDX index next to it (written when the file
+    is finished) for random access by URL. Until then each record's CDX line is appended
+    to a .cdx.open file, so an interrupted crawl still leaves an index. Bodies are spooled to a temporary file while
+    they stream in, so large bodies never sit in memory and failed downloads leave no
+    partial records. Archived bodies are decoded: Content-Encoding is kept as
+    X-Archive-Orig-Content-Encoding and Content-Length is the decoded length.
+    Safe to share between threads.
+    """
+
+    def __init__(self, directory=".", prefix="yirabot", max_size=WARC_MAX_SIZE, compress=True):
+        """
+        Args:
+            directory (str): Directory the WARC and CDX files are written to.
+            prefix (str): File name prefix; names also hold the start time, process ID and a serial.
+            max_size (int): Size in bytes after which a new file is started.
+            compress (bool): If False, writes uncompressed .warc files.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.prefix = prefix
+        self.max_size = max_size
+        self.compress = compress
+        self.lock = threading.Lock()
+        self.started = time.strftime("%Y%m%d%H%M%S")
+        self.serial = 0
+        self.file = None
+        self.path = None
+        self.index = []
+        self.index_file = None
+        self.records = 0
+        self.files = []
+
+    def _open(self):
+        extension = "warc.gz" if self.compress else "warc"
+        while self.file is None:
+            self.path = os.path.join(self.directory,
+                                     f"{self.prefix}-{self.started}-{os.getpid()}-{self.serial:05d}.{extension}")
+            self.serial += 1
+            try:
+                self.file = open(self.path, "xb")  # Never overwrite an earlier archive
+            except FileExistsError:
+                continue
+        self.files.append(self.path)
+        self.index_file = open(self._index_path() + ".open", "w")
+        self.index_file.write(CDX_HEADER)
+        info = b"software: YiraBot\r\nformat: WARC File Format 1.0\r\n"
+        self._write_record({'WARC-Type': 'warcinfo', 'WARC-Filename': os.path.basename(self.path),
+                            'Content-Type': 'application/warc-fields'}, [info], len(info))
+
+    def _index_path(self):
+        return self.path.rsplit(".warc", 1)[0] + ".cdx"
+
+    def _finish(self):
+        """
+        Closes the current file and replaces its running CDX lines with the sorted index.
+        """
+        if self.file is None:
+            return
+        self.file.close()
+        self.index_file.close()
+        with open(self._index_path(), "w") as index:
+            index.write(CDX_HEADER)
+            index.writelines(sorted(self.index))
+        os.remove(self._index_path() + ".open")
+        self.file = None
+        self.index_file = None
+        self.index = []
+
+    def _write_record(self, warc_headers, blocks, length):
+        """
+        Appends one record and returns its offset and its length on disk.
+        """
+        offset = self.file.tell()
+        headers = {
+            'WARC-Record-ID': f"<urn:uuid:{uuid.uuid4()}>",
+            'WARC-Date': datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        }
+        headers.update(warc_headers)
+        headers['Content-Length'] = str(length)
+        head = "WARC/1.0\r\n" + "".join(f"{name}: {value}\r\n" for name, value in headers.items()) + "\r\n"
+
+        stream = gzip.GzipFile(fileobj=self.file, mode="wb") if self.compress else self.file
+        stream.write(head.encode("utf-8"))
+        for block in blocks:
+            if isinstance(block, bytes):
+                stream.write(block)
+            else:
+                shutil.copyfileobj(block, stream, CHUNK_SIZE)
+        stream.write(b"\r\n\r\n")
+        if self.compress:
+            stream.close()  # Ends the gzip member; the underlying file stays open
+        return offset, self.file.tell() - offset
+
+    def write_response(self, url, response, body):
+        """
+        Archives one response.
+
+        Args:
+            url (str): The requested URL.
+            response (Response): The response, for its status line and headers.
+            body (bytes or iterable): The decoded body, or its chunks as they stream in.
+
+        Returns:
+            str: Path of the WARC file the record was written to.
+        """
+        digest = hashlib.sha1()
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) as spool:
+            if isinstance(body, bytes):
+                digest.update(body)
+                length, blocks = len(body), [body]
+            else:
+                length = 0
+                for chunk in body:
+                    spool.write(chunk)
+                    digest.update(chunk)
+                    length += len(chunk)
+                spool.seek(0)
+                blocks = [spool]
+            http_head = _http_head(response, length)
+            payload_digest = "sha1:" + base64.b32encode(digest.digest()).decode("ascii")
+
+            with self.lock:
+                if self.file is None:
+                    self._open()
+                offset, size = self._write_record({
+                    'WARC-Type': 'response',
+                    'WARC-Target-URI': url,
+                    'WARC-Payload-Digest': payload_digest,
+                    'Content-Type': 'application/http; msgtype=response',
+                }, [http_head] + blocks, len(http_head) + length)
+                mime = response.headers.get("Content-Type", "-").split(";")[0].strip() or "-"
+                line = (f"{surt(url)} {time.strftime('%Y%m%d%H%M%S', time.gmtime())} {url} {mime} "
+                        f"{response.status_code} {payload_digest[5:]} - - {size} {offset} "
+                        f"{os.path.basename(self.path)}\n")
+                self.index.append(line)
+                # The record reaches the disk before its index line, so every listed offset can be read
+                self.file.flush()
+                self.index_file.write(line)
+                self.index_file.flush()
+                self.records += 1
+                path = self.path
+                if self.file.tell() >= self.max_size:
+                    self._finish()
+        return path
+
+    def close(self):
+        with self.lock:
+            self._finish()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def download_to_warc(url, writer, session=None, headers=None, timeout=10, max_bytes=MAX_CONTENT_BYTES,
+                     content_types=HTML_CONTENT_TYPES, retry=DEFAULT_RETRY_POLICY):
+    """
+    Streams a response body from the socket into a WARC file.
+
+    Args:
+        url (str): The URL to download.
+        writer (WARCWriter): The archive to write to.
+        session (Session, optional): A session object for authenticated requests.
+        headers (dict, optional): Request headers.
+        timeout (int): Request timeout in seconds.
+        max_bytes (int, optional): Maximum number of body bytes. None disables the limit.
+        content_types (tuple, optional): Accepted MIME types. None accepts any type.
+        retry (RetryPolicy): Retry and circuit breaker policy for the request.
+
+    Returns:
+        str: Path of the WARC file the record was written to.
+    """
+    response = open_stream(url, session, headers, timeout, max_bytes, content_types, retry)
+    try:
+        response.raise_for_status()
+        return writer.write_response(url, response, iter_body(response, max_bytes))
+    finally:
+        response.close()
+
+
+def read_warc_record(path, offset, length=None):
+    """
+    Reads the single record at an offset of a WARC file, as listed in its CDX index.
+
+    Returns:
+        tuple: The record's WARC headers and its content block.
+    """
+    with open(path, "rb") as file:
+        file.seek(offset)
+        data = file.read(length) if length else file.read()
+    if path.endswith(".gz"):
+        data = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(data)
+    head, _, rest = data.partition(b"\r\n\r\n")
+    headers = CaseInsensitiveDict()
+    for line in head.decode("utf-8", "replace").split("\r\n")[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip()] = value.strip()
+    return headers, rest[:int(headers.get("Content-Length", 0))]
+
+
+class WARCIndex:
+    """
+    Random access by URL to the WARC files of a directory, through the sorted CDX
+    index written next to each file. Lookups binary-search each index. The .cdx.open
+    lines of a file whose writer never finished are sorted when they are loaded.
+    """
+
+    def __init__(self, directory="."):
+        self.directory = directory
+        self.indexes = {}
+
+    def _lines(self, cdx_path):
+        if cdx_path not in self.indexes:
+            with open(cdx_path) as file:
+                lines = [line for line in file if not line.startswith(" CDX")]
+            self.indexes[cdx_path] = sorted(lines) if cdx_path.endswith(".open") else lines
+        return self.indexes[cdx_path]
+
+    def lookup(self, url):
+        """
+        Returns the index entries of a URL, oldest first, as dicts with the capture
+        timestamp, status, WARC path, offset and length.
+        """
+        key = surt(url)
+        entries = []
+        names = set(os.listdir(self.directory))
+        for name in sorted(names):
+            # A running index only counts while its sorted index has not been written
+            if not name.endswith(".cdx") and not (name.endswith(".cdx.open") and name[:-5] not in names):
+                continue
+            lines = self._lines(os.path.join(self.directory, name))
+            position = bisect.bisect_left(lines, key + " ")
+            while position < len(lines) and lines[position].startswith(key + " "):
+                fields = lines[position].split()
+                entries.append({'timestamp': fields[1], 'url': fields[2], 'status': int(fields[4]),
+                                'path': os.path.join(self.directory, fields[10]),
+                                'offset': int(fields[9]), 'length': int(fields[8])})
+                position += 1
+        return sorted(entries, key=lambda entry: entry['timestamp'])
+
+    def read(self, url):
+        """
+        Returns the latest archived response of a URL as (status, headers, body), or None.
+        """
+        entries = self.lookup(url)
+        if not entries:
+            return None
+        entry = entries[-1]
+        _, block = read_warc_record(entry['path'], entry['offset'], entry['length'])
+        return parse_http_response(block)
@@ -7,6 +7,9 @@ def main():
     Main function to handle command line arguments and orchestrate the execution
     of commands based on user input.
     """
+    fields = pop_option("--fields")
+    rules = pop_option("--rules")
+    scope = pop_option("--scope")
     if len(sys.argv) < 2:
         help()
     elif len(sys.argv) > 5:
@@ -14,40 +17,115 @@ def main():
     else:
         command = sys.argv[1].lower()
         argument = sys.argv[2] if len(sys.argv) > 2 else None
-        process_command(command, argument)
+        process_command(command, argument, fields, rules, scope)
 
 
-def process_command(command, argument):
+def pop_option(name):
+    """
+    Removes an option with a value ('--name <value>' or '--name=<value>') from the arguments and returns its value.
+    """
+    for position, arg in enumerate(sys.argv):
+        if arg == name:
+            if position + 1 >= len(sys.argv):
+                sys.exit(f"YiraBot: {name} needs a value.")
+            value = sys.argv[position + 1]
+            del sys.argv[position:position + 2]
+            return value
+        if arg.startswith(name + "="):
+            del sys.argv[position]
+            return arg[len(name) + 1:]
+    return None
+
+
+def check_fields(fields, available):
+    """
+    Validates a --fields value against the fields a command supports.
+    """
+    try:
+        return parse_fields(fields, available)
+    except ValueError as e:
+        sys.exit(f"YiraBot: {e}")
+
+
+def check_scope(scope):
+    """
+    Loads a --scope JSON file.
+    """
+    try:
+        return load_scope(scope)
+    except (OSError, ValueError) as e:
+        sys.exit(f"YiraBot: Invalid scope file: {e}")
+
+
+def process_command(command, argument, fields=None, rules=None, scope=None):
     """
     Processes the given command with an optional argument, directing to the appropriate action.
     """
+    if fields is not None and command not in ("crawl", "scrape", "seo"):
+        sys.exit("YiraBot: --fields is only supported by crawl, scrape and seo.")
+    if rules is not None and command not in ("crawl", "scrape"):
+        sys.exit("YiraBot: --rules is only supported by crawl and scrape.")
+    if scope is not None and command not in ("seo-site", "links", "duplicates", "auth-crawl", "coordinator",
+                                             "monitor"):
+        sys.exit("YiraBot: --scope is only supported by seo-site, links, duplicates, auth-crawl, coordinator "
+                 "and monitor.")
+    scope = check_scope(scope)
     if command == "session":
         crawl_protected_page()
-    elif command in ["get-html", "seo"]:
-        process_url_command(command, argument)
+    elif command in ["get-html", "seo", "seo-site", "duplicates", "links"]:
+        process_url_command(command, argument, fields, scope)
     elif command in ["crawl", "scrape"]:
-        process_crawl_command(command, argument)
+        process_crawl_command(command, argument, fields, rules)
+    elif command == "coordinator":
+        process_coordinator_command(argument, scope)
+    elif command == "worker":
+        process_worker_command(argument)
+    elif command == "monitor":
+        process_monitor_command(argument, scope)
+    elif command == "serve":
+        process_serve_command(argument)
+    elif command == "auth-crawl":
+        process_auth_crawl_command(argument, scope)
+    elif command == "replay":
+        process_replay_command(argument)
     else:
         print("YiraBot: Unknown command.")
 
 
-def process_url_command(command, argument):
+def process_url_command(command, argument, fields=None, scope=None):
     """
     Handles commands that operate on a single URL, such as downloading HTML or performing SEO analysis.
     """
     if not argument:
         sys.exit("YiraBot: A URL is required for this command.")
+    if fields is not None and "-perf" in sys.argv:
+        sys.exit("YiraBot: --fields cannot be combined with -perf.")
+    fields = check_fields(fields, SEO_FIELDS) if command == "seo" else None
     try:
         url = validate_url(argument)
         if command == "get-html":
-            get_html(url)
+            if "-warc" in sys.argv:
+                with WARCWriter() as warc:
+                    get_html(url, warc=warc)
+            else:
+                get_html(url)
+        elif command == "seo" and "-perf" in sys.argv:
+            page_weight_analysis(url)
         elif command == "seo":
-            seo_error_analysis(url)
+            seo_error_analysis(url, fields=fields)
+        elif command == "seo-site" and "-perf" in sys.argv:
+            site_page_weight_analysis(url, scope=scope)
+        elif command == "seo-site":
+            seo_site_analysis(url, scope=scope)
+        elif command == "links":
+            link_graph_analysis(url, scope=scope)
+        elif command == "duplicates":
+            find_duplicate_content(url, scope=scope)
     except Exception as e:
         sys.exit(f"YiraBot: Error occurred: {e}")
 
 
-def process_crawl_command(command, argument):
+def process_crawl_command(command, argument, fields=None, rules=None):
     """
     Processes commands related to crawling or scraping, handling optional flags for output format and mobile user-agent.
     """
@@ -56,7 +134,7 @@ def process_crawl_command(command, argument):
     url = validate_url(argument)
 
     # Define the expected options
-    expected_options = {"-mobile", "-file", "-json"}
+    expected_options = {"-mobile", "-file", "-json", "-head", "-http2", "-warc"}
 
     # Extract the actual options (excluding the script name and the primary command)
     actual_options = set(
@@ -74,11 +152,173 @@ def process_crawl_command(command, argument):
     extract = True if "-file" in sys.argv else False
     extract_json = True if "-json" in sys.argv else False
     mobile = True if "-mobile" in sys.argv else False
+    head_only = True if "-head" in sys.argv else False
+    try:
+        rules = load_rules(rules)
+    except (OSError, ValueError) as e:
+        sys.exit(f"YiraBot: Invalid rules file: {e}")
+    rule_names = rules.names if rules else ()
+    fields = check_fields(fields, (CRAWL_FIELDS if command == "crawl" else CONTENT_FIELDS) + rule_names)
+    if command == "crawl" and head_only and fields and not HEAD_FIELDS.issuperset(fields):
+        sys.exit(f"YiraBot: -head only supports the fields: {', '.join(sorted(HEAD_FIELDS))}")
+    if command == "crawl" and head_only and rules and not fields:
+        sys.exit("YiraBot: --rules needs the whole page and cannot be combined with -head.")
+    if head_only and "-warc" in sys.argv:
+        sys.exit("YiraBot: -warc archives the full response and cannot be combined with -head.")
+    session = None
+    if "-http2" in sys.argv:
+        try:
+            session = HTTP2Transport()
+        except ImportError as e:
+            sys.exit(f"YiraBot: {e}")
+
+    warc = WARCWriter() if "-warc" in sys.argv else None
+    try:
+        if command == "crawl":
+            crawl(url, extract=extract, extract_json=extract_json, session=session, mobile=mobile,
+                  head_only=head_only, fields=fields, warc=warc, rules=rules)
+        elif command == "scrape":
+            crawl_content(url, extract=extract, extract_json=extract_json, session=session, fields=fields, rules=rules,
+                          warc=warc)
+    finally:
+        warc.close() if warc else None
+        session.close() if session else None
 
-    if command == "crawl":
-        crawl(url, extract=extract, extract_json=extract_json, mobile=mobile)
-    elif command == "scrape":
-        crawl_content(url, extract=extract, extract_json=extract_json)
+
+def process_coordinator_command(argument, scope=None):
+    """
+    Seeds a distributed crawl queue with the given URL and waits for workers to finish it.
+    The queue file starts empty unless -resume is given.
+    Usage: yirabot coordinator <url> [shards] [-resume]
+    """
+    if not argument:
+        sys.exit("YiraBot: A URL is required for this command.")
+    url = validate_url(argument)
+    resume = "-resume" in sys.argv
+    arguments = [arg for arg in sys.argv[3:] if arg != "-resume"]
+    try:
+        shards = int(arguments[0]) if arguments else 4
+    except ValueError:
+        sys.exit("YiraBot: The number of shards must be a number.")
+    if shards < 1:
+        sys.exit("YiraBot: The number of shards must be at least 1.")
+
+    try:
+        coordinator = CrawlCoordinator(DEFAULT_QUEUE_FILE, shards=shards, scope=scope, resume=resume)
+    except ValueError as e:
+        sys.exit(f"YiraBot: {e}")
+    coordinator.seed([url])
+    print(f"YiraBot: Queue '{DEFAULT_QUEUE_FILE}' ready with {shards} shards. "
+          f"Start workers with: yirabot worker {DEFAULT_QUEUE_FILE} <shard>")
+    try:
+        coordinator.wait()
+    except KeyboardInterrupt:
+        print("\nYiraBot: Coordinator Stopped")
+
+    safe_url = url.replace("https://", "").replace("http://", "").replace("/", "_")
+    filename = f"{safe_url}.{datetime.now().strftime('%Y-%m-%d')}.ndjson"
+    count = coordinator.export(filename)
+    print(f"YiraBot: {count} pages written to '{filename}'.")
+
+
+def process_worker_command(argument):
+    """
+    Runs a crawl worker against a distributed crawl queue.
+    Usage: yirabot worker [queue file] [shard]
+    """
+    path = argument or DEFAULT_QUEUE_FILE
+    if not os.path.exists(path):
+        sys.exit(f"YiraBot: Queue file '{path}' not found, start a coordinator first.")
+    try:
+        shards = [int(sys.argv[3])] if len(sys.argv) > 3 else None
+    except ValueError:
+        sys.exit("YiraBot: The shard must be a number.")
+
+    try:
+        worker = CrawlWorker(path, shards=shards)
+    except ValueError as e:
+        sys.exit(f"YiraBot: {e}")
+    try:
+        processed = worker.run()
+        print(f"YiraBot: Worker finished after {processed} pages.")
+    except KeyboardInterrupt:
+        print("\nYiraBot: Worker Stopped")
+
+
+def process_monitor_command(argument, scope=None):
+    """
+    Monitors a site continuously, recrawling only the sitemap URLs that are due and appending
+    new and changed pages to an NDJSON file.
+    Usage: yirabot monitor <url> [pages per cycle] [seconds per cycle]
+    """
+    if not argument:
+        sys.exit("YiraBot: A URL is required for this command.")
+    url = validate_url(argument)
+    try:
+        max_pages = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+        cycle_seconds = float(sys.argv[4]) if len(sys.argv) > 4 else 60
+    except ValueError:
+        sys.exit("YiraBot: The pages and seconds per cycle must be numbers.")
+
+    safe_url = url.replace("https://", "").replace("http://", "").replace("/", "_")
+    filename = f"{safe_url}.changes.ndjson"
+    scheduler = RecrawlScheduler(url, DEFAULT_MONITOR_FILE, scope=scope)
+    print(f"YiraBot: Monitoring {url} with state in '{DEFAULT_MONITOR_FILE}', "
+          f"changes are appended to '{filename}'. Press Ctrl+C to stop.")
+    try:
+        scheduler.run(max_pages=max_pages, cycle_seconds=cycle_seconds, output=filename)
+    except KeyboardInterrupt:
+        stats = scheduler.stats()
+        print(f"\nYiraBot: Monitor Stopped. {stats['pages']} URLs scheduled, {stats['fetches']} fetches, "
+              f"{stats['changes']} changes seen.")
+    finally:
+        scheduler.close()
+
+
+def process_serve_command(argument):
+    """
+    Runs the local HTTP server that accepts crawl, scrape, seo, validate and get-html jobs.
+    Usage: yirabot serve [port] [workers]
+    """
+    try:
+        port = int(argument) if argument else DEFAULT_PORT
+        workers = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    except ValueError:
+        sys.exit("YiraBot: The port and number of workers must be numbers.")
+    serve(port=port, workers=workers)
+
+
+def process_auth_crawl_command(argument, scope=None):
+    """
+    Logs in from a config file or the YIRABOT_AUTH_* environment variables and crawls the site behind the login.
+    Usage: yirabot auth-crawl <url> [config file] [max pages]
+    """
+    if not argument:
+        sys.exit("YiraBot: A URL is required for this command.")
+    url = validate_url(argument)
+    config = sys.argv[3] if len(sys.argv) > 3 else None
+    try:
+        max_pages = int(sys.argv[4]) if len(sys.argv) > 4 else 500
+    except ValueError:
+        sys.exit("YiraBot: The maximum number of pages must be a number.")
+    try:
+        authenticated_crawl(url, config, max_pages=max_pages, scope=scope)
+    except (OSError, ValueError, RequestException, errors.LoginError) as e:
+        sys.exit(f"YiraBot: {e}")
+
+
+def process_replay_command(argument):
+    """
+    Re-runs the extraction and SEO pipeline over saved .html and WARC files without network access.
+    Usage: yirabot replay <directory or file> [workers]
+    """
+    if not argument or not os.path.exists(argument):
+        sys.exit("YiraBot: An existing directory or file of saved pages is required.")
+    try:
+        workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    except ValueError:
+        sys.exit("YiraBot: The number of workers must be a number.")
+    replay_archive(argument, workers=workers)
 
 
 def validate_url(url):